@@ -0,0 +1,151 @@
+"""Compare recall, memory and query latency of the vector store's FAISS indexes.
+
+Builds a flat (exact) index and each requested index type / quantization
+combination over the same synthetic, clustered vectors, then reports
+recall@k against the exact results, resident bytes per vector, build time
+and per-query latency percentiles. Quantized indexes are also measured with
+re-ranking from an on-disk float copy when `--rerank` is given.
+
+Usage:
+    uv run python benchmarks/vector_index_benchmark.py --vectors 50000 --dim 384
+    uv run python benchmarks/vector_index_benchmark.py --quantization sq8 pq --rerank 4
+"""
+
+import argparse
+import importlib.util
+import json
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+
+COMMON_DIR = Path(__file__).resolve().parents[1] / "src" / "common"
+
+
+def _load_module(name: str) -> Any:
+    """Load a self-contained module from src/common without importing the package.
+
+    Importing `common` builds the agent's tools, which needs API keys that a
+    local benchmark has no use for.
+    """
+    spec = importlib.util.spec_from_file_location(f"_bench_{name}", COMMON_DIR / f"{name}.py")
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+vector_index = _load_module("vector_index")
+
+
+def make_dataset(num_vectors: int, num_queries: int, dim: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return clustered corpus and query vectors, which resemble text embeddings better than uniform noise."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(max(1, num_vectors // 100), dim)).astype("float32")
+
+    def sample(n: int) -> np.ndarray:
+        labels = rng.integers(0, len(centers), size=n)
+        return (centers[labels] + 0.3 * rng.normal(size=(n, dim))).astype("float32")
+
+    return sample(num_vectors), sample(num_queries)
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    """Return the mean fraction of true top-k neighbours that were found."""
+    k = truth.shape[1]
+    return float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)]))
+
+
+def time_queries(index: Any, queries: np.ndarray, k: int) -> tuple[np.ndarray, List[float]]:
+    """Run queries one at a time, as the agent does, recording each latency in milliseconds."""
+    results = []
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append(ids[0])
+    return np.array(results), latencies
+
+
+def bytes_per_vector(index: Any) -> float:
+    """Return the serialized size of an index per stored vector, a proxy for its resident memory."""
+    import faiss
+
+    base = getattr(index, "base_index", index)
+    return len(faiss.serialize_index(base)) / max(1, base.ntotal)
+
+
+def run(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Benchmark every requested index configuration and return one result row each."""
+    corpus, queries = make_dataset(args.vectors, args.queries, args.dim, args.seed)
+    params = json.loads(args.params) if args.params else {}
+
+    configs = [("flat", "none", 0)]
+    for kind in ["flat", *args.types]:
+        for quantization in args.quantization:
+            if (kind, quantization) != ("flat", "none"):
+                configs.append((kind, quantization, 0))
+            if quantization != "none" and args.rerank:
+                configs.append((kind, quantization, args.rerank))
+
+    rows = []
+    truth = None
+    for kind, quantization, rerank in configs:
+        start = time.perf_counter()
+        index = vector_index.build_index(kind, corpus, params, quantization)
+        if rerank:
+            index = vector_index.RerankingIndex(index, corpus, rerank)
+        build_seconds = time.perf_counter() - start
+        found, latencies = time_queries(index, queries, args.k)
+        if truth is None:
+            truth = found
+        rows.append(
+            {
+                "index": kind,
+                "codes": quantization,
+                "rerank": rerank,
+                "bytes/vec": round(bytes_per_vector(index), 1),
+                "build_s": round(build_seconds, 3),
+                f"recall@{args.k}": round(recall_at_k(found, truth), 4),
+                "p50_ms": round(float(np.percentile(latencies, 50)), 4),
+                "p95_ms": round(float(np.percentile(latencies, 95)), 4),
+            }
+        )
+        if rerank:
+            index.close()
+    return rows
+
+
+def main() -> None:
+    """Run the benchmark and print its results; printing is this CLI's output."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=20_000, help="corpus size")
+    parser.add_argument("--queries", type=int, default=200, help="number of queries")
+    parser.add_argument("--dim", type=int, default=256, help="vector dimension")
+    parser.add_argument("--k", type=int, default=10, help="neighbours per query")
+    parser.add_argument("--types", nargs="+", default=["hnsw", "ivf"], help="approximate index types to compare")
+    parser.add_argument(
+        "--quantization", nargs="+", default=["none"], help="vector codes to compare: none, sq8, pq"
+    )
+    parser.add_argument(
+        "--rerank", type=int, default=0, help="also measure quantized indexes re-ranking k * RERANK candidates"
+    )
+    parser.add_argument("--params", default="", help="JSON index parameters, as in Context.vector_index_params")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print JSON instead of a table")
+    args = parser.parse_args()
+
+    rows = run(args)
+    if args.json:
+        print(json.dumps(rows, indent=2))  # noqa: T201
+        return
+    columns = list(rows[0])
+    print(f"{args.vectors} vectors, dim={args.dim}, {args.queries} queries")  # noqa: T201
+    print("  ".join(f"{c:>10}" for c in columns))  # noqa: T201
+    for row in rows:
+        print("  ".join(f"{row[c]!s:>10}" for c in columns))  # noqa: T201
+
+
+if __name__ == "__main__":
+    main()
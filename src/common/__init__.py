@@ -3,8 +3,8 @@
 from . import prompts
 from .context import Context
 from .models import create_model, get_supported_models
-from .tools import create_tools, web_search
-from .utils import load_chat_model
+from .tools import create_tools, get_mcp_tools, invalidate_tool_registry, web_search
+from .utils import clear_model_pool, load_chat_model
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -13,7 +13,10 @@ __all__ = [
     "create_model",
     "get_supported_models",
     "create_tools",
+    "invalidate_tool_registry",
+    "get_mcp_tools",
     "web_search",
     "load_chat_model",
+    "clear_model_pool",
     "prompts",
 ]
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""Pick the final answer out of a streamed ReAct completion."""
+
+import re
+
+from langchain_core.messages import BaseMessageChunk
+
+# The marker the system prompt asks the model to put before its final answer.
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+# Markdown emphasis the model may wrap the marker in, e.g. "**Final Answer:**".
+_MARKER_DECORATION = re.compile(r"^[*_]*[ \t]*")
+
+
+def chunk_text(chunk: BaseMessageChunk) -> str:
+    """Return a streamed chunk's text, keeping the whitespace between tokens."""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(
+        part if isinstance(part, str) else part.get("text", "")
+        for part in chunk.content
+        if isinstance(part, str) or (isinstance(part, dict) and part.get("type", "text") == "text")
+    )
+
+
+class FinalAnswerParser:
+    r"""Incrementally extracts the text after "Final Answer:" from streamed chunks.
+
+    Feed the completion's text as it arrives; each call returns the part of
+    the answer that can be shown so far. Text before the marker (the model's
+    Thought, or an Action) is never returned. Because the marker may be split
+    across chunks, the tail of the buffer that could still begin the marker
+    is held back until the next chunk decides it, so the thought is delayed
+    by at most a few characters and the answer not at all.
+
+    Example:
+        parser = FinalAnswerParser()
+        parser.feed("Thought: done.\\nFinal Ans")  # ""
+        parser.feed("wer: Paris")                   # "Paris"
+    """
+
+    def __init__(self, marker: str = FINAL_ANSWER_MARKER) -> None:
+        """Create a parser looking for `marker`."""
+        self.marker = marker
+        self.found = False
+        self._buffer = ""
+        self._started = False
+
+    def feed(self, text: str) -> str:
+        """Add a chunk of the completion and return the newly available answer text."""
+        if not text:
+            return ""
+        if self.found:
+            return self._answer(text)
+        self._buffer += text
+        index = self._buffer.find(self.marker)
+        if index < 0:
+            # Keep only what could still be the start of the marker.
+            self._buffer = self._buffer[-(len(self.marker) - 1):]
+            return ""
+        self.found = True
+        rest = self._buffer[index + len(self.marker):]
+        self._buffer = ""
+        return self._answer(rest)
+
+    def _answer(self, text: str) -> str:
+        if self._started:
+            return text
+        # Drop the marker's closing emphasis and the space after it, which may
+        # arrive in later chunks than the marker itself.
+        self._buffer += text
+        stripped = _MARKER_DECORATION.sub("", self._buffer).lstrip()
+        if not stripped or stripped.strip("*_") == "":
+            return ""
+        self._started = True
+        self._buffer = ""
+        return stripped
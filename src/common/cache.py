@@ -0,0 +1,129 @@
+"""In-process caching primitives shared by the agent's components."""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Generic, Hashable, Iterator, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+
+class LRUCache(Generic[K, V]):
+    """A thread-safe, size-bounded LRU cache with optional time-based expiry.
+
+    Entries are evicted when the cache grows past `maxsize` (least recently
+    used first) or when they are older than `ttl` seconds. By default the age
+    of an entry is measured from when it was stored; with `sliding=True` it is
+    measured from when it was last read, which turns `ttl` into an idle timeout.
+
+    Args:
+        maxsize: The maximum number of entries to keep.
+        ttl: The entry lifetime in seconds, or None to never expire.
+        sliding: Whether reads refresh an entry's lifetime.
+        on_evict: An optional callback invoked with `(key, value)` for every
+                  entry that is evicted, expired, or explicitly invalidated.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 128,
+        ttl: Optional[float] = None,
+        *,
+        sliding: bool = False,
+        on_evict: Optional[Callable[[K, V], None]] = None,
+    ) -> None:
+        """Create an empty cache."""
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer.")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.sliding = sliding
+        self._on_evict = on_evict
+        self._data: OrderedDict[K, Tuple[float, V]] = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+
+    def _expired(self, stamp: float, now: float) -> bool:
+        return self.ttl is not None and now - stamp > self.ttl
+
+    def _evict(self, evicted: list[Tuple[K, V]]) -> None:
+        # Callbacks run outside the lock so they may safely touch the cache.
+        if self._on_evict is None:
+            return
+        for key, value in evicted:
+            self._on_evict(key, value)
+
+    def get(self, key: K, default: Optional[V] = None) -> Optional[V]:
+        """Return the cached value for `key`, or `default` if missing or expired."""
+        evicted: list[Tuple[K, V]] = []
+        with self._lock:
+            entry = self._data.get(key)
+            now = time.monotonic()
+            if entry is not None and self._expired(entry[0], now):
+                del self._data[key]
+                evicted.append((key, entry[1]))
+                entry = None
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+                if self.sliding:
+                    self._data[key] = (now, entry[1])
+        self._evict(evicted)
+        return default if entry is None else entry[1]
+
+    def set(self, key: K, value: V) -> None:
+        """Store `value` under `key`, evicting the least recently used entries if needed."""
+        evicted: list[Tuple[K, V]] = []
+        with self._lock:
+            previous = self._data.pop(key, None)
+            if previous is not None and previous[1] is not value:
+                evicted.append((key, previous[1]))
+            self._data[key] = (time.monotonic(), value)
+            while len(self._data) > self.maxsize:
+                evicted.append(self._pop_oldest())
+        self._evict(evicted)
+
+    def _pop_oldest(self) -> Tuple[K, V]:
+        old_key, (_, old_value) = self._data.popitem(last=False)
+        return old_key, old_value
+
+    def invalidate(self, key: Optional[K] = None) -> None:
+        """Drop a single entry, or every entry when `key` is None."""
+        with self._lock:
+            if key is None:
+                evicted = [(k, v) for k, (_, v) in self._data.items()]
+                self._data.clear()
+            else:
+                entry = self._data.pop(key, None)
+                evicted = [] if entry is None else [(key, entry[1])]
+        self._evict(evicted)
+
+    def purge_expired(self) -> None:
+        """Drop every entry whose lifetime has elapsed."""
+        with self._lock:
+            now = time.monotonic()
+            stale = [k for k, (stamp, _) in self._data.items() if self._expired(stamp, now)]
+            evicted = [(k, self._data.pop(k)[1]) for k in stale]
+        self._evict(evicted)
+
+    def __contains__(self, key: object) -> bool:
+        """Return whether `key` has an entry that has not expired."""
+        with self._lock:
+            entry = self._data.get(key)  # type: ignore[arg-type]
+            return entry is not None and not self._expired(entry[0], time.monotonic())
+
+    def __len__(self) -> int:
+        """Return the number of entries, including expired ones not yet purged."""
+        with self._lock:
+            return len(self._data)
+
+    def __iter__(self) -> Iterator[K]:
+        """Iterate over a snapshot of the keys, least recently used first."""
+        with self._lock:
+            return iter(list(self._data))
@@ -0,0 +1,587 @@
+"""A local SQLite checkpointer that stores each message once."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+from langchain_core.messages import BaseMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.base import SerializerProtocol
+
+from .cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# The blob type of a message list stored as references into the messages table.
+MESSAGE_REFS_TYPE = "msgrefs"
+
+# With `buffer_writes`, pending writes are flushed once this many are waiting, even mid-step.
+MAX_PENDING_WRITES = 256
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata BLOB NOT NULL,
+    versions TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    metadata_type TEXT NOT NULL DEFAULT 'msgpack',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    message_id TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, message_id, digest)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB,
+    task_path TEXT NOT NULL DEFAULT '',
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+"""
+
+
+def _is_message_list(value: Any) -> bool:
+    return (
+        isinstance(value, list)
+        and bool(value)
+        and all(isinstance(item, BaseMessage) and item.id for item in value)
+    )
+
+
+def _config(thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str]) -> Optional[RunnableConfig]:
+    if checkpoint_id is None:
+        return None
+    return {"configurable": {"thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id}}
+
+
+class SQLiteCheckpointer(BaseCheckpointSaver[str]):
+    """Persists graph checkpoints in a local SQLite file.
+
+    Channel values are stored per version, so a step only writes the channels
+    it changed. Message lists are stored by reference: each message is
+    written once under its ID (and a digest of its content, should a message
+    be replaced under the same ID), and a checkpoint's message channel holds
+    only the list of references. A step of a long thread therefore writes
+    its new messages rather than the whole history again.
+
+    Pending writes are stored as each task finishes, one transaction per
+    task, so resuming after a crash mid-step re-runs only the tasks that had
+    not finished. With `buffer_writes`, they are instead held in memory and
+    written in the same transaction as the step's checkpoint. That saves a
+    commit per task, but a crash mid-step loses them and resuming re-runs
+    every task of the step, including side-effecting tool calls that had
+    already completed, so it is only suited to idempotent tools.
+
+    Old checkpoints are pruned per thread: at most `keep_last` are kept, and
+    those older than `max_age` seconds are dropped, though the latest one is
+    always kept. Channel values and messages no longer referenced by any
+    checkpoint are deleted with them. Pruning runs every `prune_every`
+    checkpoints of a thread, and `compact` also reclaims the file's free space.
+
+    Args:
+        path: The SQLite database file.
+        keep_last: Checkpoints to keep per thread and namespace; 0 keeps all.
+        max_age: Seconds after which checkpoints are pruned; 0 keeps them.
+        prune_every: Checkpoints of a thread between automatic prunes; 0 never prunes automatically.
+        buffer_writes: Hold pending writes until the step's checkpoint, trading
+            per-task durability for fewer commits.
+        serde: The serializer for checkpoints and channel values.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        keep_last: int = 20,
+        max_age: float = 0.0,
+        prune_every: int = 50,
+        buffer_writes: bool = False,
+        serde: Optional[SerializerProtocol] = None,
+    ) -> None:
+        """Open the database at `path`, creating it and its tables if needed."""
+        super().__init__(serde=serde)
+        self.path = path
+        self.keep_last = int(keep_last)
+        self.max_age = float(max_age)
+        self.prune_every = int(prune_every)
+        self.buffer_writes = bool(buffer_writes)
+        file = Path(path).expanduser()
+        file.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(file), check_same_thread=False, isolation_level=None)
+        self._lock = threading.RLock()
+        self._pending: List[Tuple[Any, ...]] = []
+        self._puts: Dict[str, int] = {}
+        # The digest of each message object already stored, so unchanged
+        # messages are not serialized again on every step.
+        self._stored: LRUCache[Tuple[str, str], Tuple[BaseMessage, str]] = LRUCache(maxsize=20_000)
+        self._loaded: LRUCache[Tuple[str, str, str], BaseMessage] = LRUCache(maxsize=20_000)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.executescript(_SCHEMA)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(checkpoints)")}
+            if "metadata_type" not in columns:
+                # Files from before the column was added hold msgpack metadata.
+                self._conn.execute("ALTER TABLE checkpoints ADD COLUMN metadata_type TEXT NOT NULL DEFAULT 'msgpack'")
+
+    # --- Writing ---
+
+    def _dump_messages(self, thread_id: str, messages: List[BaseMessage]) -> Tuple[str, bytes, List[Tuple[Any, ...]]]:
+        """Return the references to a message list, and the rows of messages not stored yet."""
+        refs = []
+        rows = []
+        for message in messages:
+            # `_is_message_list` only lets through messages that have an ID.
+            key = (thread_id, str(message.id))
+            seen = self._stored.get(key)
+            if seen is not None and seen[0] is message:
+                digest = seen[1]
+            else:
+                type_, value = self.serde.dumps_typed(message)
+                digest = hashlib.sha256(type_.encode() + value).hexdigest()[:32]
+                rows.append((thread_id, message.id, digest, type_, value))
+                self._stored.set(key, (message, digest))
+            refs.append([message.id, digest])
+        return MESSAGE_REFS_TYPE, json.dumps(refs).encode(), rows
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Store a checkpoint, the channel values it changed, and any buffered writes."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        saved = checkpoint.copy()
+        values: Dict[str, Any] = saved.pop("channel_values")  # type: ignore[misc]
+        blob_rows = []
+        message_rows: List[Tuple[Any, ...]] = []
+        with self._lock:
+            for channel, version in new_versions.items():
+                if channel not in values:
+                    type_, value = "empty", None
+                elif _is_message_list(values[channel]):
+                    type_, value, rows = self._dump_messages(thread_id, values[channel])
+                    message_rows.extend(rows)
+                else:
+                    type_, value = self.serde.dumps_typed(values[channel])
+                blob_rows.append((thread_id, checkpoint_ns, channel, str(version), type_, value))
+            checkpoint_type, checkpoint_bytes = self.serde.dumps_typed(saved)
+            metadata_type, metadata_bytes = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+            row = (
+                thread_id,
+                checkpoint_ns,
+                checkpoint["id"],
+                config["configurable"].get("checkpoint_id"),
+                checkpoint_type,
+                checkpoint_bytes,
+                metadata_bytes,
+                json.dumps({k: str(v) for k, v in saved["channel_versions"].items()}),
+                time.time(),
+                metadata_type,
+            )
+            with self._transaction():
+                self._write_pending()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO messages VALUES (?, ?, ?, ?, ?)", message_rows
+                )
+                self._conn.executemany("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?, ?)", blob_rows)
+                self._conn.execute("INSERT OR REPLACE INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            puts = self._puts[thread_id] = self._puts.get(thread_id, 0) + 1
+            if self.prune_every > 0 and puts % self.prune_every == 0:
+                self.prune(thread_id)
+        return _config(thread_id, checkpoint_ns, checkpoint["id"])  # type: ignore[return-value]
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Store a task's writes, or buffer them until the step's checkpoint with `buffer_writes`."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        rows = []
+        for idx, (channel, value) in enumerate(writes):
+            type_, value_bytes = self.serde.dumps_typed(value)
+            index = WRITES_IDX_MAP.get(channel, idx)
+            rows.append((thread_id, checkpoint_ns, checkpoint_id, task_id, index, channel, type_, value_bytes, task_path))
+        with self._lock:
+            self._pending.extend(rows)
+            if not self.buffer_writes or len(self._pending) >= MAX_PENDING_WRITES:
+                self.flush()
+
+    def _write_pending(self) -> None:
+        """Write buffered writes. Called in a transaction with the lock held."""
+        if not self._pending:
+            return
+        # Regular writes are kept as first written; special channels (errors,
+        # interrupts) replace earlier values, as in LangGraph's own savers.
+        regular = [row for row in self._pending if row[4] >= 0]
+        special = [row for row in self._pending if row[4] < 0]
+        self._conn.executemany("INSERT OR IGNORE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", regular)
+        self._conn.executemany("INSERT OR REPLACE INTO writes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", special)
+        self._pending = []
+
+    def flush(self) -> None:
+        """Write buffered pending writes now."""
+        with self._lock:
+            if self._pending:
+                with self._transaction():
+                    self._write_pending()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    # --- Reading ---
+
+    def _load_messages(self, thread_id: str, refs: List[List[str]]) -> List[BaseMessage]:
+        missing = [(m, d) for m, d in refs if self._loaded.get((thread_id, m, d)) is None]
+        for start in range(0, len(missing), 400):
+            chunk = missing[start:start + 400]
+            rows = self._conn.execute(
+                "SELECT message_id, digest, type, value FROM messages WHERE thread_id = ? AND message_id IN "
+                f"({','.join('?' * len(chunk))})",
+                (thread_id, *(m for m, _ in chunk)),
+            ).fetchall()
+            for message_id, digest, type_, value in rows:
+                message = self.serde.loads_typed((type_, value))
+                self._loaded.set((thread_id, message_id, digest), message)
+                self._stored.set((thread_id, message_id), (message, digest))
+        messages = []
+        for message_id, digest in refs:
+            message = self._loaded.get((thread_id, message_id, digest))
+            if message is None:
+                raise LookupError(f"Message {message_id} of thread {thread_id} is missing from the checkpoint store.")
+            messages.append(message)
+        return messages
+
+    def _load_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> Dict[str, Any]:
+        values: Dict[str, Any] = {}
+        for channel, version in versions.items():
+            row = self._conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                (thread_id, checkpoint_ns, channel, str(version)),
+            ).fetchone()
+            if row is None or row[0] == "empty":
+                continue
+            if row[0] == MESSAGE_REFS_TYPE:
+                values[channel] = self._load_messages(thread_id, json.loads(row[1]))
+            else:
+                values[channel] = self.serde.loads_typed((row[0], row[1]))
+        return values
+
+    def _tuple(self, row: Tuple[Any, ...]) -> CheckpointTuple:
+        thread_id, checkpoint_ns, checkpoint_id, parent_id, type_, checkpoint_bytes, metadata_type, metadata_bytes = row
+        checkpoint: Checkpoint = self.serde.loads_typed((type_, checkpoint_bytes))
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes "
+            "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ? ORDER BY task_id, idx",
+            (thread_id, checkpoint_ns, checkpoint_id),
+        ).fetchall()
+        return CheckpointTuple(
+            config=_config(thread_id, checkpoint_ns, checkpoint_id),  # type: ignore[arg-type]
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_values(thread_id, checkpoint_ns, checkpoint["channel_versions"]),
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_bytes)),
+            parent_config=_config(thread_id, checkpoint_ns, parent_id),
+            pending_writes=[(task, channel, self.serde.loads_typed((t, v))) for task, channel, t, v in writes],
+        )
+
+    _COLUMNS = "thread_id, checkpoint_ns, checkpoint_id, parent_id, type, checkpoint, metadata_type, metadata"
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Return the requested checkpoint, or the thread's latest if none is named."""
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            self.flush()
+            if checkpoint_id := get_checkpoint_id(config):
+                row = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                    (thread_id, checkpoint_ns, checkpoint_id),
+                ).fetchone()
+            else:
+                row = self._conn.execute(
+                    f"SELECT {self._COLUMNS} FROM checkpoints "
+                    "WHERE thread_id = ? AND checkpoint_ns = ? ORDER BY checkpoint_id DESC LIMIT 1",
+                    (thread_id, checkpoint_ns),
+                ).fetchone()
+            return None if row is None else self._tuple(row)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """List checkpoints, newest first."""
+        clauses, params = [], []
+        if config:
+            clauses.append("thread_id = ?")
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                clauses.append("checkpoint_ns = ?")
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                clauses.append("checkpoint_id = ?")
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            clauses.append("checkpoint_id < ?")
+            params.append(before_id)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            self.flush()
+            rows = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM checkpoints {where} ORDER BY checkpoint_id DESC", params
+            ).fetchall()
+            results: List[CheckpointTuple] = []
+            for row in rows:
+                if limit is not None and len(results) >= limit:
+                    break
+                if filter:
+                    metadata = self.serde.loads_typed((row[6], row[7]))
+                    if not all(metadata.get(key) == value for key, value in filter.items()):
+                        continue
+                results.append(self._tuple(row))
+        yield from results
+
+    # --- Retention ---
+
+    def prune(self, thread_id: Optional[str] = None) -> int:
+        """Drop checkpoints past the retention policy, and whatever only they referenced.
+
+        Args:
+            thread_id: The thread to prune, or None for every thread.
+
+        Returns:
+            The number of checkpoints dropped.
+        """
+        with self._lock:
+            self.flush()
+            threads = (
+                [thread_id]
+                if thread_id is not None
+                else [row[0] for row in self._conn.execute("SELECT DISTINCT thread_id FROM checkpoints")]
+            )
+            dropped = 0
+            for thread in threads:
+                with self._transaction():
+                    dropped += self._prune_thread(thread)
+            return dropped
+
+    def _prune_thread(self, thread_id: str) -> int:
+        rows = self._conn.execute(
+            "SELECT checkpoint_ns, checkpoint_id, versions, created_at FROM checkpoints "
+            "WHERE thread_id = ? ORDER BY checkpoint_ns, checkpoint_id DESC",
+            (thread_id,),
+        ).fetchall()
+        cutoff = time.time() - self.max_age if self.max_age > 0 else None
+        kept: List[Tuple[str, str]] = []
+        dropped: List[Tuple[str, str]] = []
+        rank: Dict[str, int] = {}
+        referenced: Set[Tuple[str, str, str]] = set()
+        for checkpoint_ns, checkpoint_id, versions, created_at in rows:
+            position = rank[checkpoint_ns] = rank.get(checkpoint_ns, -1) + 1
+            too_many = 0 < self.keep_last <= position
+            too_old = cutoff is not None and created_at < cutoff
+            # The latest checkpoint of a namespace is always kept, however old.
+            if position > 0 and (too_many or too_old):
+                dropped.append((checkpoint_ns, checkpoint_id))
+                continue
+            kept.append((checkpoint_ns, checkpoint_id))
+            referenced.update((checkpoint_ns, channel, version) for channel, version in json.loads(versions).items())
+        if not dropped:
+            return 0
+
+        self._conn.executemany(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, ns, cid) for ns, cid in dropped],
+        )
+        self._conn.executemany(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            [(thread_id, ns, cid) for ns, cid in dropped],
+        )
+        blobs = self._conn.execute(
+            "SELECT checkpoint_ns, channel, version, type, value FROM blobs WHERE thread_id = ?", (thread_id,)
+        ).fetchall()
+        unreferenced = [(thread_id, ns, channel, version) for ns, channel, version, _, _ in blobs if (ns, channel, version) not in referenced]
+        self._conn.executemany(
+            "DELETE FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?", unreferenced
+        )
+        live_messages = {
+            (message_id, digest)
+            for ns, channel, version, type_, value in blobs
+            if type_ == MESSAGE_REFS_TYPE and (ns, channel, version) in referenced
+            for message_id, digest in json.loads(value)
+        }
+        stored = self._conn.execute("SELECT message_id, digest FROM messages WHERE thread_id = ?", (thread_id,)).fetchall()
+        self._conn.executemany(
+            "DELETE FROM messages WHERE thread_id = ? AND message_id = ? AND digest = ?",
+            [(thread_id, m, d) for m, d in stored if (m, d) not in live_messages],
+        )
+        logger.debug(f"Pruned {len(dropped)} checkpoints of thread {thread_id}.")
+        return len(dropped)
+
+    def compact(self) -> None:
+        """Prune every thread, then return the freed pages to the file system."""
+        self.prune()
+        with self._lock:
+            self._conn.execute("VACUUM")
+
+    def delete_thread(self, thread_id: str) -> None:
+        """Delete every checkpoint, write and message of a thread."""
+        with self._lock:
+            self.flush()
+            with self._transaction():
+                for table in ("checkpoints", "blobs", "messages", "writes"):
+                    self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._stored.invalidate()
+            self._loaded.invalidate()
+
+    def close(self) -> None:
+        """Write buffered writes and close the database."""
+        with self._lock:
+            self.flush()
+            self._conn.close()
+
+    # --- Async API ---
+    # SQLite calls block, so they run in a worker thread.
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """Async version of `get_tuple`."""
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """Async version of `list`."""
+        results = await asyncio.to_thread(lambda: list(self.list(config, filter=filter, before=before, limit=limit)))
+        for item in results:
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """Async version of `put`."""
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        """Async version of `put_writes`."""
+        await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        """Async version of `delete_thread`."""
+        await asyncio.to_thread(self.delete_thread, thread_id)
+
+    def get_next_version(self, current: Optional[str], channel: None) -> str:
+        """Return a version that sorts after `current`."""
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+
+def checkpointer_from_env() -> Optional[SQLiteCheckpointer]:
+    """Return the checkpointer configured in the environment, if any.
+
+    `CHECKPOINT_DB_PATH` enables it; `CHECKPOINT_KEEP_LAST` and
+    `CHECKPOINT_MAX_AGE` (seconds) set its retention policy, and
+    `CHECKPOINT_BUFFER_WRITES=true` opts into buffered pending writes.
+    """
+    path = os.environ.get("CHECKPOINT_DB_PATH")
+    if not path:
+        return None
+    return SQLiteCheckpointer(
+        path,
+        keep_last=int(os.environ.get("CHECKPOINT_KEEP_LAST", 20)),
+        max_age=float(os.environ.get("CHECKPOINT_MAX_AGE", 0)),
+        buffer_writes=os.environ.get("CHECKPOINT_BUFFER_WRITES", "").lower() in ("1", "true", "yes"),
+    )
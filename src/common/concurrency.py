@@ -0,0 +1,117 @@
+"""Concurrency primitives shared by the agent's components."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Hashable, Iterator, TypeVar
+
+T = TypeVar("T")
+
+
+class ReadWriteLock:
+    """A lock that admits any number of concurrent readers or a single writer.
+
+    Writers are preferred: once a writer is waiting, new readers queue
+    behind it, so a steady stream of reads cannot starve writes. The lock
+    is not reentrant; a thread must not acquire it again while holding it.
+
+    Example:
+        lock = ReadWriteLock()
+        with lock.read():
+            ...  # runs alongside other readers
+        with lock.write():
+            ...  # runs alone
+    """
+
+    def __init__(self) -> None:
+        """Create an unheld lock."""
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """Hold the lock for reading."""
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """Hold the lock for writing."""
+        with self._cond:
+            self._waiting_writers += 1
+            try:
+                while self._writer or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+    @property
+    def readers(self) -> int:
+        """The number of threads currently holding the lock for reading."""
+        with self._cond:
+            return self._readers
+
+
+class SingleFlight:
+    """Coalesces concurrent async calls that share a key into one execution.
+
+    The first caller for a key starts the work; callers arriving while it
+    is in flight await the same result (or exception) instead of starting
+    their own. Once it finishes the key is released, so later calls run
+    afresh; results are never cached. In-flight work is shielded from
+    cancellation of any one caller, since others may still be waiting on it.
+
+    Calls are only shared within one event loop.
+    """
+
+    def __init__(self) -> None:
+        """Create a group with no calls in flight."""
+        self._calls: dict[tuple[asyncio.AbstractEventLoop, Hashable], asyncio.Future[Any]] = {}
+        self.executions = 0
+        self.shared = 0
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[T]]) -> T:
+        """Return the result of `func()`, sharing it with concurrent calls for `key`."""
+        flight = (asyncio.get_running_loop(), key)
+        future = self._calls.get(flight)
+        if future is None:
+            future = asyncio.ensure_future(func())
+            self._calls[flight] = future
+            self.executions += 1
+
+            def release(done: asyncio.Future[Any]) -> None:
+                if self._calls.get(flight) is done:
+                    del self._calls[flight]
+                # Mark the exception retrieved even if every caller was cancelled.
+                if not done.cancelled():
+                    done.exception()
+
+            future.add_done_callback(release)
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    @property
+    def in_flight(self) -> int:
+        """The number of keys currently executing."""
+        return len(self._calls)
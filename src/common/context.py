@@ -3,7 +3,7 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from typing import Annotated
+from typing import Annotated, Any
 
 from . import prompts
 
@@ -49,10 +49,416 @@ class Context:
         },
     )
 
+    mcp_servers: list[Any] = field(
+        default_factory=list,
+        metadata={
+            "description": "Additional MCP servers to fetch tools from. Each entry is either a URL "
+            "(served over SSE) or an object with a 'url' or 'command', a 'transport' "
+            "(e.g. 'sse', 'streamable_http', 'stdio'), and optional 'name' and 'timeout' keys. "
+            "When set through the environment, use a JSON array.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    mcpo_tools_ttl: float = field(
+        default=300.0,
+        metadata={
+            "description": "How long, in seconds, a tool list fetched from the MCPO server is considered fresh. "
+            "Stale lists keep being served while they are refreshed in the background.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    mcpo_timeout: float = field(
+        default=10.0,
+        metadata={
+            "description": "The maximum time, in seconds, to wait for each MCP server when fetching tools. "
+            "Servers that miss this deadline are skipped for the current call.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    embedding_model: str = field(
+        default="openai:text-embedding-ada-002",
+        metadata={
+            "description": "The embedding backend used by the vector store, in the form "
+            "'provider:model-name' (openai, gemini, ollama, huggingface), or 'hashing' for a "
+            "local vectorizer that needs no network access.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    embedding_dimension: int = field(
+        default=0,
+        metadata={
+            "description": "The dimension of the document embeddings stored in the vector store. "
+            "0 uses the embedding model's native size; backends with a configurable size "
+            "(hashing, OpenAI text-embedding-3) produce vectors of this size.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_index_type: str = field(
+        default="flat",
+        metadata={
+            "description": "The FAISS index used by the vector store: 'flat' (exact), 'hnsw', or 'ivf'. "
+            "Approximate types take over from the initial flat index once the store reaches "
+            "vector_index_promote_threshold documents.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_index_params: dict[str, Any] = field(
+        default_factory=dict,
+        metadata={
+            "description": "Tuning parameters for the approximate index: 'm', 'ef_construction' and "
+            "'ef_search' for HNSW; 'nlist' and 'nprobe' for IVF; 'pq_m' and 'pq_nbits' for PQ.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_index_promote_threshold: int = field(
+        default=10_000,
+        metadata={
+            "description": "The document count at which the vector store rebuilds its flat index as "
+            "vector_index_type, in the background.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_quantization: str = field(
+        default="none",
+        metadata={
+            "description": "How the vector store compresses vectors once it is promoted: 'none' "
+            "(float32), 'sq8' (int8 scalar quantization, 4x smaller) or 'pq' (product "
+            "quantization, 'pq_m' bytes per vector). Applies from vector_index_promote_threshold "
+            "documents, since the codes are trained on the stored vectors.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_rerank_factor: int = field(
+        default=0,
+        metadata={
+            "description": "For quantized stores, fetch this many candidates per requested result and "
+            "re-rank them by exact distance against float32 vectors kept on disk (in "
+            "vector_store_path, or the temp directory). 0 disables re-ranking.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_store_path: str = field(
+        default="",
+        metadata={
+            "description": "A directory to persist the vector store in. When set, the store is "
+            "restored from its snapshot on first use and new documents are appended to the "
+            "snapshot after each write. Empty keeps the store in memory only.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_store_read_only: bool = field(
+        default=False,
+        metadata={
+            "description": "Memory-map the snapshot in vector_store_path instead of loading a "
+            "private copy, and reject writes. Lets worker processes share one copy of the "
+            "index through the OS page cache.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_store_max_segments: int = field(
+        default=16,
+        metadata={
+            "description": "The most incremental snapshot segments to keep. Segments are merged "
+            "size-tiered as they are written; beyond this many, the smallest trailing ones are "
+            "merged as well.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_store_max_workers: int = field(
+        default=4,
+        metadata={
+            "description": "The size of the thread pool that runs FAISS searches, index writes "
+            "and snapshots for the async vector store API.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_store_namespace: str = field(
+        default="default",
+        metadata={
+            "description": "The vector store namespace the document tools read and write. "
+            "May reference the run's configurable values, e.g. '{thread_id}' or "
+            "'{user_id}', to give each conversation or tenant its own collection.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    vector_search_mode: str = field(
+        default="vector",
+        metadata={
+            "description": "How document searches rank results when the tool call does not "
+            "choose: 'vector' (embedding similarity), 'lexical' (BM25 keyword match, no "
+            "embedding call), or 'hybrid' (both, merged by reciprocal rank fusion).",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    embedding_batch_size: int = field(
+        default=256,
+        metadata={
+            "description": "The number of documents embedded per request when adding documents in bulk.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    embedding_cache_path: str = field(
+        default="",
+        metadata={
+            "description": "The SQLite file used to cache embeddings across restarts and worker processes. "
+            "If left empty, embeddings are only cached in memory for the life of the process.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    embedding_cache_max_entries: int = field(
+        default=100_000,
+        metadata={
+            "description": "The maximum number of cached embeddings; the least recently used are evicted first.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_cache_ttls: dict[str, float] = field(
+        default_factory=dict,
+        metadata={
+            "description": "Per-tool result cache lifetimes in seconds, overriding the defaults "
+            "('tavily_search': 600, 'wikipedia' and 'arxiv': 86400). A TTL of 0 disables caching for that tool.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_cache_max_entries: int = field(
+        default=1024,
+        metadata={
+            "description": "The maximum number of cached search tool results; the least recently used are evicted first.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_cache_path: str = field(
+        default="",
+        metadata={
+            "description": "The SQLite file used to persist search tool results across restarts and worker "
+            "processes. If left empty, results are only cached in memory for the life of the process.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    ingest_max_batch: int = field(
+        default=64,
+        metadata={
+            "description": "Concurrent document submissions are coalesced into one write, "
+            "flushed once this many documents are pending.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    ingest_max_delay_ms: float = field(
+        default=50.0,
+        metadata={
+            "description": "The longest time, in milliseconds, a submitted document waits "
+            "for others to join its batch before being written.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    coalesce_tool_calls: bool = field(
+        default=True,
+        metadata={
+            "description": "Share one execution between identical tool calls (same tool and arguments) "
+            "that are in flight at the same time, across parallel calls and concurrent runs. "
+            "Each call still gets its own ToolMessage.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_max_workers: int = field(
+        default=8,
+        metadata={
+            "description": "The size of the thread pool that runs tools without a native async "
+            "implementation (Wikipedia, Arxiv, the Python REPL), so they never block the event loop.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_concurrency_limits: dict[str, int] = field(
+        default_factory=dict,
+        metadata={
+            "description": "Per-tool limits on how many calls may run at once, by tool name, "
+            "e.g. {'Python_REPL': 2}. Overrides tool_default_concurrency.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_default_concurrency: int = field(
+        default=4,
+        metadata={
+            "description": "How many calls of each tool may run at once when tool_concurrency_limits "
+            "does not name it. 0 means no limit.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_timeouts: dict[str, float] = field(
+        default_factory=dict,
+        metadata={
+            "description": "Per-tool timeouts in seconds, by tool name. Overrides tool_default_timeout.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_default_timeout: float = field(
+        default=60.0,
+        metadata={
+            "description": "The longest time, in seconds, a tool call may run before the model is "
+            "told it timed out. 0 means no timeout.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_max_parallel_calls: int = field(
+        default=8,
+        metadata={
+            "description": "How many of the tool calls in one model response may run at once. "
+            "0 means no limit.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    tool_step_timeout: float = field(
+        default=90.0,
+        metadata={
+            "description": "The longest time, in seconds, the tools step waits for all the tool calls "
+            "of one model response. Calls still running are answered with timeout messages so "
+            "the agent can continue with the results it has. 0 means no deadline.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    python_sandbox_workers: int = field(
+        default=2,
+        metadata={
+            "description": "The number of pre-started worker processes that run Python REPL code.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    python_sandbox_max_tasks: int = field(
+        default=100,
+        metadata={
+            "description": "Replace each Python worker process after this many executions, so leaked "
+            "memory does not build up. 0 never replaces them.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    python_cpu_time_limit: float = field(
+        default=10.0,
+        metadata={
+            "description": "The CPU time, in seconds, one Python REPL execution may use. 0 means no limit.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    python_wall_time_limit: float = field(
+        default=30.0,
+        metadata={
+            "description": "The time, in seconds, one Python REPL execution may take before its worker "
+            "is stopped and replaced. 0 means no limit.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    python_memory_limit_mb: int = field(
+        default=512,
+        metadata={
+            "description": "The memory, in megabytes, one Python REPL execution may allocate. 0 means no limit.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    python_per_thread_state: bool = field(
+        default=False,
+        metadata={
+            "description": "Keep Python REPL variables between calls within a conversation (thread_id). "
+            "Otherwise every execution starts with a fresh interpreter namespace.",
+            "json_schema_extra": {"langgraph_nodes": ["tools"]},
+        },
+    )
+
+    max_prompt_tokens: int = field(
+        default=100_000,
+        metadata={
+            "description": "The token budget of each model call's prompt: the system prompt plus as much "
+            "recent history as fits after reserved_output_tokens. Older messages are left out; "
+            "tool calls stay with their results and the latest user message is always sent. "
+            "0 sends the full history.",
+            "json_schema_extra": {"langgraph_nodes": ["call_model"]},
+        },
+    )
+
+    reserved_output_tokens: int = field(
+        default=4096,
+        metadata={
+            "description": "Tokens of max_prompt_tokens kept free for the model's answer.",
+            "json_schema_extra": {"langgraph_nodes": ["call_model"]},
+        },
+    )
+
+    summarize_after_messages: int = field(
+        default=0,
+        metadata={
+            "description": "Once a thread holds more than this many messages, fold its older turns into a "
+            "running summary kept in the state, and remove them from the history. 0 disables summarization.",
+            "json_schema_extra": {"langgraph_nodes": ["summarize_conversation"]},
+        },
+    )
+
+    summary_keep_messages: int = field(
+        default=20,
+        metadata={
+            "description": "The number of recent messages kept in full when older turns are summarized.",
+            "json_schema_extra": {"langgraph_nodes": ["summarize_conversation"]},
+        },
+    )
+
+    summary_model: str = field(
+        default="",
+        metadata={
+            "description": "The model that writes conversation summaries, in the form provider:model-name. "
+            "A small, cheap model is usually enough. Empty uses the main model.",
+            "json_schema_extra": {"langgraph_nodes": ["summarize_conversation"]},
+        },
+    )
+
+    system_time_granularity: int = field(
+        default=60,
+        metadata={
+            "description": "Round the current time shown in the system prompt down to this many seconds. "
+            "Coarser values keep the rendered prompt identical across calls so provider-side "
+            "prompt caching can hit. Set to 0 to use the exact time.",
+            "json_schema_extra": {"langgraph_nodes": ["call_model"]},
+        },
+    )
+
     def __post_init__(self) -> None:
         """Fetch env vars for attributes that were not passed as args."""
+        import json
         import os
-        from dataclasses import fields
+        from dataclasses import MISSING, fields
 
         for f in fields(self):
             if not f.init:
@@ -60,6 +466,8 @@ class Context:
 
             current_value = getattr(self, f.name)
             default_value = f.default
+            if default_value is MISSING and f.default_factory is not MISSING:
+                default_value = f.default_factory()
             env_var_name = f.name.upper()
             env_value = os.environ.get(env_var_name)
 
@@ -72,5 +480,17 @@ class Context:
                     # Handle boolean environment variables
                     env_bool_value = env_value.lower() in ("true", "1", "yes", "on")
                     setattr(self, f.name, env_bool_value)
+                elif isinstance(default_value, int | float):
+                    # Numeric environment variables keep the field's type
+                    try:
+                        setattr(self, f.name, type(default_value)(env_value))
+                    except ValueError:
+                        setattr(self, f.name, env_value)
+                elif isinstance(default_value, list | dict):
+                    # Structured environment variables are JSON-encoded
+                    try:
+                        setattr(self, f.name, json.loads(env_value))
+                    except json.JSONDecodeError:
+                        setattr(self, f.name, env_value)
                 else:
                     setattr(self, f.name, env_value)
\ No newline at end of file
@@ -0,0 +1,279 @@
+"""A content-addressed embedding cache backed by SQLite."""
+
+import asyncio
+import hashlib
+import logging
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, List, Sequence, Tuple
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# SQLite caps the number of host parameters per statement.
+_SQL_CHUNK = 500
+
+# Recency updates from cache hits are written in batches, once this many are
+# waiting or the oldest has waited this long, rather than one write per hit.
+TOUCH_BATCH_SIZE = 256
+TOUCH_MAX_DELAY_SECONDS = 30.0
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text for cache lookups (Unicode NFC, collapsed whitespace)."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFC", text)).strip()
+
+
+def text_key(text: str) -> str:
+    """Return the content address of a text: the SHA-256 of its normalized form."""
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+def _as_float32(vector: Sequence[float]) -> List[float]:
+    """Round a vector to float32, the precision it is cached (and indexed) at."""
+    return array("f", vector).tolist()
+
+
+class EmbeddingCache:
+    """A persistent map from `(embedding model, text hash)` to embedding vector.
+
+    Vectors are stored as packed float32 in a SQLite database, either on disk
+    (so they survive restarts and are shared by worker processes) or in
+    memory when `path` is empty. When the cache grows past `max_entries`, the
+    least recently used entries are evicted. Hits update an entry's recency
+    in batches, so reads do not each take the database's write lock; the
+    row count is tracked as entries are added rather than counted per insert,
+    and recounted only when it may have reached the limit, since other
+    processes may share the file.
+
+    Args:
+        path: The SQLite database file, or "" / ":memory:" for an in-memory cache.
+        max_entries: The maximum number of vectors to keep.
+    """
+
+    def __init__(self, path: str = "", max_entries: int = 100_000) -> None:
+        """Open the cache, creating its database if needed."""
+        self.path = path or ":memory:"
+        self.max_entries = max(1, int(max_entries))
+        self.hits = 0
+        self.misses = 0
+        if self.path != ":memory:":
+            Path(self.path).expanduser().parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(Path(self.path).expanduser()) if self.path != ":memory:" else self.path,
+            check_same_thread=False,
+        )
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            if self.path != ":memory:":
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " model TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " vector BLOB NOT NULL,"
+                " last_used REAL NOT NULL,"
+                " PRIMARY KEY (model, key))"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+            )
+            (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        self._touched: Dict[Tuple[str, str], float] = {}
+        self._touched_since = 0.0
+
+    def _write_touches(self) -> None:
+        """Write pending recency updates. Called in a transaction with the lock held."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE model = ? AND key = ?",
+                [(stamp, model, key) for (model, key), stamp in self._touched.items()],
+            )
+            self._touched = {}
+
+    def get_many(self, model: str, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Return the cached vectors for `keys`, counting hits and misses."""
+        found: Dict[str, List[float]] = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), _SQL_CHUNK):
+                chunk = unique[start:start + _SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE model = ? AND key IN ({placeholders})",
+                    (model, *chunk),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+            if found:
+                now = time.time()
+                if not self._touched:
+                    self._touched_since = now
+                self._touched.update(((model, key), now) for key in found)
+                if len(self._touched) >= TOUCH_BATCH_SIZE or now - self._touched_since >= TOUCH_MAX_DELAY_SECONDS:
+                    with self._conn:
+                        self._write_touches()
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+        return found
+
+    def put_many(self, model: str, items: Sequence[Tuple[str, Sequence[float]]]) -> None:
+        """Store vectors for the given keys, evicting old entries if the cache is full."""
+        if not items:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            # A key addresses its content, so an existing row already holds the vector.
+            inserted = self._conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, key, vector, last_used) VALUES (?, ?, ?, ?)",
+                [(model, key, array("f", vector).tobytes(), now) for key, vector in items],
+            ).rowcount
+            self._touched.update(((model, key), now) for key, _ in items)
+            self._write_touches()
+            self._count += max(inserted, 0)
+            if self._count > self.max_entries:
+                (self._count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            if self._count > self.max_entries:
+                # Evict down to 90% of capacity so eviction is not paid on every insert.
+                excess = self._count - int(self.max_entries * 0.9)
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                )
+                self._count -= excess
+                logger.debug(f"Evicted {excess} entries from the embedding cache.")
+
+    def __len__(self) -> int:
+        """Return the number of cached vectors."""
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()
+        return int(count)
+
+    def stats(self) -> Dict[str, float]:
+        """Return hit/miss counters and the current size of the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self),
+        }
+
+    def flush(self) -> None:
+        """Write pending recency updates now."""
+        with self._lock, self._conn:
+            self._write_touches()
+
+    def close(self) -> None:
+        """Write pending recency updates and close the underlying database connection."""
+        with self._lock:
+            with self._conn:
+                self._write_touches()
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """Wraps an `Embeddings` model so repeated texts are served from an `EmbeddingCache`.
+
+    Documents and queries are cached apart, since asymmetric models (Gemini
+    task types, instruction-prefixed models) embed the same text differently
+    for each. Re-ingesting a document, or repeating a query, costs no
+    embedding request. Only cache misses are sent to the wrapped model,
+    deduplicated and in one call. Vectors are returned at float32 precision
+    whether or not they were cached, so a text always embeds to exactly the
+    same values.
+
+    Args:
+        embeddings: The embedding model to wrap.
+        cache: The cache to read from and write to.
+        model_name: Identifies the wrapped model, and any settings that change
+                    its vectors, in cache keys.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, model_name: str) -> None:
+        """Wrap `embeddings` so its vectors are read from and written to `cache`."""
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model_name = model_name
+        self._document_model = f"{model_name}|document"
+        self._query_model = f"{model_name}|query"
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents, requesting only the texts that are not cached."""
+        keys = [text_key(text) for text in texts]
+        vectors = self.cache.get_many(self._document_model, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            computed = self.embeddings.embed_documents(list(missing.values()))
+            fresh = [(key, _as_float32(vector)) for key, vector in zip(missing, computed)]
+            self.cache.put_many(self._document_model, fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, serving repeated queries from the cache."""
+        key = text_key(text)
+        cached = self.cache.get_many(self._query_model, [key]).get(key)
+        if cached is not None:
+            return cached
+        vector = _as_float32(self.embeddings.embed_query(text))
+        self.cache.put_many(self._query_model, [(key, vector)])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents through the wrapped model's async API, requesting only cache misses."""
+        keys = [text_key(text) for text in texts]
+        vectors = await asyncio.to_thread(self.cache.get_many, self._document_model, keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            computed = await self.embeddings.aembed_documents(list(missing.values()))
+            fresh = [(key, _as_float32(vector)) for key, vector in zip(missing, computed)]
+            await asyncio.to_thread(self.cache.put_many, self._document_model, fresh)
+            vectors.update(fresh)
+        return [vectors[key] for key in keys]
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query through the wrapped model's async API, serving repeats from the cache."""
+        key = text_key(text)
+        cached = (await asyncio.to_thread(self.cache.get_many, self._query_model, [key])).get(key)
+        if cached is not None:
+            return cached
+        vector = _as_float32(await self.embeddings.aembed_query(text))
+        await asyncio.to_thread(self.cache.put_many, self._query_model, [(key, vector)])
+        return vector
+
+
+# Caches shared per database path, so every store in the process uses one
+# connection and one eviction policy per file.
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(path: str = "", max_entries: int = 100_000) -> EmbeddingCache:
+    """Return the process-wide embedding cache for a database path.
+
+    The first call for a path sets its `max_entries`; later calls asking for
+    a different size get the same cache, with a warning.
+    """
+    key = path or ":memory:"
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = EmbeddingCache(path, max_entries)
+        elif cache.max_entries != max(1, int(max_entries)):
+            logger.warning(
+                f"Embedding cache {key} already holds up to {cache.max_entries} entries; "
+                f"ignoring max_entries={max_entries}."
+            )
+    return cache
+
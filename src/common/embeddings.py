@@ -0,0 +1,168 @@
+"""Embedding backends for the vector store, selected by a provider-prefixed string."""
+
+import hashlib
+import logging
+import math
+import re
+import unicodedata
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+# Output sizes of well-known remote models, so the store can size its index
+# without spending an embedding request on a probe.
+KNOWN_EMBEDDING_DIMENSIONS: Dict[str, int] = {
+    "openai:text-embedding-ada-002": 1536,
+    "openai:text-embedding-3-small": 1536,
+    "openai:text-embedding-3-large": 3072,
+    "gemini:models/embedding-001": 768,
+    "gemini:models/text-embedding-004": 768,
+}
+
+DEFAULT_HASHING_DIMENSION = 512
+
+_TOKEN = re.compile(r"\w+")
+
+
+@lru_cache(maxsize=65536)
+def _hash_feature(feature: str) -> int:
+    # blake2b rather than hash(), which is salted per process and would make
+    # vectors differ between restarts and workers.
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+class HashingEmbeddings(Embeddings):
+    """A local, dependency-free bag-of-n-grams embedding.
+
+    Each text is split into lowercase word tokens and the character trigrams
+    of each word. The features are hashed into `dimension` signed buckets,
+    counts are dampened with `log1p`, and the vector is L2-normalized. It
+    runs on the CPU in microseconds with no network access, at the cost of
+    matching on surface form rather than meaning.
+
+    Args:
+        dimension: The number of hash buckets, and so the vector size.
+    """
+
+    def __init__(self, dimension: int = DEFAULT_HASHING_DIMENSION) -> None:
+        """Create an embedder producing vectors of `dimension` floats."""
+        if dimension <= 0:
+            raise ValueError("dimension must be a positive integer.")
+        self.dimension = int(dimension)
+
+    def _features(self, text: str) -> List[str]:
+        features = []
+        for token in _TOKEN.findall(unicodedata.normalize("NFKC", text).lower()):
+            features.append(token)
+            padded = f"<{token}>"
+            features.extend(f"#{padded[i:i + 3]}" for i in range(len(padded) - 2))
+        return features
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimension
+        counts: Dict[str, int] = {}
+        for feature in self._features(text):
+            counts[feature] = counts.get(feature, 0) + 1
+        for feature, count in counts.items():
+            hashed = _hash_feature(feature)
+            sign = 1.0 if hashed >> 63 else -1.0
+            vector[hashed % self.dimension] += sign * math.log1p(count)
+        norm = math.sqrt(sum(v * v for v in vector))
+        return [v / norm for v in vector] if norm else vector
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents locally."""
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query locally."""
+        return self._embed(text)
+
+    # Hashing takes microseconds, far less than a hop to a worker thread.
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents locally."""
+        return self.embed_documents(texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query locally."""
+        return self.embed_query(text)
+
+
+def create_embeddings(embedding_string: str, dimension: Optional[int] = None) -> Embeddings:
+    """Create an embedding model from a provider-prefixed string.
+
+    Supported values are `openai:<model>`, `gemini:<model>`,
+    `ollama:<model>`, `huggingface:<model>` (requires the
+    `sentence-transformers` package), and `hashing`, a local vectorizer that
+    needs no network or extra packages.
+
+    Args:
+        embedding_string: The backend, e.g. "openai:text-embedding-3-small" or "hashing".
+        dimension: The requested output size, for backends that can produce
+                   more than one (`hashing` and OpenAI's text-embedding-3 models).
+
+    Returns:
+        The embedding model.
+    """
+    provider, _, model_name = embedding_string.partition(":")
+
+    if provider == "hashing":
+        return HashingEmbeddings(dimension or DEFAULT_HASHING_DIMENSION)
+
+    if not model_name:
+        raise ValueError(
+            f"Invalid embedding model string: '{embedding_string}'. "
+            "Expected format is 'provider:model_name', or 'hashing'."
+        )
+
+    if provider == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        if dimension and model_name.startswith("text-embedding-3"):
+            return OpenAIEmbeddings(model=model_name, dimensions=dimension)
+        return OpenAIEmbeddings(model=model_name)
+
+    elif provider == "gemini":
+        from langchain_google_genai import GoogleGenerativeAIEmbeddings
+
+        return GoogleGenerativeAIEmbeddings(model=model_name)
+
+    elif provider == "ollama":
+        from langchain_ollama import OllamaEmbeddings
+
+        return OllamaEmbeddings(model=model_name)
+
+    elif provider == "huggingface":
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+
+        return HuggingFaceEmbeddings(model_name=model_name)
+
+    else:
+        raise ValueError(
+            f"Unsupported embedding provider: '{provider}'. "
+            "Supported providers are 'openai', 'gemini', 'ollama', 'huggingface', 'hashing'."
+        )
+
+
+def get_embedding_dimension(embeddings: Embeddings, embedding_string: str = "") -> int:
+    """Return the output size of an embedding model.
+
+    The size is read from the model's configuration where it has one, then
+    looked up in `KNOWN_EMBEDDING_DIMENSIONS`, and only as a last resort
+    measured by embedding a short probe text.
+
+    Args:
+        embeddings: The embedding model.
+        embedding_string: The string the model was created from, if known.
+    """
+    for attribute in ("dimension", "dimensions", "size"):
+        value = getattr(embeddings, attribute, None)
+        if isinstance(value, int) and value > 0:
+            return value
+    if embedding_string in KNOWN_EMBEDDING_DIMENSIONS:
+        return KNOWN_EMBEDDING_DIMENSIONS[embedding_string]
+    logger.info(f"Probing the output size of embedding model '{embedding_string or type(embeddings).__name__}'.")
+    return len(embeddings.embed_query("dimension probe"))
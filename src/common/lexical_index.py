@@ -0,0 +1,157 @@
+"""An in-process BM25 index kept alongside the vector store, and rank fusion."""
+
+import heapq
+import math
+import re
+import unicodedata
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Okapi BM25 parameters: term frequency saturation and length normalization.
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+# The constant of reciprocal rank fusion; 60 is the value from the original paper.
+RRF_K = 60
+
+_WORD = re.compile(r"\w+")
+# Identifiers such as "INV-2024-001" or "v1.2.3" are also indexed whole, so
+# an exact ID outranks documents that only share its parts.
+_COMPOUND = re.compile(r"\w+(?:[-_./:#]\w+)+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase word tokens plus any whole compound identifiers."""
+    text = unicodedata.normalize("NFKC", text).lower()
+    return _WORD.findall(text) + _COMPOUND.findall(text)
+
+
+class _Postings:
+    """The documents containing one term, with array views built on demand."""
+
+    __slots__ = ("positions", "frequencies", "_arrays")
+
+    def __init__(self) -> None:
+        self.positions: List[int] = []
+        self.frequencies: List[int] = []
+        self._arrays: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def append(self, position: int, frequency: int) -> None:
+        self.positions.append(position)
+        self.frequencies.append(frequency)
+        self._arrays = None
+
+    def arrays(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        import numpy as np
+
+        if self._arrays is None:
+            self._arrays = (np.asarray(self.positions, dtype="int64"), np.asarray(self.frequencies, dtype="float32"))
+        return self._arrays
+
+
+class BM25Index:
+    """An inverted index that ranks documents by Okapi BM25.
+
+    Documents are identified by their position in the vector index, so
+    lexical and vector results can be fused and share the metadata filter.
+    Scoring touches only the postings of the query's terms, as numpy arrays,
+    so a lookup takes microseconds and needs no embedding call.
+
+    Not thread-safe; the vector store guards it with the collection's lock.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self._postings: Dict[str, _Postings] = {}
+        self._lengths: List[int] = []
+        self._length_array: Optional[np.ndarray] = None
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        """Return the number of indexed documents."""
+        return len(self._lengths)
+
+    def add(self, start: int, texts: Iterable[str]) -> None:
+        """Index documents stored at consecutive positions from `start`."""
+        for position, text in enumerate(texts, start=start):
+            if position != len(self._lengths):
+                raise ValueError(f"Expected the document at position {len(self._lengths)}, got {position}.")
+            tokens = tokenize(text)
+            counts: Dict[str, int] = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, count in counts.items():
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = _Postings()
+                postings.append(position, count)
+            self._lengths.append(len(tokens))
+            self._total_length += len(tokens)
+        self._length_array = None
+
+    def search(
+        self, query: str, k: int, ids: Optional[Union[Sequence[int], "np.ndarray"]] = None
+    ) -> List[Tuple[int, float]]:
+        """Return the `k` best-scoring documents for `query`.
+
+        Args:
+            query: The text to search for.
+            k: The number of results to return.
+            ids: If given, only these positions are considered.
+
+        Returns:
+            `(position, score)` pairs, best first. Documents sharing no term
+            with the query are never returned.
+        """
+        import numpy as np
+
+        count = len(self._lengths)
+        terms = [self._postings[term] for term in set(tokenize(query)) if term in self._postings]
+        if k <= 0 or not terms:
+            return []
+        if self._length_array is None:
+            self._length_array = np.asarray(self._lengths, dtype="float32")
+        average_length = self._total_length / count or 1.0
+
+        scores = np.zeros(count, dtype="float32")
+        for postings in terms:
+            positions, frequencies = postings.arrays()
+            idf = math.log(1 + (count - len(positions) + 0.5) / (len(positions) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * self._length_array[positions] / average_length)
+            # Positions are unique within a term's postings, so plain fancy indexing accumulates.
+            scores[positions] += idf * frequencies * (BM25_K1 + 1) / (frequencies + norm)
+
+        if ids is not None:
+            allowed = np.zeros(count, dtype=bool)
+            allowed[np.asarray(ids, dtype="int64")] = True
+            scores[~allowed] = 0.0
+        matches = np.flatnonzero(scores > 0)
+        if len(matches) > k:
+            matches = matches[np.argpartition(-scores[matches], k - 1)[:k]]
+        # Best score first, lower position first among ties.
+        matches = matches[np.lexsort((matches, -scores[matches]))]
+        return [(int(position), float(scores[position])) for position in matches]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], k: int, rrf_k: int = RRF_K) -> List[int]:
+    """Merge ranked lists of positions by reciprocal rank fusion.
+
+    Each position scores `1 / (rrf_k + rank)` in every list it appears in.
+    Only ranks are used, so lexical and vector scores, which are on
+    unrelated scales, never need to be normalized against each other.
+
+    Args:
+        rankings: Lists of positions, each ordered best first.
+        k: The number of positions to return.
+        rrf_k: The fusion constant; larger values flatten the rank weights.
+
+    Returns:
+        The `k` best positions, best first.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, position in enumerate(ranking, start=1):
+            scores[position] = scores.get(position, 0.0) + 1.0 / (rrf_k + rank)
+    return [position for position, _ in heapq.nlargest(k, scores.items(), key=lambda item: (item[1], -item[0]))]
@@ -0,0 +1,175 @@
+"""Fit the conversation history into the model's prompt token budget."""
+
+import json
+import logging
+from typing import Callable, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+
+from .cache import LRUCache
+from .utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+# Tokens each message costs on top of its content, for its role and framing.
+MESSAGE_OVERHEAD_TOKENS = 4
+
+# Appended to a tool result cut down to fit the budget.
+TRUNCATION_NOTE = "\n[... truncated to fit the context window]"
+
+# Cached token counts; a count is tied to the message's ID and size.
+_token_counts: LRUCache[Tuple[str, int, int], int] = LRUCache(maxsize=50_000)
+
+_counter: Optional[Callable[[str], int]] = None
+
+
+def _estimate_tokens(text: str) -> int:
+    # About four characters per token for English text.
+    return (len(text) + 3) // 4
+
+
+def _token_counter() -> Callable[[str], int]:
+    global _counter
+    if _counter is None:
+        try:
+            import tiktoken
+
+            encode = tiktoken.get_encoding("o200k_base").encode_ordinary
+            _counter = lambda text: len(encode(text))  # noqa: E731
+        except Exception:
+            # No tokenizer installed, or its data cannot be fetched.
+            _counter = _estimate_tokens
+    return _counter
+
+
+def count_text_tokens(text: str) -> int:
+    """Return the number of tokens in a text, exactly for OpenAI models and approximately for others."""
+    return _token_counter()(text) if text else 0
+
+
+def _message_text(message: BaseMessage) -> str:
+    text = get_message_text(message) if isinstance(message.content, list) else str(message.content)
+    if isinstance(message, AIMessage) and message.tool_calls:
+        text += json.dumps([[call["name"], call["args"]] for call in message.tool_calls], default=str)
+    return text
+
+
+def count_message_tokens(message: BaseMessage) -> int:
+    """Return the number of prompt tokens a message takes.
+
+    Counts are cached by message ID, so each message of a long thread is
+    tokenized once rather than on every model call.
+    """
+    text = _message_text(message)
+    if message.id is None:
+        return count_text_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+    # The size guards against a message being replaced under the same ID.
+    key = (message.id, len(text), len(getattr(message, "tool_calls", None) or ()))
+    tokens = _token_counts.get(key)
+    if tokens is None:
+        tokens = count_text_tokens(text) + MESSAGE_OVERHEAD_TOKENS
+        _token_counts.set(key, tokens)
+    return tokens
+
+
+def group_messages(messages: Sequence[BaseMessage]) -> List[List[BaseMessage]]:
+    """Split messages into units that are kept or dropped together."""
+    units: List[List[BaseMessage]] = []
+    pending: Set[Optional[str]] = set()
+    for message in messages:
+        # A tool result belongs with the message that requested it.
+        if isinstance(message, ToolMessage) and message.tool_call_id in pending:
+            units[-1].append(message)
+            pending.discard(message.tool_call_id)
+            continue
+        units.append([message])
+        pending = {call["id"] for call in message.tool_calls} if isinstance(message, AIMessage) else set()
+    return units
+
+
+def _truncate_text(text: str, max_tokens: int) -> str:
+    """Return the longest prefix of `text` that fits in `max_tokens`."""
+    end = len(text) * max_tokens // max(1, count_text_tokens(text))
+    while end > 0 and count_text_tokens(text[:end]) > max_tokens:
+        end = end * 9 // 10
+    return text[:end]
+
+
+def _fit_tool_results(unit: List[BaseMessage], budget: int) -> Optional[List[BaseMessage]]:
+    """Return `unit` with its tool results cut down to fit `budget`, or None if they cannot be.
+
+    The budget is shared fairly: results smaller than an even share are kept
+    whole, and the rest are cut to what remains, keeping their beginning.
+    """
+    tools = [i for i, message in enumerate(unit) if isinstance(message, ToolMessage)]
+    if not tools:
+        return None
+    # Each cut result pays for the note, plus a token for how it joins the text.
+    note = count_text_tokens(TRUNCATION_NOTE) + 1
+    available = budget - sum(
+        count_message_tokens(message) for message in unit if not isinstance(message, ToolMessage)
+    ) - len(tools) * (MESSAGE_OVERHEAD_TOKENS + note)
+    if available < len(tools):
+        return None
+    fitted = list(unit)
+    texts = {i: _message_text(unit[i]) for i in tools}
+    sizes = {i: count_text_tokens(texts[i]) for i in tools}
+    for n, i in enumerate(sorted(tools, key=sizes.__getitem__)):
+        share = available // (len(tools) - n)
+        if sizes[i] > share:
+            fitted[i] = unit[i].model_copy(update={"content": _truncate_text(texts[i], share) + TRUNCATION_NOTE})
+        available -= min(sizes[i], share)
+    return fitted
+
+
+def window_messages(messages: Sequence[BaseMessage], max_tokens: int) -> List[BaseMessage]:
+    """Return the most recent messages that fit in `max_tokens`.
+
+    Messages are dropped oldest first. An AI message that calls tools is
+    kept or dropped together with its tool results, so the model never sees
+    a call without its result or a result without its call. The latest user
+    message is always kept, even when it alone exceeds the budget, and the
+    window starts at a user message, as some providers require.
+
+    Tool calls made since the latest user message are never dropped for
+    want of room: their results are truncated to fit instead, since a model
+    that cannot see them would only call the same tools again.
+
+    Args:
+        messages: The conversation, oldest first, without the system prompt.
+        max_tokens: The token budget for the returned messages.
+
+    Returns:
+        The kept messages, in their original order.
+    """
+    units = group_messages(messages)
+    latest_user = next((i for i in range(len(units) - 1, -1, -1) if isinstance(units[i][0], HumanMessage)), None)
+    costs = [sum(count_message_tokens(m) for m in unit) for unit in units]
+    # The latest user message is paid for first, so it can never be crowded out.
+    budget = max_tokens - (costs[latest_user] if latest_user is not None else 0)
+
+    start = len(units)
+    while start > 0:
+        index = start - 1
+        cost = 0 if index == latest_user else costs[index]
+        if cost > budget:
+            in_current_turn = latest_user is None or index > latest_user
+            fitted = _fit_tool_results(units[index], budget) if in_current_turn else None
+            if fitted is None:
+                break
+            logger.debug(f"Truncated the tool results of a call to fit {budget} tokens.")
+            units[index] = fitted
+            cost = sum(count_message_tokens(m) for m in fitted)
+        budget -= cost
+        start = index
+
+    kept = list(range(start, len(units)))
+    if latest_user is not None and latest_user < start:
+        kept.insert(0, latest_user)
+    elif latest_user is not None:
+        # Open the window at a user message rather than mid-turn.
+        while kept and not isinstance(units[kept[0]][0], HumanMessage):
+            kept.pop(0)
+    if len(kept) < len(units):
+        logger.debug(f"Windowed the history from {len(units)} to {len(kept)} message groups for {max_tokens} tokens.")
+    return [message for index in kept for message in units[index]]
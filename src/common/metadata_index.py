@@ -0,0 +1,71 @@
+"""An inverted index over document metadata, used to pre-filter vector searches."""
+
+from collections.abc import Hashable
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional
+
+if TYPE_CHECKING:
+    import numpy as np
+
+
+def _values(value: Any) -> Iterable[Any]:
+    # List-valued metadata (e.g. tags) is indexed under each of its elements.
+    if isinstance(value, list | tuple | set | frozenset):
+        return value
+    return (value,)
+
+
+class MetadataIndex:
+    """Maps metadata `(key, value)` pairs to the index positions of the documents carrying them.
+
+    Filters are dicts of `{key: value}` conditions, all of which must hold.
+    A condition matches documents whose metadata value equals `value`, or,
+    when `value` is a list, tuple or set, equals any of its elements. A
+    document whose metadata value is itself a list matches if any element
+    does. Unhashable values are not indexed and never match.
+
+    Not thread-safe; the vector store guards it with the collection's lock.
+    """
+
+    def __init__(self) -> None:
+        """Create an empty index."""
+        self._postings: Dict[str, Dict[Hashable, List[int]]] = {}
+
+    def add(self, start: int, metadatas: Iterable[Optional[Mapping[str, Any]]]) -> None:
+        """Index the metadata of documents stored at consecutive positions from `start`."""
+        for position, metadata in enumerate(metadatas, start=start):
+            for key, value in (metadata or {}).items():
+                postings = self._postings.setdefault(key, {})
+                for item in _values(value):
+                    if isinstance(item, Hashable):
+                        postings.setdefault(item, []).append(position)
+
+    def positions(self, filter: Mapping[str, Any]) -> "np.ndarray":
+        """Return the sorted positions of the documents matching `filter`.
+
+        Args:
+            filter: The metadata conditions; must not be empty.
+
+        Returns:
+            An int64 array of matching positions.
+        """
+        import numpy as np
+
+        if not filter:
+            raise ValueError("filter must contain at least one condition.")
+        matches: List[np.ndarray] = []
+        for key, value in filter.items():
+            postings = self._postings.get(key, {})
+            wanted: List[int] = []
+            for item in _values(value):
+                if not isinstance(item, Hashable):
+                    raise ValueError(f"Filter value for '{key}' must be hashable, got {item!r}.")
+                wanted.extend(postings.get(item, ()))
+            matches.append(np.unique(np.asarray(wanted, dtype="int64")))
+        # Intersect the smallest sets first.
+        matches.sort(key=len)
+        result = matches[0]
+        for match in matches[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, match, assume_unique=True)
+        return result
@@ -1,17 +1,32 @@
 """Custom model integrations for the LangGraph agent."""
 
-import os
-from typing import Any, List
+import asyncio
+import inspect
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Set, Tuple, cast
 
 from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.runnables import Runnable
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_community.chat_models import ChatOllama
 
 from dotenv import load_dotenv
+
+from .cache import LRUCache
+
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Default bounds for the process-wide model pool.
+MODEL_POOL_MAX_SIZE = 16
+MODEL_POOL_IDLE_SECONDS = 900.0
+MODEL_POOL_MAX_BOUND_VARIANTS = 8
+
 def create_model(model_string: str, **kwargs: Any) -> BaseChatModel:
     """
     Create a chat model instance based on a provider-prefixed model string.
@@ -76,3 +91,167 @@ def get_supported_models() -> List[str]:
         "gemini:gemini-1.5-pro-latest",
         "gemini:gemini-1.5-flash-latest",
     ]
+
+
+# Keeps references to pending async client shutdowns so they are not
+# garbage-collected before they finish.
+_pending_closes: Set["asyncio.Task[Any]"] = set()
+
+
+def _run_detached(awaitable: Any) -> None:
+    """Schedule an awaitable on the running loop, or discard it if there is none."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # Async clients are bound to the loop that created them; without a
+        # running loop there is nothing safe to await them on.
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        return
+    task = loop.create_task(awaitable)
+    _pending_closes.add(task)
+    task.add_done_callback(_pending_closes.discard)
+
+
+def close_model_clients(model: BaseChatModel) -> None:
+    """Release the network clients owned by a chat model instance.
+
+    `ChatOpenAI` draws its HTTP clients from a process-wide pool maintained by
+    `langchain_openai`, and clients passed in through `http_client` belong to
+    the caller, so neither is closed here.
+
+    Args:
+        model: The chat model whose clients should be closed.
+    """
+    if isinstance(model, ChatOpenAI) or getattr(model, "http_client", None) is not None:
+        return
+
+    # Read the raw field values: some integrations expose lazily-created
+    # clients as properties, and we must not build a client just to close it.
+    fields = vars(model)
+    for attr in ("client", "async_client", "async_client_running"):
+        client = fields.get(attr)
+        if client is None:
+            continue
+        # SDK resource objects (e.g. `groq.Groq().chat.completions`) keep the
+        # owning client on `_client`.
+        root = getattr(client, "_client", client)
+        close = getattr(root, "close", None) or getattr(getattr(root, "transport", None), "close", None)
+        if not callable(close):
+            continue
+        try:
+            result = close()
+            if inspect.isawaitable(result):
+                _run_detached(result)
+        except Exception as e:
+            logger.debug(f"Failed to close {attr} of {type(model).__name__}: {e}")
+
+
+def _freeze(value: Any) -> Hashable:
+    """Convert keyword-argument values into a hashable, order-independent form."""
+    if isinstance(value, dict):
+        return tuple(sorted((str(k), _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list | tuple | set | frozenset):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr) if isinstance(value, set | frozenset) else items)
+    try:
+        hash(value)
+        return cast(Hashable, value)
+    except TypeError:
+        return repr(value)
+
+
+@dataclass
+class _PooledModel:
+    """A pooled model instance together with its memoized tool bindings."""
+
+    model: BaseChatModel
+    bound: LRUCache[str, Runnable[Any, Any]]
+
+
+class ModelPool:
+    """A bounded pool of chat model instances that keeps client connections warm.
+
+    Instances are keyed on `(provider, model_name, kwargs)`, so every step of a
+    run, and every run in the process, reuses the same client and its
+    keep-alive connections. Entries are evicted when the pool exceeds
+    `maxsize` or after `idle_ttl` seconds without use, and the clients of an
+    evicted model are closed. Each pooled model also memoizes its
+    `bind_tools` variants, keyed on a fingerprint of the tool set.
+
+    Args:
+        factory: Builds a new model from a model string and keyword arguments.
+        maxsize: The maximum number of model instances to keep.
+        idle_ttl: Seconds of inactivity after which an instance is evicted.
+        max_bound_variants: The maximum number of tool bindings kept per model.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[..., BaseChatModel],
+        maxsize: int = MODEL_POOL_MAX_SIZE,
+        idle_ttl: float = MODEL_POOL_IDLE_SECONDS,
+        max_bound_variants: int = MODEL_POOL_MAX_BOUND_VARIANTS,
+    ) -> None:
+        """Create an empty pool that builds models with `factory`."""
+        self._factory = factory
+        self._max_bound_variants = max_bound_variants
+        self._entries: LRUCache[Tuple[Hashable, ...], _PooledModel] = LRUCache(
+            maxsize=maxsize,
+            ttl=idle_ttl,
+            sliding=True,
+            on_evict=lambda key, entry: close_model_clients(entry.model),
+        )
+        # Serializes creation so concurrent callers never build (and then
+        # evict and close) duplicate instances for the same key.
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(model_string: str, kwargs: Dict[str, Any]) -> Tuple[Hashable, ...]:
+        """Return the pool key for a model string and its keyword arguments."""
+        provider, _, model_name = str(model_string).partition(":")
+        return (provider, model_name, _freeze(kwargs))
+
+    def _entry(self, model_string: str, kwargs: Dict[str, Any]) -> _PooledModel:
+        key = self.key(model_string, kwargs)
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                model = self._factory(model_string, **kwargs)
+                entry = _PooledModel(model=model, bound=LRUCache(maxsize=self._max_bound_variants))
+                self._entries.set(key, entry)
+                logger.info(f"Created pooled model instance for '{model_string}'.")
+        return entry
+
+    def get(self, model_string: str, **kwargs: Any) -> BaseChatModel:
+        """Return a pooled model instance, creating it on first use."""
+        return self._entry(model_string, kwargs).model
+
+    def get_bound(
+        self, model_string: str, tools: Sequence[Any], fingerprint: str, **kwargs: Any
+    ) -> Runnable[Any, Any]:
+        """Return a pooled model with `tools` bound, reusing a previous binding.
+
+        Args:
+            model_string: The 'provider:model_name' string.
+            tools: The tools to bind.
+            fingerprint: A stable fingerprint of `tools`, used as the memo key.
+            **kwargs: Extra model constructor arguments.
+        """
+        entry = self._entry(model_string, kwargs)
+        bound = entry.bound.get(fingerprint)
+        if bound is None:
+            bound = entry.model.bind_tools(tools)
+            entry.bound.set(fingerprint, bound)
+        return bound
+
+    def clear(self) -> None:
+        """Evict every pooled instance and close its clients."""
+        self._entries.invalidate()
+
+    def __len__(self) -> int:
+        """Return the number of pooled model instances."""
+        return len(self._entries)
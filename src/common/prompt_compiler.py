@@ -0,0 +1,203 @@
+"""Cached system-prompt rendering with a stable, cache-friendly prefix."""
+
+import logging
+import threading
+from datetime import UTC, datetime
+from string import Formatter
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import render_text_description
+
+from .cache import LRUCache
+from .context import Context
+from .prompts import VOLATILE_PROMPT_FIELDS
+from .utils import get_tool_fingerprint
+
+logger = logging.getLogger(__name__)
+
+
+def _escape(literal: str) -> str:
+    return literal.replace("{", "{{").replace("}", "}}")
+
+
+def split_template(template: str) -> Tuple[str, str]:
+    """Split a format template into a static prefix and a volatile suffix.
+
+    The split happens at the first volatile field (see
+    `prompts.VOLATILE_PROMPT_FIELDS`). Both halves are returned as format
+    templates, so `prefix.format(**values) + suffix.format(**values)` equals
+    `template.format(**values)`.
+
+    Args:
+        template: A `str.format` template.
+
+    Returns:
+        A `(prefix_template, suffix_template)` tuple. The suffix is empty when
+        the template has no volatile fields.
+    """
+    prefix: list[str] = []
+    suffix: list[str] = []
+    target = prefix
+    for literal, field_name, format_spec, conversion in Formatter().parse(template):
+        target.append(_escape(literal))
+        if field_name is None:
+            continue
+        if target is prefix and field_name.split(".")[0].split("[")[0] in VOLATILE_PROMPT_FIELDS:
+            target = suffix
+        field = field_name
+        if conversion:
+            field += f"!{conversion}"
+        if format_spec:
+            field += f":{format_spec}"
+        target.append("{" + field + "}")
+    return "".join(prefix), "".join(suffix)
+
+
+def format_system_time(granularity: int, now: Optional[datetime] = None) -> str:
+    """Return the current UTC time in ISO format, rounded down to `granularity` seconds.
+
+    Args:
+        granularity: The rounding step in seconds; 0 or less keeps full precision.
+        now: The time to format, defaulting to the current time.
+    """
+    now = now or datetime.now(tz=UTC)
+    if granularity > 0:
+        timestamp = now.timestamp()
+        now = datetime.fromtimestamp(timestamp - timestamp % granularity, tz=UTC)
+    return now.isoformat()
+
+
+class PromptCompiler:
+    """Renders system prompts while caching everything that does not change per call.
+
+    The rendered tool descriptions are cached by tool-set fingerprint, which
+    `get_tool_fingerprint` looks up by tool identity, so a render never
+    rebuilds the tools' schemas. Each `(template, tool set)` pair is compiled
+    once into a pre-rendered static prefix plus a small suffix template
+    holding the volatile fields.
+    Only the suffix is formatted per call, and because it sits at the end of
+    the prompt, the large prefix stays byte-identical across calls.
+
+    Args:
+        maxsize: The maximum number of tool texts and compiled prompts to keep.
+    """
+
+    def __init__(self, maxsize: int = 32) -> None:
+        """Create a compiler with empty caches."""
+        self._tool_texts: LRUCache[str, str] = LRUCache(maxsize=maxsize)
+        self._compiled: LRUCache[Tuple[str, str], Tuple[str, str]] = LRUCache(maxsize=maxsize)
+
+    def tool_text(self, tools: Sequence[Any], fingerprint: Optional[str] = None) -> str:
+        """Return the rendered tool descriptions for `tools`, rendering them at most once."""
+        fingerprint = fingerprint or get_tool_fingerprint(tools)
+        text = self._tool_texts.get(fingerprint)
+        if text is None:
+            text = render_text_description(list(tools))
+            self._tool_texts.set(fingerprint, text)
+        return text
+
+    def compile(
+        self, template: str, tools: Sequence[Any], fingerprint: Optional[str] = None
+    ) -> Tuple[str, str]:
+        """Return the pre-rendered prefix and the suffix template for a prompt.
+
+        Args:
+            template: The system prompt template.
+            tools: The tools whose descriptions fill the `{tools}` field.
+            fingerprint: The precomputed fingerprint of `tools`, if available.
+
+        Returns:
+            A `(rendered_prefix, suffix_template)` tuple.
+        """
+        fingerprint = fingerprint or get_tool_fingerprint(tools)
+        key = (template, fingerprint)
+        compiled = self._compiled.get(key)
+        if compiled is None:
+            prefix_template, suffix_template = split_template(template)
+            static_values = {"tools": self.tool_text(tools, fingerprint)}
+            compiled = (prefix_template.format(**static_values), suffix_template)
+            self._compiled.set(key, compiled)
+        return compiled
+
+    def render(
+        self,
+        template: str,
+        tools: Sequence[Any],
+        *,
+        granularity: int = 60,
+        now: Optional[datetime] = None,
+    ) -> str:
+        """Render a system prompt.
+
+        Args:
+            template: The system prompt template.
+            tools: The tools whose descriptions fill the `{tools}` field.
+            granularity: The rounding step for `{system_time}` in seconds.
+            now: The time to render, defaulting to the current time.
+
+        Returns:
+            The fully rendered prompt.
+        """
+        fingerprint = get_tool_fingerprint(tools)
+        prefix, suffix_template = self.compile(template, tools, fingerprint)
+        if not suffix_template:
+            return prefix
+        return prefix + suffix_template.format(
+            tools=self.tool_text(tools, fingerprint),
+            system_time=format_system_time(granularity, now),
+        )
+
+
+_compiler = PromptCompiler()
+
+
+def render_system_prompt(context: Context, tools: Sequence[Any]) -> str:
+    """Render the context's system prompt for the given tools.
+
+    Args:
+        context: The agent context providing the template and time granularity.
+        tools: The tools available to the agent.
+
+    Returns:
+        The rendered system prompt.
+    """
+    return _compiler.render(
+        context.system_prompt, tools, granularity=int(context.system_time_granularity)
+    )
+
+
+# Process-wide prefix-cache statistics, as reported by providers.
+_cache_stats: Dict[str, int] = {"calls": 0, "input_tokens": 0, "cached_tokens": 0}
+_cache_stats_lock = threading.Lock()
+
+
+def record_prompt_cache_usage(response: AIMessage) -> Optional[int]:
+    """Record how many prompt tokens the provider served from its prefix cache.
+
+    Args:
+        response: The model response, whose `usage_metadata` may carry
+                  `input_token_details.cache_read`.
+
+    Returns:
+        The number of cached prompt tokens, or None if the provider did not report it.
+    """
+    usage = getattr(response, "usage_metadata", None)
+    if not isinstance(usage, dict):
+        return None
+    cached_tokens = (usage.get("input_token_details") or {}).get("cache_read")
+    if cached_tokens is None:
+        return None
+    input_tokens = usage.get("input_tokens", 0)
+    with _cache_stats_lock:
+        _cache_stats["calls"] += 1
+        _cache_stats["input_tokens"] += input_tokens
+        _cache_stats["cached_tokens"] += cached_tokens
+    logger.debug(f"Prompt cache hit: {cached_tokens}/{input_tokens} input tokens served from cache.")
+    return int(cached_tokens)
+
+
+def get_prompt_cache_stats() -> Dict[str, int]:
+    """Return a snapshot of the provider-reported prefix-cache statistics."""
+    with _cache_stats_lock:
+        return dict(_cache_stats)
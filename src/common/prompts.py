@@ -1,5 +1,10 @@
 """Default prompts used by the agent."""
 
+# Fields whose values change from call to call. Templates should place them
+# as late as possible so the rendered prefix stays byte-identical across calls
+# and can be served from the provider's prompt cache.
+VOLATILE_PROMPT_FIELDS = frozenset({"system_time"})
+
 SYSTEM_PROMPT = """You are a helpful and powerful AI assistant, designed to answer questions and complete tasks. You operate in a loop of Thought, Action, Observation.
 
 Your goal is to answer the user's request accurately and efficiently. To do this, you have access to a set of tools.
@@ -25,7 +30,23 @@ TOOLS AVAILABLE
 You can use any of the following tools:
 {tools}
 IMPORTANT INSTRUCTIONS
-Current Time: {system_time}. You can use this for any time-sensitive queries.
 Tool Inputs: The tool_input must be a valid JSON object.
 Accuracy: Do not make up information. Rely on the tools to find the most up-to-date and accurate facts.
+Current Time: {system_time}. You can use this for any time-sensitive queries.
 Begin!"""
+
+SUMMARY_PROMPT = """You maintain a running summary of a conversation between a user and an AI assistant that uses tools.
+
+Current summary:
+{summary}
+
+New messages to fold into the summary:
+{transcript}
+
+Write the updated summary. Keep every fact, figure, name, decision, open question and user preference that later turns may depend on, including the key findings from tool results; drop pleasantries and repetition. Write it as concise notes in the third person. Reply with the summary only."""
+
+# Appended to the rendered system prompt, after its cacheable prefix.
+CONVERSATION_SUMMARY = """
+
+Summary of the earlier conversation, which is no longer shown in full:
+{summary}"""
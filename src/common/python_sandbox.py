@@ -0,0 +1,464 @@
+"""A pool of pre-started worker processes that run the agent's Python code."""
+
+import atexit
+import builtins
+import contextlib
+import importlib
+import io
+import logging
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForToolRun,
+    CallbackManagerForToolRun,
+)
+from langchain_core.runnables.config import ensure_config, run_in_executor
+from langchain_core.tools import ToolException
+from langchain_experimental.tools import PythonREPLTool
+from langchain_experimental.tools.python.tool import sanitize_input
+from pydantic import BaseModel, Field
+
+try:
+    import resource
+except ImportError:  # Not available on Windows; limits are then only enforced by wall clock.
+    resource = None  # type: ignore[assignment]
+
+logger = logging.getLogger(__name__)
+
+# Imported by every worker before it takes work, so code using them starts at once.
+# Modules that are not installed are skipped.
+DEFAULT_PRELOAD_MODULES: Tuple[str, ...] = (
+    "collections", "datetime", "decimal", "fractions", "functools", "itertools",
+    "json", "math", "random", "re", "statistics", "numpy",
+)
+
+# Output past this many characters is cut, so a runaway print cannot flood the prompt.
+MAX_OUTPUT_CHARS = 20_000
+
+# Interpreter sessions each worker keeps; the least recently used are dropped first.
+MAX_SESSIONS_PER_WORKER = 64
+
+# Sessions remembered as reset by a worker restart, to tell their next call.
+MAX_LOST_SESSIONS = 4096
+
+
+class _CPUTimeExceeded(BaseException):
+    """Raised in a worker when the code it runs exceeds its CPU time."""
+
+
+def _on_cpu_limit(signum: int, frame: Any) -> None:
+    raise _CPUTimeExceeded()
+
+
+def _cpu_seconds() -> float:
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def _address_space_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return 0
+
+
+def _set_cpu_limit(seconds: Optional[float]) -> None:
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = hard if seconds is None else math.ceil(_cpu_seconds() + seconds)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _execute(code: str, namespace: Dict[str, Any], cpu_time_limit: float) -> Tuple[str, str]:
+    """Run code in a namespace, returning a status and what it printed."""
+    output = io.StringIO()
+    status = "ok"
+    if resource is not None and cpu_time_limit > 0:
+        _set_cpu_limit(cpu_time_limit)
+    try:
+        with contextlib.redirect_stdout(output):
+            exec(code, namespace)
+    except _CPUTimeExceeded:
+        status = "cpu"
+    except MemoryError:
+        status = "memory"
+    except Exception as e:
+        # Reported to the model as output, like the in-process REPL does.
+        output.write(repr(e))
+    finally:
+        if resource is not None and cpu_time_limit > 0:
+            _set_cpu_limit(None)
+    text = output.getvalue()
+    if len(text) > MAX_OUTPUT_CHARS:
+        text = text[:MAX_OUTPUT_CHARS] + f"\n... [output truncated at {MAX_OUTPUT_CHARS} characters]"
+    return status, text
+
+
+def _worker_main(conn: Any, preload: Sequence[str], memory_limit_mb: int) -> None:
+    """Serve execution requests from the parent until the pipe closes."""
+    # Interrupts are the parent's to handle; it stops workers itself.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for module in preload:
+        try:
+            importlib.import_module(module)
+        except ImportError:
+            pass
+    if resource is not None:
+        signal.signal(signal.SIGXCPU, _on_cpu_limit)
+        if memory_limit_mb > 0:
+            # Headroom on top of the warmed-up worker, whose size depends on what it preloaded.
+            limit = _address_space_bytes() + memory_limit_mb * 1024 * 1024
+            _, hard = resource.getrlimit(resource.RLIMIT_AS)
+            if hard == resource.RLIM_INFINITY or limit < hard:
+                resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+    sessions: OrderedDict[str, Dict[str, Any]] = OrderedDict()
+    conn.send(("ready", ""))
+    while True:
+        try:
+            request = conn.recv()
+        except (EOFError, OSError):
+            return
+        if request is None:
+            return
+        code, session, cpu_time_limit = request
+        if session is None:
+            namespace = {"__name__": "__main__", "__builtins__": builtins}
+        else:
+            namespace = sessions.pop(session, {}) or {"__name__": "__main__", "__builtins__": builtins}
+            sessions[session] = namespace
+            while len(sessions) > MAX_SESSIONS_PER_WORKER:
+                sessions.popitem(last=False)
+        conn.send(_execute(code, namespace, cpu_time_limit))
+
+
+@dataclass(eq=False)
+class _Worker:
+    process: Any
+    conn: Any
+    ready: bool = False
+    executions: int = 0
+    busy: bool = False
+    sessions: Set[str] = field(default_factory=set)
+
+
+class PythonSandbox:
+    """Runs Python code in a pool of pre-started worker processes.
+
+    Workers import common modules before taking work, so a call pays no
+    interpreter start-up, and calls run in parallel across cores without
+    holding the agent's GIL. Each call is limited in CPU time (enforced in the
+    worker with `RLIMIT_CPU`), wall-clock time (the parent kills the worker)
+    and memory (`RLIMIT_AS`, as headroom over the warmed-up worker). A killed
+    worker is replaced at once, and every worker is replaced after
+    `max_tasks_per_worker` calls so leaked memory and state do not build up.
+
+    Calls with a `session` key keep their interpreter state between calls:
+    the session stays on one worker, and its calls wait for that worker.
+    State is lost when the worker is replaced, which the session's next call
+    is told about.
+
+    The limits guard the agent against runaway code, not against hostile
+    code: workers run as the agent's user. CPU and memory limits need the
+    `resource` module, so on Windows only the wall-clock limit applies.
+
+    Args:
+        max_workers: The number of worker processes.
+        max_tasks_per_worker: Calls after which a worker is replaced; 0 for never.
+        cpu_time_limit: CPU seconds a call may use; 0 for no limit.
+        wall_time_limit: Seconds a call may take; 0 for no limit.
+        memory_limit_mb: Megabytes a call may allocate; 0 for no limit.
+        preload: Modules every worker imports at start-up.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        max_tasks_per_worker: int = 100,
+        cpu_time_limit: float = 10.0,
+        wall_time_limit: float = 30.0,
+        memory_limit_mb: int = 512,
+        preload: Sequence[str] = DEFAULT_PRELOAD_MODULES,
+    ) -> None:
+        """Set up the sandbox; its workers start on first use (see `start`)."""
+        self.max_workers = max(1, int(max_workers))
+        self.max_tasks_per_worker = int(max_tasks_per_worker)
+        self.cpu_time_limit = float(cpu_time_limit)
+        self.wall_time_limit = float(wall_time_limit)
+        self.memory_limit_mb = int(memory_limit_mb)
+        self.preload = tuple(preload)
+        self._workers: List[_Worker] = []
+        self._sessions: Dict[str, _Worker] = {}
+        self._lost_sessions: Set[str] = set()
+        self._cond = threading.Condition()
+        self._started = False
+        self._closed = False
+        self.executions = 0
+        self.restarts = 0
+
+    @staticmethod
+    def _mp_context() -> Any:
+        methods = multiprocessing.get_all_start_methods()
+        if "forkserver" not in methods:
+            return multiprocessing.get_context("spawn")
+        context = multiprocessing.get_context("forkserver")
+        # Workers are forked from a server that already imported this module,
+        # and with it the agent's packages, instead of importing them each time.
+        context.set_forkserver_preload([__name__])
+        return context
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = multiprocessing.Pipe()
+        process = self._mp_context().Process(
+            target=_worker_main,
+            args=(child_conn, self.preload, self.memory_limit_mb),
+            name="python-sandbox",
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        return _Worker(process, parent_conn)
+
+    def start(self) -> None:
+        """Start the workers without waiting for them to be ready.
+
+        Workers warm up in the background; a call that reaches a worker
+        still importing its modules waits for it. Safe to call more than once.
+        """
+        with self._cond:
+            if self._started or self._closed:
+                return
+            self._started = True
+            self._workers = [self._spawn() for _ in range(self.max_workers)]
+
+    def _acquire(self, session: Optional[str], deadline: Optional[float]) -> Optional[_Worker]:
+        with self._cond:
+            while not self._closed:
+                worker = self._sessions.get(session) if session is not None else None
+                if worker is None:
+                    idle = [w for w in self._workers if not w.busy]
+                    # New sessions go to the worker holding the fewest.
+                    worker = min(idle, key=lambda w: len(w.sessions), default=None)
+                    if worker is not None and session is not None:
+                        self._sessions[session] = worker
+                        worker.sessions.add(session)
+                if worker is not None and not worker.busy:
+                    worker.busy = True
+                    return worker
+                timeout = None if deadline is None else deadline - time.monotonic()
+                if timeout is not None and timeout <= 0:
+                    return None
+                self._cond.wait(timeout)
+        raise RuntimeError("The Python sandbox is closed.")
+
+    def _retire(self, worker: _Worker) -> bool:
+        """Take a worker out of the pool. Called with the condition held.
+
+        Returns whether a replacement should be started, which, like stopping
+        the worker, happens after the condition is released (see `_replace`).
+        """
+        for session in worker.sessions:
+            self._sessions.pop(session, None)
+            self._lost_sessions.add(session)
+        if len(self._lost_sessions) > MAX_LOST_SESSIONS:
+            self._lost_sessions.clear()
+        if worker not in self._workers:
+            return False
+        self._workers.remove(worker)
+        return not self._closed
+
+    @staticmethod
+    def _stop(worker: _Worker) -> None:
+        try:
+            worker.conn.send(None)
+        except (OSError, ValueError):
+            pass
+        worker.conn.close()
+        if worker.process.is_alive():
+            worker.process.kill()
+        worker.process.join(timeout=1)
+
+    def _replace(self, worker: _Worker, respawn: bool) -> None:
+        """Stop a retired worker and start its replacement, without the condition held."""
+        self._stop(worker)
+        if not respawn:
+            return
+        fresh = self._spawn()
+        with self._cond:
+            if not self._closed:
+                self._workers.append(fresh)
+                self.restarts += 1
+                self._cond.notify_all()
+                return
+        # Closed while the replacement was starting.
+        self._stop(fresh)
+
+    def _release(self, worker: _Worker, replace: bool) -> None:
+        respawn = False
+        with self._cond:
+            worker.busy = False
+            if replace:
+                respawn = self._retire(worker)
+            self._cond.notify_all()
+        if replace:
+            self._replace(worker, respawn)
+
+    def execute(self, code: str, session: Optional[str] = None) -> str:
+        """Run code in a worker and return what it printed.
+
+        Exceptions raised by the code are returned as their repr, like the
+        in-process REPL does.
+
+        Args:
+            code: The Python code to run.
+            session: A key whose interpreter state is kept between calls, or
+                     None to run in a fresh namespace.
+
+        Raises:
+            ToolException: If the code exceeds a limit or kills its worker.
+        """
+        self.start()
+        wall = self.wall_time_limit if self.wall_time_limit > 0 else None
+        deadline = None if wall is None else time.monotonic() + wall
+        worker = self._acquire(session, deadline)
+        if worker is None:
+            raise ToolException(f"No Python worker became free within {wall:g} seconds.")
+        with self._cond:
+            lost = session is not None and session in self._lost_sessions
+            if session is not None:
+                self._lost_sessions.discard(session)
+
+        replace = True
+        try:
+            if not worker.ready:
+                # Started in the background; wait out the rest of its warm-up.
+                try:
+                    worker.conn.recv()
+                except (EOFError, OSError):
+                    raise ToolException("The Python worker failed to start.") from None
+                worker.ready = True
+            worker.conn.send((code, session, self.cpu_time_limit))
+            # The deadline also covered waiting for a worker, so wait only for what is left of it.
+            if not worker.conn.poll(None if deadline is None else max(0.0, deadline - time.monotonic())):
+                raise ToolException(
+                    f"Execution exceeded the {wall:g}-second time limit and was stopped. "
+                    "Interpreter state was reset."
+                )
+            status: str
+            output: str
+            status, output = worker.conn.recv()
+            worker.executions += 1
+            self.executions += 1
+            replace = 0 < self.max_tasks_per_worker <= worker.executions
+        except (EOFError, OSError):
+            raise ToolException(
+                "The Python worker exited while running the code, likely from running out of "
+                f"memory ({self.memory_limit_mb} MB limit). Interpreter state was reset."
+            ) from None
+        finally:
+            self._release(worker, replace)
+
+        if status == "cpu":
+            raise ToolException(f"Execution exceeded the {self.cpu_time_limit:g}-second CPU time limit.")
+        if status == "memory":
+            raise ToolException(f"Execution exceeded the {self.memory_limit_mb} MB memory limit.")
+        if lost:
+            output = "[Note: the interpreter was restarted; earlier variables are gone.]\n" + output
+        return output
+
+    def close(self) -> None:
+        """Stop every worker."""
+        with self._cond:
+            self._closed = True
+            workers = list(self._workers)
+            for worker in workers:
+                self._retire(worker)
+            self._cond.notify_all()
+        for worker in workers:
+            self._stop(worker)
+
+
+# Sandboxes shared per configuration, so every tool set in the process uses one pool.
+_sandboxes: Dict[Tuple[Any, ...], PythonSandbox] = {}
+_sandboxes_lock = threading.Lock()
+
+
+def get_python_sandbox(
+    max_workers: int = 2,
+    max_tasks_per_worker: int = 100,
+    cpu_time_limit: float = 10.0,
+    wall_time_limit: float = 30.0,
+    memory_limit_mb: int = 512,
+) -> PythonSandbox:
+    """Return the process-wide sandbox for a configuration, starting its workers in the background."""
+    key = (int(max_workers), int(max_tasks_per_worker), float(cpu_time_limit), float(wall_time_limit), int(memory_limit_mb))
+    with _sandboxes_lock:
+        sandbox = _sandboxes.get(key)
+        if sandbox is None:
+            sandbox = _sandboxes[key] = PythonSandbox(*key)
+            # Starting the fork server takes a moment; callers should not wait on it.
+            threading.Thread(target=sandbox.start, name="python-sandbox-start", daemon=True).start()
+    return sandbox
+
+
+@atexit.register
+def _close_sandboxes() -> None:
+    with _sandboxes_lock:
+        for sandbox in _sandboxes.values():
+            sandbox.close()
+        _sandboxes.clear()
+
+
+class PythonInput(BaseModel):
+    """The arguments of the Python REPL tool."""
+
+    query: str = Field(description="The Python code to run.")
+
+
+class SandboxedPythonREPLTool(PythonREPLTool):
+    """`PythonREPLTool` that runs code in a `PythonSandbox` instead of the agent process.
+
+    With `per_thread_state`, each conversation keeps its own variables between
+    calls, keyed by the run's `thread_id`; otherwise every call starts fresh.
+    """
+
+    # Declared explicitly, so the argument the model fills in is described.
+    args_schema: type[BaseModel] = PythonInput
+    sandbox: Optional[PythonSandbox] = Field(default=None, exclude=True)
+    per_thread_state: bool = False
+
+    def _session(self) -> Optional[str]:
+        """Return the session of the current run: its thread ID with `per_thread_state`, else None."""
+        if not self.per_thread_state:
+            return None
+        # The tool runs inside its invocation's config context.
+        thread_id = (ensure_config().get("configurable") or {}).get("thread_id")
+        return None if thread_id is None else str(thread_id)
+
+    def _run(
+        self,
+        query: str,
+        run_manager: Optional[CallbackManagerForToolRun] = None,
+    ) -> Any:
+        if self.sanitize_input:
+            query = sanitize_input(query)
+        return (self.sandbox or get_python_sandbox()).execute(query, self._session())
+
+    async def _arun(
+        self,
+        query: str,
+        run_manager: Optional[AsyncCallbackManagerForToolRun] = None,
+    ) -> Any:
+        # The parent side only waits on a pipe, so a thread is enough; it
+        # inherits this context, and with it the run's config.
+        return await run_in_executor(None, self._run, query)
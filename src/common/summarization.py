@@ -0,0 +1,82 @@
+"""Fold older conversation turns into a running summary."""
+
+import json
+import logging
+from typing import Any, List, Sequence
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langgraph.constants import TAG_NOSTREAM
+
+from . import prompts
+from .message_window import group_messages
+from .utils import get_message_text
+
+logger = logging.getLogger(__name__)
+
+# Each message is cut to this many characters in the transcript sent to the
+# summary model, so one large tool result cannot dominate the summary call.
+MAX_TRANSCRIPT_MESSAGE_CHARS = 2_000
+
+
+def select_messages_to_fold(messages: Sequence[BaseMessage], keep: int) -> List[BaseMessage]:
+    """Return the oldest messages to fold into the summary, leaving about `keep`.
+
+    The cut falls just before a user message, so the kept history starts a
+    turn and never separates a tool call from its results. If no user message
+    leaves at least `keep` messages, nothing is folded.
+
+    Args:
+        messages: The conversation, oldest first.
+        keep: The minimum number of recent messages to leave in place.
+    """
+    cut = 0
+    position = 0
+    for unit in group_messages(messages):
+        if len(messages) - position < keep:
+            break
+        if isinstance(unit[0], HumanMessage):
+            cut = position
+        position += len(unit)
+    return list(messages[:cut])
+
+
+def _truncate(text: str) -> str:
+    if len(text) <= MAX_TRANSCRIPT_MESSAGE_CHARS:
+        return text
+    return text[:MAX_TRANSCRIPT_MESSAGE_CHARS] + " [...]"
+
+
+def format_transcript(messages: Sequence[BaseMessage]) -> str:
+    """Render messages as a plain-text transcript for the summary model."""
+    lines = []
+    for message in messages:
+        text = _truncate(get_message_text(message))
+        if isinstance(message, HumanMessage):
+            lines.append(f"User: {text}")
+        elif isinstance(message, AIMessage):
+            if text:
+                lines.append(f"Assistant: {text}")
+            for call in message.tool_calls:
+                lines.append(f"Assistant called {call['name']} with {_truncate(json.dumps(call['args'], default=str))}")
+        elif isinstance(message, ToolMessage):
+            lines.append(f"{message.name or 'Tool'} returned: {text}")
+    return "\n".join(lines)
+
+
+async def update_summary(model: Any, summary: str, messages: Sequence[BaseMessage]) -> str:
+    """Return `summary` extended with `messages`.
+
+    Only the new messages and the previous summary are sent, so the cost of
+    each update does not grow with the length of the thread.
+
+    Args:
+        model: The chat model that writes the summary.
+        summary: The running summary so far, or "" for none.
+        messages: The messages to fold in.
+    """
+    prompt = prompts.SUMMARY_PROMPT.format(summary=summary or "(none yet)", transcript=format_transcript(messages))
+    # Tagged so the summary's tokens stay out of the graph's "messages" stream,
+    # which end users see; only the agent's own reply is streamed.
+    response = await model.ainvoke([{"role": "user", "content": prompt}], config={"tags": [TAG_NOSTREAM]})
+    logger.debug(f"Folded {len(messages)} messages into the conversation summary.")
+    return get_message_text(response).strip()
@@ -0,0 +1,348 @@
+"""A TTL/LRU cache for the results of the agent's external search tools."""
+
+import asyncio
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    ClassVar,
+    Dict,
+    Mapping,
+    Optional,
+    Protocol,
+    Tuple,
+    cast,
+)
+
+from langchain_community.tools import ArxivQueryRun, WikipediaQueryRun
+from langchain_core.runnables.config import run_in_executor
+from langchain_tavily import TavilySearch
+from pydantic import BaseModel, ConfigDict, Field
+
+from .cache import LRUCache
+from .embedding_cache import normalize_text
+from .tool_node import has_native_async
+
+if TYPE_CHECKING:
+    from langchain_core.tools import BaseTool
+
+logger = logging.getLogger(__name__)
+
+# How long, in seconds, each tool's results stay fresh. Web search results
+# change by the hour; encyclopedia and paper abstracts rarely do.
+DEFAULT_TOOL_CACHE_TTLS: Dict[str, float] = {
+    "tavily_search": 600.0,
+    "wikipedia": 86_400.0,
+    "arxiv": 86_400.0,
+}
+
+_MISSING = object()
+
+
+def resolve_tool_cache_ttls(overrides: Optional[Mapping[str, float]] = None) -> Dict[str, float]:
+    """Return `DEFAULT_TOOL_CACHE_TTLS` updated with per-tool overrides."""
+    ttls = dict(DEFAULT_TOOL_CACHE_TTLS)
+    ttls.update({name: float(ttl) for name, ttl in (overrides or {}).items()})
+    return ttls
+
+
+def _normalize(value: Any) -> Any:
+    # Queries differing only in case or whitespace return the same results.
+    if isinstance(value, str):
+        return normalize_text(value).casefold()
+    if isinstance(value, Mapping):
+        return {str(k): _normalize(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list | tuple):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def tool_cache_key(tool_name: str, arguments: Mapping[str, Any], scope: Optional[Mapping[str, Any]] = None) -> str:
+    """Return the cache key of a tool call.
+
+    Arguments are normalized (Unicode NFC, collapsed whitespace, case-folded
+    strings, unset and None values dropped) and serialized with sorted keys,
+    so equivalent calls share a key.
+
+    Args:
+        tool_name: The tool's name.
+        arguments: The call's arguments.
+        scope: Tool settings that change its results, such as a result count.
+    """
+    payload = json.dumps([tool_name, _normalize(arguments), scope or {}], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ToolResultCache:
+    """Caches tool results in memory, and optionally in a SQLite file.
+
+    Each entry expires after the TTL it was stored with, so every tool can
+    have its own freshness window. The in-memory tier is an LRU bounded by
+    `max_entries`; when `path` is set, JSON-serializable results are also
+    written to SQLite so they survive restarts and are shared by worker
+    processes. Hits and misses are counted per tool.
+
+    Args:
+        path: The SQLite database file, or "" to cache in memory only.
+        max_entries: The maximum number of results to keep in each tier.
+    """
+
+    def __init__(self, path: str = "", max_entries: int = 1024) -> None:
+        """Open the cache, creating its database file if `path` is set."""
+        self.path = path
+        self.max_entries = max(1, int(max_entries))
+        self._memory: LRUCache[str, Tuple[float, Any]] = LRUCache(maxsize=self.max_entries)
+        self._counts: Dict[str, list[int]] = {}
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            file = Path(path).expanduser()
+            file.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(file), check_same_thread=False)
+            with self._lock, self._conn:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS tool_results ("
+                    " key TEXT PRIMARY KEY,"
+                    " tool TEXT NOT NULL,"
+                    " value TEXT NOT NULL,"
+                    " expires_at REAL NOT NULL)"
+                )
+                self._conn.execute(
+                    "CREATE INDEX IF NOT EXISTS tool_results_expires_at ON tool_results (expires_at)"
+                )
+
+    @property
+    def persistent(self) -> bool:
+        """Whether results are also stored on disk."""
+        return self._conn is not None
+
+    def _count(self, tool: str, hit: bool) -> None:
+        with self._lock:
+            counts = self._counts.setdefault(tool, [0, 0])
+            counts[0 if hit else 1] += 1
+
+    def get(self, tool: str, key: str, default: Any = None) -> Any:
+        """Return the fresh cached result for `key`, or `default`."""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] <= now:
+            self._memory.invalidate(key)
+            entry = None
+        if entry is None and self._conn is not None:
+            with self._lock:
+                row = self._conn.execute(
+                    "SELECT value, expires_at FROM tool_results WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+            if row is not None:
+                entry = (row[1], json.loads(row[0]))
+                self._memory.set(key, entry)
+        self._count(tool, entry is not None)
+        return default if entry is None else entry[1]
+
+    def set(self, tool: str, key: str, value: Any, ttl: float) -> None:
+        """Store a result for `ttl` seconds."""
+        if ttl <= 0:
+            return
+        expires_at = time.time() + ttl
+        self._memory.set(key, (expires_at, value))
+        if self._conn is None:
+            return
+        try:
+            encoded = json.dumps(value)
+        except (TypeError, ValueError):
+            # Results that are not plain JSON are only cached in memory.
+            return
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_results (key, tool, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, tool, encoded, expires_at),
+            )
+            self._conn.execute("DELETE FROM tool_results WHERE expires_at <= ?", (time.time(),))
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM tool_results").fetchone()
+            if count > self.max_entries:
+                # The entries closest to expiry are dropped first.
+                self._conn.execute(
+                    "DELETE FROM tool_results WHERE key IN ("
+                    " SELECT key FROM tool_results ORDER BY expires_at LIMIT ?)",
+                    (count - self.max_entries,),
+                )
+
+    def invalidate(self) -> None:
+        """Drop every cached result."""
+        self._memory.invalidate()
+        if self._conn is not None:
+            with self._lock, self._conn:
+                self._conn.execute("DELETE FROM tool_results")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and hit rates, overall and per tool."""
+        with self._lock:
+            counts = {tool: tuple(pair) for tool, pair in self._counts.items()}
+
+        def rates(hits: int, misses: int) -> Dict[str, Any]:
+            lookups = hits + misses
+            return {"hits": hits, "misses": misses, "hit_rate": hits / lookups if lookups else 0.0}
+
+        summary = rates(sum(h for h, _ in counts.values()), sum(m for _, m in counts.values()))
+        summary["entries"] = len(self._memory)
+        summary["tools"] = {tool: rates(*pair) for tool, pair in counts.items()}
+        return summary
+
+    def close(self) -> None:
+        """Close the underlying database connection, if any."""
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
+
+
+# Caches shared per database path, so every tool set in the process uses one
+# connection and one eviction policy per file.
+_caches: Dict[str, ToolResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tool_cache(path: str = "", max_entries: int = 1024) -> ToolResultCache:
+    """Return the process-wide tool result cache for a database path.
+
+    The first call for a path sets its `max_entries`; later calls asking for
+    a different size get the same cache, with a warning.
+    """
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ToolResultCache(path, max_entries)
+        elif cache.max_entries != max(1, int(max_entries)):
+            logger.warning(
+                f"Tool cache {path or '(in memory)'} already holds up to {cache.max_entries} "
+                f"entries; ignoring max_entries={max_entries}."
+            )
+    return cache
+
+
+class _CacheableTool(Protocol):
+    """The part of `BaseTool` that `CachedToolMixin` uses from the tool it is mixed into."""
+
+    name: str
+
+    @property
+    def args(self) -> Dict[str, Any]: ...
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any: ...
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any: ...
+
+
+class CachedToolMixin(BaseModel):
+    """Serves repeated calls of a tool from a `ToolResultCache`.
+
+    Mixed in ahead of a concrete `BaseTool` subclass, so the cached tool keeps
+    the original's type, name, schema and settings. It is a bare `BaseModel`
+    rather than a `BaseTool`, whose required fields would otherwise shadow
+    the tool's own defaults. Calls that raise, or whose
+    result `_is_error` flags, are never cached.
+    """
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    result_cache: Optional[ToolResultCache] = Field(default=None, exclude=True)
+    cache_ttl: float = 0.0
+
+    # Whether the tool has a native async implementation is decided by the
+    # class the mixin wraps.
+    _async_passthrough: ClassVar[bool] = True
+
+    def _cache_scope(self) -> Dict[str, Any]:
+        """Return the tool settings that change its results."""
+        return {}
+
+    def _is_error(self, result: Any) -> bool:
+        return isinstance(result, Mapping) and "error" in result
+
+    @property
+    def _tool(self) -> _CacheableTool:
+        # The mixin is only ever mixed into a `BaseTool`.
+        return cast(_CacheableTool, self)
+
+    def _cache_key(self, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        arguments = dict(zip(self._tool.args, args))
+        arguments.update((k, v) for k, v in kwargs.items() if k != "run_manager")
+        return tool_cache_key(self._tool.name, arguments, self._cache_scope())
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        wrapped = cast(_CacheableTool, super())
+        if self.result_cache is None or self.cache_ttl <= 0:
+            return wrapped._run(*args, **kwargs)
+        name = self._tool.name
+        key = self._cache_key(args, kwargs)
+        cached = self.result_cache.get(name, key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        result = wrapped._run(*args, **kwargs)
+        if not self._is_error(result):
+            self.result_cache.set(name, key, result, self.cache_ttl)
+        return result
+
+    async def _arun(self, *args: Any, **kwargs: Any) -> Any:
+        wrapped = cast(_CacheableTool, super())
+        if self.result_cache is None or self.cache_ttl <= 0:
+            return await wrapped._arun(*args, **kwargs)
+        if not has_native_async(cast("BaseTool", self)):
+            # The tool has no async client; its default `_arun` would call the
+            # cached `_run` in a thread, so let that do the caching.
+            return await run_in_executor(None, self._run, *args, **kwargs)
+        name = self._tool.name
+        key = self._cache_key(args, kwargs)
+        cache = self.result_cache
+        if cache.persistent:
+            cached = await asyncio.to_thread(cache.get, name, key, _MISSING)
+        else:
+            cached = cache.get(name, key, _MISSING)
+        if cached is not _MISSING:
+            return cached
+        result = await wrapped._arun(*args, **kwargs)
+        if not self._is_error(result):
+            if cache.persistent:
+                await asyncio.to_thread(cache.set, name, key, result, self.cache_ttl)
+            else:
+                cache.set(name, key, result, self.cache_ttl)
+        return result
+
+
+class CachedTavilySearch(CachedToolMixin, TavilySearch):
+    """`TavilySearch` with cached results."""
+
+    def _cache_scope(self) -> Dict[str, Any]:
+        return self.model_dump(
+            include={
+                "max_results", "topic", "search_depth", "time_range", "country",
+                "include_domains", "exclude_domains", "include_answer",
+                "include_raw_content", "include_images", "include_image_descriptions",
+            }
+        )
+
+
+class CachedWikipediaQueryRun(CachedToolMixin, WikipediaQueryRun):
+    """`WikipediaQueryRun` with cached results."""
+
+    def _cache_scope(self) -> Dict[str, Any]:
+        wrapper = self.api_wrapper
+        return {"lang": wrapper.lang, "top_k": wrapper.top_k_results, "chars": wrapper.doc_content_chars_max}
+
+
+class CachedArxivQueryRun(CachedToolMixin, ArxivQueryRun):
+    """`ArxivQueryRun` with cached results."""
+
+    def _cache_scope(self) -> Dict[str, Any]:
+        wrapper = self.api_wrapper
+        return {"top_k": wrapper.top_k_results, "chars": wrapper.doc_content_chars_max}
+
+    def _is_error(self, result: Any) -> bool:
+        # The Arxiv wrapper reports API failures as text rather than raising.
+        return isinstance(result, str) and result.startswith("Arxiv exception:")
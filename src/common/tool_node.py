@@ -0,0 +1,518 @@
+"""Tool execution for the agent's tools node."""
+
+import asyncio
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Deque,
+    Dict,
+    Hashable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    cast,
+)
+
+from langchain_core.messages import ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool
+from langchain_core.tools import tool as create_tool
+from langchain_core.tools.base import _get_runnable_config_param
+from langgraph.prebuilt import ToolNode
+from pydantic import BaseModel, Field
+
+from .concurrency import SingleFlight
+
+if TYPE_CHECKING:
+    from .context import Context
+
+logger = logging.getLogger(__name__)
+
+# Tools can opt out of coalescing with `metadata={SINGLEFLIGHT_METADATA_KEY: False}`,
+# e.g. when two identical calls are meant to have two effects.
+SINGLEFLIGHT_METADATA_KEY = "singleflight"
+
+# Tools can choose where they run with `metadata={EXECUTOR_METADATA_KEY: ...}`:
+# "thread" runs their sync implementation in the bounded tool pool, "async"
+# awaits their async implementation on the event loop. By default, tools
+# without a native async implementation run in the pool.
+EXECUTOR_METADATA_KEY = "executor"
+
+# Shared by every tools node in the process, so identical calls from
+# concurrent runs coalesce as well as parallel calls within one message.
+_tool_calls = SingleFlight()
+
+# Pools shared per size, so every tools node in the process uses one.
+_executors: Dict[int, ThreadPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+# Recent latencies kept per tool for the percentiles in `get_tool_latency_stats`.
+LATENCY_SAMPLES = 512
+
+# asyncio semaphores belong to one event loop, so each loop gets its own.
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, int], asyncio.Semaphore]]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def get_tool_singleflight() -> SingleFlight:
+    """Return the process-wide singleflight group for tool calls."""
+    return _tool_calls
+
+
+def get_tool_executor(max_workers: int = 8) -> ThreadPoolExecutor:
+    """Return the process-wide thread pool that runs blocking tools."""
+    max_workers = max(1, int(max_workers))
+    with _executors_lock:
+        executor = _executors.get(max_workers)
+        if executor is None:
+            executor = _executors[max_workers] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix="tool"
+            )
+    return executor
+
+
+def has_native_async(tool: BaseTool) -> bool:
+    """Return whether a tool has its own async implementation.
+
+    Tools that only inherit `BaseTool._arun` run their sync implementation in
+    a thread when awaited. Classes flagged with `_async_passthrough`, whose
+    `_arun` defers to the wrapped tool's, are looked through.
+    """
+    if isinstance(tool, StructuredTool):
+        return tool.coroutine is not None
+    for base in type(tool).__mro__:
+        if "_arun" in vars(base) and not vars(base).get("_async_passthrough", False):
+            return base is not BaseTool
+    return False
+
+
+def _runs_in_thread(tool: BaseTool) -> bool:
+    executor = (tool.metadata or {}).get(EXECUTOR_METADATA_KEY)
+    if executor is not None:
+        return bool(executor == "thread")
+    return not has_native_async(tool)
+
+
+def _uses_run_config(tool: BaseTool) -> bool:
+    # Tools reading the run's config (e.g. its thread_id) may answer the same
+    # arguments differently for different runs.
+    for func in (getattr(tool, "coroutine", None), getattr(tool, "func", None)):
+        if func is not None and _get_runnable_config_param(func):
+            return True
+    return False
+
+
+def _tool_semaphore(name: str, limit: int) -> asyncio.Semaphore:
+    semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    semaphore = semaphores.get((name, limit))
+    if semaphore is None:
+        semaphore = semaphores[(name, limit)] = asyncio.Semaphore(limit)
+    return semaphore
+
+
+def _timeout_message(call: ToolCall, timeout: float, step: bool = False) -> ToolMessage:
+    reason = f"before this step's {timeout:g}-second deadline" if step else f"within {timeout:g} seconds"
+    return ToolMessage(
+        content=f"Error: the '{call['name']}' tool did not finish {reason}. "
+        "Try a simpler request or a different tool.",
+        name=call["name"],
+        tool_call_id=call["id"],
+        status="error",
+        response_metadata={"timed_out": True},
+    )
+
+
+_latencies: Dict[str, Deque[float]] = {}
+_latency_counts: Dict[str, List[int]] = {}
+_latency_lock = threading.Lock()
+
+
+def record_tool_latency(name: str, latency_ms: float, timed_out: bool = False) -> None:
+    """Record how long one call of a tool took, and whether it timed out."""
+    with _latency_lock:
+        samples = _latencies.get(name)
+        if samples is None:
+            samples = _latencies[name] = deque(maxlen=LATENCY_SAMPLES)
+            _latency_counts[name] = [0, 0]
+        samples.append(latency_ms)
+        counts = _latency_counts[name]
+        counts[0] += 1
+        counts[1] += int(timed_out)
+
+
+def get_tool_latency_stats() -> Dict[str, Dict[str, float]]:
+    """Return call counts, timeouts and latency percentiles per tool.
+
+    Percentiles, in milliseconds, cover each tool's last `LATENCY_SAMPLES` calls.
+    """
+    with _latency_lock:
+        snapshot = {name: (sorted(samples), tuple(_latency_counts[name])) for name, samples in _latencies.items()}
+
+    def percentile(samples: List[float], q: float) -> float:
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    return {
+        name: {
+            "calls": calls,
+            "timeouts": timeouts,
+            "p50_ms": percentile(samples, 0.5),
+            "p95_ms": percentile(samples, 0.95),
+            "max_ms": samples[-1],
+        }
+        for name, (samples, (calls, timeouts)) in snapshot.items()
+    }
+
+
+@dataclass(frozen=True)
+class ToolLimits:
+    """How many tool calls may run at once, and for how long.
+
+    Limits and timeouts of 0 mean none.
+
+    Args:
+        max_workers: The size of the thread pool that runs blocking tools.
+        concurrency: Per-tool limits on concurrent calls, by tool name.
+        default_concurrency: The limit for tools not in `concurrency`.
+        timeouts: Per-tool timeouts in seconds, by tool name.
+        default_timeout: The timeout for tools not in `timeouts`.
+        max_parallel_calls: Calls from one step that may run at once.
+        step_timeout: Seconds all the calls of one step may take together.
+    """
+
+    max_workers: int = 8
+    concurrency: Mapping[str, int] = field(default_factory=dict)
+    default_concurrency: int = 0
+    timeouts: Mapping[str, float] = field(default_factory=dict)
+    default_timeout: float = 0.0
+    max_parallel_calls: int = 0
+    step_timeout: float = 0.0
+
+    @classmethod
+    def from_context(cls, context: "Context") -> "ToolLimits":
+        """Build the limits configured in the agent's context."""
+        return cls(
+            max_workers=int(context.tool_max_workers),
+            concurrency=dict(context.tool_concurrency_limits or {}),
+            default_concurrency=int(context.tool_default_concurrency),
+            timeouts=dict(context.tool_timeouts or {}),
+            default_timeout=float(context.tool_default_timeout),
+            max_parallel_calls=int(context.tool_max_parallel_calls),
+            step_timeout=float(context.tool_step_timeout),
+        )
+
+    def concurrency_for(self, name: str) -> int:
+        """Return the concurrency limit of a tool, or 0 for none."""
+        return int(self.concurrency.get(name, self.default_concurrency))
+
+    def timeout_for(self, name: str) -> Optional[float]:
+        """Return the timeout of a tool in seconds, or None for none."""
+        timeout = float(self.timeouts.get(name, self.default_timeout))
+        return timeout if timeout > 0 else None
+
+
+@dataclass(frozen=True)
+class _Step:
+    """The limits shared by the calls of one tools-node step."""
+
+    semaphore: Optional[asyncio.Semaphore]
+    timeout: float
+    deadline: float
+
+    def remaining(self) -> Optional[float]:
+        if self.timeout <= 0:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+
+# Set by `ManagedToolNode.ainvoke` for the calls `ToolNode` starts from it.
+_current_step: contextvars.ContextVar[Optional[_Step]] = contextvars.ContextVar("tool_step", default=None)
+
+
+def _is_tool_call(input: Any) -> bool:
+    return isinstance(input, dict) and input.get("type") == "tool_call"
+
+
+class ManagedTool(BaseTool):
+    """Runs a wrapped tool under `ToolLimits`, sharing identical in-flight calls.
+
+    `ManagedToolNode` hands these to `ToolNode` in place of the tools it was
+    given. They present the wrapped tool's name, description and input
+    schema, so `ToolNode` injects state and stores into them as it would
+    into the tool itself, and do their work in the public `ainvoke` that
+    `ToolNode` calls with each `ToolCall`. Sync invocations, and async ones
+    not made with a `ToolCall`, go straight to the wrapped tool.
+
+    Args:
+        tool: The wrapped tool.
+        limits: Concurrency limits, timeouts and the pool size.
+        singleflight: The group in-flight calls are shared through.
+        coalesce: Whether calls of this tool may be shared.
+    """
+
+    tool: BaseTool
+    limits: ToolLimits = Field(default_factory=ToolLimits)
+    singleflight: SingleFlight = Field(default_factory=lambda: _tool_calls)
+    coalesce: bool = True
+
+    @classmethod
+    def wrap(cls, tool: BaseTool, **kwargs: Any) -> "ManagedTool":
+        """Wrap `tool`, copying the attributes `ToolNode` and callers read from it."""
+        return cls(
+            name=tool.name,
+            description=tool.description,
+            args_schema=tool.args_schema,
+            return_direct=tool.return_direct,
+            tags=tool.tags,
+            metadata=tool.metadata,
+            tool=tool,
+            **kwargs,
+        )
+
+    def get_input_schema(self, config: Optional[RunnableConfig] = None) -> Type[BaseModel]:
+        """Return the wrapped tool's input schema, which `ToolNode` reads injected arguments from."""
+        return self.tool.get_input_schema(config)
+
+    @property
+    def tool_call_schema(self) -> Any:
+        """The wrapped tool's schema as shown to the model."""
+        return self.tool.tool_call_schema
+
+    def _run(self, *args: Any, **kwargs: Any) -> Any:
+        return self.tool._run(*args, **kwargs)
+
+    def invoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """Run the wrapped tool without limits; only async tool-node steps are managed."""
+        return self.tool.invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """Run a `ToolCall` under the step's and the tool's limits."""
+        if not _is_tool_call(input):
+            return await self.tool.ainvoke(input, config, **kwargs)
+        call = cast(ToolCall, input)
+        config = config or {}
+        step = _current_step.get()
+        if step is None or (step.semaphore is None and step.timeout <= 0):
+            started = time.perf_counter()
+            return self._with_latency(call, await self._share(call, config), started)
+
+        async def run() -> Any:
+            async with step.semaphore or contextlib.nullcontext():
+                started = time.perf_counter()
+                return self._with_latency(call, await self._share(call, config), started)
+
+        step_started = time.perf_counter()
+
+        task = asyncio.ensure_future(run())
+        try:
+            await asyncio.wait({task}, timeout=step.remaining())
+        except BaseException:
+            task.cancel()
+            raise
+        if task.done():
+            return task.result()
+        # Calls past the deadline, including any still waiting for a slot, are
+        # reported so the agent can move on with the results it has.
+        task.cancel()
+        logger.warning(f"Tool '{call['name']}' missed the {step.timeout:g}-second step deadline.")
+        return self._with_latency(call, _timeout_message(call, step.timeout, step=True), step_started)
+
+    @staticmethod
+    def _with_latency(call: ToolCall, output: Any, started: float) -> Any:
+        """Record a call's latency, and attach it to its `ToolMessage`."""
+        if not isinstance(output, ToolMessage):
+            return output
+        latency_ms = (time.perf_counter() - started) * 1000
+        timed_out = bool(output.response_metadata.get("timed_out"))
+        record_tool_latency(call["name"], latency_ms, timed_out)
+        # A new dict, since a shared result's copies share the original's.
+        output.response_metadata = {**output.response_metadata, "latency_ms": round(latency_ms, 3)}
+        return output
+
+    def _coalesce_key(self, call: ToolCall, config: RunnableConfig) -> Optional[Hashable]:
+        """Return the key identical calls share, or None if the call must run on its own."""
+        if not self.coalesce or (self.tool.metadata or {}).get(SINGLEFLIGHT_METADATA_KEY) is False:
+            return None
+        scope: Dict[str, Any] = {}
+        if _uses_run_config(self.tool):
+            configurable = config.get("configurable") or {}
+            scope = {
+                k: v
+                for k, v in configurable.items()
+                # Checkpoint and task bookkeeping differs per step, not per tenant.
+                if isinstance(v, str | int | float | bool) and not k.startswith(("__", "checkpoint_"))
+            }
+        try:
+            arguments = json.dumps([call["name"], call["args"], scope], sort_keys=True)
+        except (TypeError, ValueError):
+            return None
+        # Runs with different tool sets may each have a tool of this name, set
+        # up differently (e.g. other search limits or another MCP server), so
+        # only calls to the same tool instance are shared.
+        return (id(self.tool), arguments)
+
+    async def _share(self, call: ToolCall, config: RunnableConfig) -> Any:
+        """Run a call, or wait on an identical one already in flight."""
+        key = self._coalesce_key(call, config)
+        if key is None:
+            return await self._execute(call, config)
+
+        executed = False
+
+        async def execute() -> Any:
+            nonlocal executed
+            executed = True
+            return await self._execute(call, config)
+
+        output = await self.singleflight.do(key, execute)
+        if executed:
+            return output
+        if not isinstance(output, ToolMessage):
+            # A Command is addressed to the tool call that produced it and cannot be shared.
+            return await self._execute(call, config)
+        logger.debug(f"Shared the result of an identical in-flight '{call['name']}' call.")
+        # A fresh message ID, since messages with equal IDs replace each other in state.
+        return output.model_copy(update={"tool_call_id": call["id"], "id": None})
+
+    async def _execute(self, call: ToolCall, config: RunnableConfig) -> Any:
+        """Run one call under its tool's concurrency limit and timeout."""
+        limit = self.limits.concurrency_for(call["name"])
+        semaphore = _tool_semaphore(call["name"], limit) if limit > 0 else None
+        timeout = self.limits.timeout_for(call["name"])
+
+        if not _runs_in_thread(self.tool):
+            try:
+                if semaphore is None:
+                    return await asyncio.wait_for(self.tool.ainvoke(call, config), timeout)
+                async with semaphore:
+                    return await asyncio.wait_for(self.tool.ainvoke(call, config), timeout)
+            except TimeoutError:
+                if timeout is None:
+                    raise  # Raised by the tool itself, not by a timeout of ours.
+                logger.warning(f"Tool '{call['name']}' timed out after {timeout:g} seconds.")
+                return _timeout_message(call, timeout)
+
+        if semaphore is not None:
+            await semaphore.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            # Callbacks and tracing find the run's config in context variables.
+            future = get_tool_executor(self.limits.max_workers).submit(
+                contextvars.copy_context().run, self.tool.invoke, call, config
+            )
+        except BaseException:
+            if semaphore is not None:
+                semaphore.release()
+            raise
+        if semaphore is not None:
+
+            def release(_: Any) -> None:
+                try:
+                    loop.call_soon_threadsafe(semaphore.release)
+                except RuntimeError:
+                    pass  # The loop closed while the tool was still running.
+
+            future.add_done_callback(release)
+        try:
+            return await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except TimeoutError:
+            if timeout is None:
+                raise  # Raised by the tool itself, not by a timeout of ours.
+            logger.warning(f"Tool '{call['name']}' timed out after {timeout:g} seconds.")
+            return _timeout_message(call, timeout)
+
+
+class ManagedToolNode(ToolNode):
+    """A `ToolNode` that coalesces identical calls and bounds how tools run.
+
+    Calls to the same tool instance with the same arguments, whether
+    parallel calls in one `AIMessage` or calls from concurrent runs sharing
+    a tool set, wait on a single execution. Every caller still gets its own
+    `ToolMessage` carrying its own `tool_call_id`. Calls are not coalesced
+    when the tool opts out through its metadata, when graph state or a store
+    is injected into its arguments, or when the tool returns a `Command`.
+    Tools that read the run's config are only coalesced with calls from runs
+    with the same configurable values.
+
+    Tools without a native async implementation run in the bounded pool from
+    `get_tool_executor` rather than on the event loop or its default
+    executor. Each tool's calls wait for a slot under its concurrency limit,
+    and a call that exceeds its timeout gets an error `ToolMessage` the
+    model can react to. A timed-out thread cannot be interrupted, so it
+    keeps its tool's slot until it finishes; a hung tool can then hold at
+    most its own limit of the pool's threads.
+
+    The calls of one step run at most `max_parallel_calls` at a time, and
+    calls still running at the step deadline are answered with timeout
+    messages, so one slow tool cannot hold up the next model call. Each
+    call's latency is recorded (see `get_tool_latency_stats`) and attached to
+    its `ToolMessage` as `response_metadata["latency_ms"]`.
+
+    All of this happens in the `ManagedTool` wrappers the node runs instead
+    of its tools, and in its public `ainvoke`, so the node relies on no
+    private `ToolNode` API. Sync invocations run the tools as `ToolNode` does.
+
+    Args:
+        tools: The tools the node can call.
+        singleflight: The group in-flight calls are shared through; the
+                      process-wide one by default.
+        coalesce: Whether to share executions between identical calls.
+        limits: Concurrency limits, timeouts and the pool size.
+        **kwargs: Passed to `ToolNode`.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[Any],
+        *,
+        singleflight: Optional[SingleFlight] = None,
+        coalesce: bool = True,
+        limits: Optional[ToolLimits] = None,
+        **kwargs: Any,
+    ) -> None:
+        """Build the node; the limits default to none and coalescing is on."""
+        self.singleflight = singleflight or _tool_calls
+        self.coalesce = coalesce
+        self.limits = limits or ToolLimits()
+        wrapped = [
+            ManagedTool.wrap(
+                tool if isinstance(tool, BaseTool) else create_tool(tool),
+                limits=self.limits,
+                singleflight=self.singleflight,
+                coalesce=coalesce,
+            )
+            for tool in tools
+        ]
+        super().__init__(wrapped, **kwargs)
+        for name, tool in self.tools_by_name.items():
+            if self.tool_to_state_args.get(name) or self.tool_to_store_arg.get(name):
+                # Injected state or stores differ per run, so these calls are never shared.
+                cast(ManagedTool, tool).coalesce = False
+
+    async def ainvoke(self, input: Any, config: Optional[RunnableConfig] = None, **kwargs: Any) -> Any:
+        """Run the tool calls of one step under the step's limits."""
+        limit = self.limits.max_parallel_calls
+        timeout = self.limits.step_timeout
+        step = _Step(
+            semaphore=asyncio.Semaphore(limit) if limit > 0 else None,
+            timeout=timeout,
+            deadline=time.monotonic() + timeout,
+        )
+        token = _current_step.set(step)
+        try:
+            return await super().ainvoke(input, config, **kwargs)
+        finally:
+            _current_step.reset(token)
@@ -1,20 +1,35 @@
 """Tools for the LangGraph agent, including local and remote MCPO tools."""
 
+import asyncio
+import json
 import logging
-from typing import List, Any, Optional
+import re
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Any, Literal, Optional, Tuple
 
 from langchain.tools import tool
-from langchain_community.tools import WikipediaQueryRun, ArxivQueryRun
+from langchain_core.runnables import RunnableConfig
 from langchain_community.utilities import WikipediaAPIWrapper, ArxivAPIWrapper
 # FIX: Import the new, non-deprecated class from the correct package
 from langchain_tavily import TavilySearch
-from langchain_experimental.tools import PythonREPLTool
 from langchain_mcp_adapters.client import MultiServerMCPClient
+from langgraph.runtime import get_runtime
 
 from dotenv import load_dotenv
 
+from .cache import LRUCache
 from .context import Context
-from .vector_store import add_document, search_documents
+from .python_sandbox import SandboxedPythonREPLTool, get_python_sandbox
+from .tool_cache import (
+    CachedArxivQueryRun,
+    CachedTavilySearch,
+    CachedWikipediaQueryRun,
+    get_tool_cache,
+    resolve_tool_cache_ttls,
+)
+from .tool_node import EXECUTOR_METADATA_KEY, SINGLEFLIGHT_METADATA_KEY
+from .vector_store import asearch_documents, configure_vector_store, get_ingest_queue, resolve_namespace
 
 load_dotenv()
 
@@ -23,71 +38,399 @@ logger = logging.getLogger(__name__)
 # FIX: Use the new class name and max_results argument
 web_search = TavilySearch(max_results=5)
 
-# Global cache for the MCP client to avoid re-initialization.
-_mcp_client: Optional[MultiServerMCPClient] = None
+# Circuit breaker settings for MCPO servers: after this many consecutive
+# failures a server is skipped for the cooldown period.
+MCPO_FAILURE_THRESHOLD = 3
+MCPO_COOLDOWN_SECONDS = 30.0
+DEFAULT_MCPO_TOOLS_TTL = 300.0
+DEFAULT_MCPO_TIMEOUT = 10.0
+
+# Process-wide registry of built local tool sets, keyed on the Context fields
+# that affect tool construction. Both graph nodes share it, so a ReAct loop
+# builds its tools once instead of twice per step.
+TOOL_REGISTRY_MAX_SIZE = 32
+TOOL_REGISTRY_TTL_SECONDS = 300.0
+_tool_registry: LRUCache[Tuple[Any, ...], List[Any]] = LRUCache(
+    maxsize=TOOL_REGISTRY_MAX_SIZE, ttl=TOOL_REGISTRY_TTL_SECONDS
+)
+
+
+def _run_context() -> Optional[Context]:
+    """Return the Context of the graph run the calling tool belongs to, if any."""
+    try:
+        runtime = get_runtime(Context)
+    except RuntimeError:
+        return None
+    context = getattr(runtime, "context", None)
+    return context if isinstance(context, Context) else None
 
 
 @tool
-def add_document_tool(document: str) -> str:
-    """Adds a document to the vector store."""
-    add_document(document)
+async def add_document_tool(document: str, config: RunnableConfig, metadata: Optional[Dict[str, Any]] = None) -> str:
+    """Adds a document, with optional metadata such as {"source": "..."}, to the vector store."""
+    # Concurrent calls from parallel runs are coalesced into batched writes.
+    await get_ingest_queue().submit(document, metadata, resolve_namespace(config, _run_context()))
     return f"Document added to the vector store: {document}"
 
 
+# Identical add calls are each meant to store a document, so they are never coalesced.
+add_document_tool.metadata = {SINGLEFLIGHT_METADATA_KEY: False}
+
+
 @tool
-def search_documents_tool(query: str, k: int = 4) -> list[str]:
-    """Searches for similar documents in the vector store."""
-    return search_documents(query, k)
+async def search_documents_tool(
+    query: str,
+    config: RunnableConfig,
+    k: int = 4,
+    filter: Optional[Dict[str, Any]] = None,
+    mode: Optional[Literal["vector", "lexical", "hybrid"]] = None,
+) -> list[str]:
+    """Searches for similar documents in the vector store, optionally only those whose metadata matches `filter`.
+
+    Use mode "lexical" for exact keywords or IDs, "vector" for meaning, or "hybrid" for both.
+    """
+    context = _run_context()
+    # Without an explicit mode, the run's own default applies.
+    search_mode = mode or (context.vector_search_mode if context is not None else None)
+    return await asearch_documents(
+        query, k, filter=filter, namespace=resolve_namespace(config, context), mode=search_mode
+    )
+
+
+# The server name used for the single MCPO endpoint configured via `mcpo_url`.
+MCPO_SERVER_NAME = "openwebui_mcpo"
+
+
+@dataclass
+class _MCPServerState:
+    """Cached client, tool list, and circuit breaker state for one MCP server."""
+
+    name: str
+    connection: Dict[str, Any]
+    client: Optional[MultiServerMCPClient] = None
+    tools: Optional[List[Any]] = None
+    fetched_at: float = 0.0
+    refresh_task: Optional["asyncio.Task[Any]"] = None
+    failures: int = 0
+    open_until: float = 0.0
+
+    def is_open(self, now: float) -> bool:
+        """Return whether the circuit breaker is currently rejecting calls."""
+        return now < self.open_until
+
+    @property
+    def label(self) -> str:
+        """Return a human-readable identifier for log messages."""
+        target = self.connection.get("url") or self.connection.get("command", "")
+        return f"{self.name} ({target})"
+
+
+# Client pool and tool-list cache, keyed by server name and connection settings.
+_mcp_servers: Dict[str, _MCPServerState] = {}
+
+# Merged remote tool lists, keyed by server name and tool fingerprints, so
+# collision renaming does not copy tools on every call.
+_merged_remote_tools: LRUCache[Tuple[Any, ...], List[Any]] = LRUCache(maxsize=16)
 
 
-async def get_mcpo_tools(mcpo_url: Optional[str]) -> List[Any]:
+def clear_mcp_cache() -> None:
+    """Forget every pooled MCP client, cached tool list, and breaker state."""
+    for state in _mcp_servers.values():
+        if state.refresh_task is not None and not state.refresh_task.done():
+            state.refresh_task.cancel()
+    _mcp_servers.clear()
+    _merged_remote_tools.invalidate()
+
+
+def resolve_mcp_servers(context: Context) -> List[Dict[str, Any]]:
+    """Build the list of MCP server configurations for a context.
+
+    Entries of `context.mcp_servers` may be URL strings (served over SSE) or
+    dicts holding a `MultiServerMCPClient` connection plus an optional `name`
+    and `timeout`. A non-empty `context.mcpo_url` is included as an SSE server
+    named `openwebui_mcpo`. Invalid entries are logged and skipped, like
+    unreachable servers, so one bad entry does not fail every turn.
+
+    Args:
+        context: The agent context.
+
+    Returns:
+        A list of dicts with `name`, optional `timeout`, and connection keys.
+    """
+    servers: List[Dict[str, Any]] = []
+    mcpo_url = getattr(context, "mcpo_url", None)
+    if mcpo_url:
+        servers.append({"name": MCPO_SERVER_NAME, "url": mcpo_url, "transport": "sse"})
+    for index, entry in enumerate(getattr(context, "mcp_servers", None) or []):
+        server = {"url": entry} if isinstance(entry, str) else dict(entry) if isinstance(entry, dict) else {}
+        if not server.get("url") and not server.get("command"):
+            logger.warning(f"Skipping invalid MCP server entry {entry!r}: a 'url' or 'command' is required.")
+            continue
+        server.setdefault("transport", "sse" if server.get("url") else "stdio")
+        server.setdefault("name", f"mcp_{index}")
+        servers.append(server)
+    return servers
+
+
+def _server_state(server: Dict[str, Any]) -> _MCPServerState:
+    """Return the pooled state for a server configuration, creating it if needed."""
+    name = str(server["name"])
+    connection = {k: v for k, v in server.items() if k not in ("name", "timeout")}
+    key = json.dumps([name, connection], sort_keys=True, default=str)
+    state = _mcp_servers.get(key)
+    if state is None:
+        state = _mcp_servers[key] = _MCPServerState(name=name, connection=connection)
+    return state
+
+
+async def _fetch_server_tools(state: _MCPServerState, timeout: float) -> List[Any]:
+    """Fetch the tool list from an MCP server, updating its cache and breaker."""
+    try:
+        if state.client is None:
+            state.client = MultiServerMCPClient({state.name: state.connection})
+            logger.info(f"Initialized MCP client for server: {state.label}")
+
+        tools = await asyncio.wait_for(state.client.get_tools(), timeout=timeout)
+    except Exception as e:
+        state.failures += 1
+        if state.failures >= MCPO_FAILURE_THRESHOLD:
+            state.open_until = time.monotonic() + MCPO_COOLDOWN_SECONDS
+            logger.warning(
+                f"MCP server {state.label} failed {state.failures} times in a row; "
+                f"skipping it for {MCPO_COOLDOWN_SECONDS:.0f}s."
+            )
+        logger.error(f"Failed to load tools from MCP server {state.label}: {e!r}")
+        return state.tools or []
+
+    state.tools = tools
+    state.fetched_at = time.monotonic()
+    state.failures = 0
+    state.open_until = 0.0
+    logger.info(f"Loaded {len(tools)} tools from MCP server {state.label}")
+    return tools
+
+
+def _schedule_refresh(state: _MCPServerState, timeout: float) -> None:
+    """Start a background refresh of a stale tool list unless one is already running."""
+    loop = asyncio.get_running_loop()
+    task = state.refresh_task
+    if task is not None and not task.done() and task.get_loop() is loop:
+        return
+    state.refresh_task = loop.create_task(_fetch_server_tools(state, timeout))
+
+
+async def _get_server_tools(state: _MCPServerState, ttl: float, timeout: float) -> List[Any]:
+    """Return a server's tools from cache, refreshing or fetching them as needed."""
+    now = time.monotonic()
+    if state.tools is not None:
+        if now - state.fetched_at > ttl and not state.is_open(now):
+            _schedule_refresh(state, timeout)
+        return state.tools
+    if state.is_open(now):
+        return []
+    return await _fetch_server_tools(state, timeout)
+
+
+def _tool_fingerprint(remote_tool: Any) -> Tuple[str, str, str]:
+    """Return what identifies a remote tool's definition across refreshes of its server's tool list."""
+    return (remote_tool.name, remote_tool.description or "", json.dumps(remote_tool.args, sort_keys=True, default=str))
+
+
+def _merge_server_tools(
+    names: List[str], tool_lists: Tuple[List[Any], ...], reserved: frozenset[str]
+) -> List[Any]:
+    """Combine per-server tool lists, prefixing names that would collide.
+
+    A tool keeps its name unless another server (or a local tool listed in
+    `reserved`) exposes the same name, in which case every clashing copy is
+    renamed to `<server>__<tool>`.
+    """
+    key = (
+        tuple((name, tuple(_tool_fingerprint(t) for t in tools)) for name, tools in zip(names, tool_lists)),
+        tuple(sorted(reserved)),
+    )
+    cached = _merged_remote_tools.get(key)
+    if cached is not None:
+        return cached
+
+    counts: Dict[str, int] = {}
+    for tools in tool_lists:
+        for remote_tool in tools:
+            counts[remote_tool.name] = counts.get(remote_tool.name, 0) + 1
+
+    merged: List[Any] = []
+    for server_name, tools in zip(names, tool_lists):
+        for remote_tool in tools:
+            if counts[remote_tool.name] > 1 or remote_tool.name in reserved:
+                prefix = re.sub(r"[^A-Za-z0-9_-]", "_", server_name)
+                remote_tool = remote_tool.model_copy(update={"name": f"{prefix}__{remote_tool.name}"})
+            merged.append(remote_tool)
+
+    _merged_remote_tools.set(key, merged)
+    return merged
+
+
+async def get_mcp_tools(
+    servers: List[Dict[str, Any]],
+    ttl: float = DEFAULT_MCPO_TOOLS_TTL,
+    timeout: float = DEFAULT_MCPO_TIMEOUT,
+    reserved_names: frozenset[str] = frozenset(),
+) -> List[Any]:
+    """Fetch tools from several MCP servers concurrently.
+
+    Each server has its own pooled client, tool-list cache, and circuit
+    breaker (see `get_mcpo_tools`). Servers are queried in parallel, each
+    under its own deadline, so discovery takes as long as the slowest healthy
+    server rather than the sum of all of them; servers that fail or time out
+    simply contribute no tools. Name collisions between servers, or with
+    `reserved_names`, are resolved by prefixing the server name.
+
+    Args:
+        servers: Server configurations, as returned by `resolve_mcp_servers`.
+        ttl: How long a fetched tool list is considered fresh, in seconds.
+        timeout: The default per-server deadline, in seconds. A server entry's
+                 own `timeout` takes precedence.
+        reserved_names: Tool names that remote tools must not shadow.
+
+    Returns:
+        The combined list of remote tools.
+    """
+    if not servers:
+        return []
+    states = [_server_state(server) for server in servers]
+    tool_lists = await asyncio.gather(
+        *(
+            _get_server_tools(state, ttl, float(server.get("timeout", timeout)))
+            for state, server in zip(states, servers)
+        )
+    )
+    return _merge_server_tools([state.name for state in states], tuple(tool_lists), reserved_names)
+
+
+async def get_mcpo_tools(
+    mcpo_url: Optional[str],
+    ttl: float = DEFAULT_MCPO_TOOLS_TTL,
+    timeout: float = DEFAULT_MCPO_TIMEOUT,
+) -> List[Any]:
     """
     Fetches tools from an OpenWebUI MCPO server.
-    ... (docstring is correct) ...
+
+    Clients are pooled per server and tool lists are cached for `ttl` seconds.
+    Once an entry goes stale it keeps being served while a background task
+    refreshes it, so only the very first call for a server waits on it.
+    A circuit breaker stops contacting a server after repeated failures or
+    timeouts, so a slow or dead MCPO endpoint does not add its latency to
+    every model turn.
+
+    Args:
+        mcpo_url: The URL of the MCPO server. If empty, no tools are fetched.
+        ttl: How long a fetched tool list is considered fresh, in seconds.
+        timeout: The maximum time to wait for the server, in seconds.
+
+    Returns:
+        The list of remote tools, or an empty list if none are available.
     """
-    global _mcp_client
     if not mcpo_url:
         return []
+    state = _server_state({"name": MCPO_SERVER_NAME, "url": mcpo_url, "transport": "sse"})
+    return await _get_server_tools(state, ttl, timeout)
 
-    server_name = "openwebui_mcpo"
-    server_config = {
-        server_name: {"url": mcpo_url, "transport": "sse"}
-    }
 
-    try:
-        if _mcp_client is None:
-            _mcp_client = MultiServerMCPClient(server_config)
-            logger.info(f"Initialized MCP client for server: {server_name}")
+def _tool_registry_key(context: Context) -> Tuple[Any, ...]:
+    """Return the registry key built from the Context fields that affect local tools."""
+    return (
+        context.max_search_results,
+        context.tool_cache_path,
+        context.tool_cache_max_entries,
+        tuple(sorted(resolve_tool_cache_ttls(context.tool_cache_ttls).items())),
+        context.python_sandbox_workers,
+        context.python_sandbox_max_tasks,
+        context.python_cpu_time_limit,
+        context.python_wall_time_limit,
+        context.python_memory_limit_mb,
+        context.python_per_thread_state,
+    )
 
-        tools = await _mcp_client.get_tools()
-        logger.info(f"Loaded {len(tools)} tools from MCPO server at {mcpo_url}")
-        return tools
-    except Exception as e:
-        logger.error(f"Failed to load tools from MCPO server at {mcpo_url}: {e}")
-        return []
+
+def invalidate_tool_registry(context: Optional[Context] = None) -> None:
+    """Drop cached tool sets so that the next `create_tools` call rebuilds them.
+
+    Args:
+        context: If given, only the tool set built for this context is dropped.
+                 Otherwise the whole registry is cleared.
+    """
+    _tool_registry.invalidate(None if context is None else _tool_registry_key(context))
 
 
 async def create_tools(context: Context) -> List[Any]:
     """
     Create and return a list of tools for the agent.
-    ... (docstring is correct) ...
+
+    Local tool sets are cached in a process-wide registry keyed on
+    `max_search_results`, the tool cache settings and the Python sandbox
+    settings, so repeated calls with an equivalent context share the same
+    tool objects. Entries are evicted on an LRU basis and expire
+    after `TOOL_REGISTRY_TTL_SECONDS`; use `invalidate_tool_registry` to force
+    a rebuild. Remote tools come from the per-server MCP cache
+    (see `get_mcp_tools`).
+
+    The web search, Wikipedia and Arxiv tools serve repeated queries from a
+    shared result cache (see `tool_cache`), with per-tool lifetimes from
+    `Context.tool_cache_ttls`. The Python REPL runs code in a pool of worker
+    processes with CPU, wall-clock and memory limits (see `python_sandbox`).
+
+    Args:
+        context: The agent context carrying the tool configuration.
+
+    Returns:
+        The list of local and remote tools available to the agent.
     """
-    # 1. Initialize local tools from LangChain.
-    # FIX: Use the new class name
-    search_tool = TavilySearch(max_results=context.max_search_results)
-    python_repl_tool = PythonREPLTool()
-    wikipedia_tool = WikipediaQueryRun(api_wrapper=WikipediaAPIWrapper())
-    arxiv_tool = ArxivQueryRun(api_wrapper=ArxivAPIWrapper())
-    local_tools = [search_tool, python_repl_tool, wikipedia_tool, arxiv_tool, add_document_tool, search_documents_tool]
-    logger.info(f"Loaded {len(local_tools)} local tools (Search, Python REPL, Wikipedia, Arxiv, Vector Store).")
-
-    # 2. Fetch remote tools from the OpenWebUI MCPO server, if configured.
-    remote_tools = []
-    mcpo_url = getattr(context, 'mcpo_url', None)
-    if mcpo_url:
-        remote_tools = await get_mcpo_tools(mcpo_url)
+    configure_vector_store(context)
+    key = _tool_registry_key(context)
+    local_tools = _tool_registry.get(key)
+    if local_tools is None:
+        # 1. Initialize local tools from LangChain.
+        # FIX: Use the new class name
+        result_cache = get_tool_cache(context.tool_cache_path, context.tool_cache_max_entries)
+        ttls = resolve_tool_cache_ttls(context.tool_cache_ttls)
+        search_tool = CachedTavilySearch(
+            max_results=context.max_search_results, result_cache=result_cache, cache_ttl=ttls["tavily_search"]
+        )
+        sandbox = get_python_sandbox(
+            max_workers=context.python_sandbox_workers,
+            max_tasks_per_worker=context.python_sandbox_max_tasks,
+            cpu_time_limit=context.python_cpu_time_limit,
+            wall_time_limit=context.python_wall_time_limit,
+            memory_limit_mb=context.python_memory_limit_mb,
+        )
+        # The REPL may keep state between calls, so identical code may print different output.
+        # Its `_arun` only hands `_run` to the loop's default executor.
+        python_repl_tool = SandboxedPythonREPLTool(
+            sandbox=sandbox,
+            per_thread_state=context.python_per_thread_state,
+            handle_tool_error=True,
+            metadata={SINGLEFLIGHT_METADATA_KEY: False, EXECUTOR_METADATA_KEY: "thread"},
+        )
+        wikipedia_tool = CachedWikipediaQueryRun(
+            api_wrapper=WikipediaAPIWrapper(), result_cache=result_cache, cache_ttl=ttls["wikipedia"]
+        )
+        arxiv_tool = CachedArxivQueryRun(
+            api_wrapper=ArxivAPIWrapper(), result_cache=result_cache, cache_ttl=ttls["arxiv"]
+        )
+        local_tools = [search_tool, python_repl_tool, wikipedia_tool, arxiv_tool, add_document_tool, search_documents_tool]
+        _tool_registry.set(key, local_tools)
+        logger.info(f"Loaded {len(local_tools)} local tools (Search, Python REPL, Wikipedia, Arxiv, Vector Store).")
+
+    # 2. Fetch remote tools from the configured MCP servers, if any.
+    servers = resolve_mcp_servers(context)
+    if not servers:
+        return local_tools
+    remote_tools = await get_mcp_tools(
+        servers,
+        ttl=context.mcpo_tools_ttl,
+        timeout=context.mcpo_timeout,
+        reserved_names=frozenset(t.name for t in local_tools),
+    )
 
     # 3. Combine and return all tools.
-    all_tools = local_tools + remote_tools
-    logger.info(f"Total tools created: {len(all_tools)}.")
-    return all_tools
\ No newline at end of file
+    return local_tools + remote_tools
@@ -1,11 +1,15 @@
 """Utility & helper functions."""
 
-from typing import Any, Dict, List, Union
+import hashlib
+import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
 from langchain_core.language_models import BaseChatModel
 from langchain_core.messages import BaseMessage
+from langchain_core.runnables import Runnable
 
-from .models import create_model
+from .cache import LRUCache
+from .models import ModelPool, create_model
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -42,20 +46,82 @@ def get_message_text(msg: BaseMessage) -> str:
     return ""
 
 
-def load_chat_model(model_string: str) -> BaseChatModel:
+# Process-wide pool of chat model instances. The factory looks up
+# `create_model` at call time so it can be patched in tests.
+_model_pool = ModelPool(lambda model_string, **kwargs: create_model(model_string, **kwargs))
+
+# Tool-set fingerprints, memoized because `BaseTool.args` rebuilds the JSON
+# schema on every access. Pydantic tools are unhashable, so entries are keyed
+# on the identities of the tools and keep the tools themselves alive, which
+# stops a key from being reused by another set while it is cached.
+TOOL_FINGERPRINT_CACHE_SIZE = 64
+_tool_fingerprints: LRUCache[Tuple[int, ...], Tuple[Tuple[Any, ...], str]] = LRUCache(
+    maxsize=TOOL_FINGERPRINT_CACHE_SIZE
+)
+
+
+def _fingerprint_tool(tool: Any) -> str:
+    name = getattr(tool, "name", None) or getattr(tool, "__name__", repr(tool))
+    description = getattr(tool, "description", "") or ""
+    try:
+        args = getattr(tool, "args", {})
+    except Exception:
+        args = {}
+    return json.dumps([str(name), str(description), args], sort_keys=True, default=str)
+
+
+def get_tool_fingerprint(tools: Sequence[Any]) -> str:
+    """Compute a stable fingerprint for a set of tools.
+
+    The fingerprint depends only on each tool's name, description, and
+    argument schema, so two equivalent tool sets (e.g. after the tool registry
+    rebuilds an entry) produce the same value. It is computed once per set of
+    tool objects and looked up by their identities afterwards.
+
+    Args:
+        tools: The tools to fingerprint.
+
+    Returns:
+        A hex digest identifying the tool set.
+    """
+    tool_set = tuple(tools)
+    key = tuple(id(tool) for tool in tool_set)
+    cached = _tool_fingerprints.get(key)
+    if cached is not None:
+        return cached[1]
+    hasher = hashlib.sha256()
+    for tool in tool_set:
+        hasher.update(_fingerprint_tool(tool).encode("utf-8"))
+        hasher.update(b"\0")
+    fingerprint = hasher.hexdigest()
+    _tool_fingerprints.set(key, (tool_set, fingerprint))
+    return fingerprint
+
+
+def load_chat_model(
+    model_string: str, tools: Optional[Sequence[Any]] = None
+) -> Union[BaseChatModel, Runnable[Any, Any]]:
     """
     Load a chat model using the centralized model factory.
 
-    This function acts as a wrapper around the `create_model` function,
-    providing a consistent way to load any supported chat model using a
-    'provider:model_name' string.
+    Models are served from a process-wide pool keyed on the model string, so
+    repeated calls return the same instance and reuse its warm connections.
+    When `tools` is given, the pooled model's `bind_tools` result is memoized
+    on the tool set's fingerprint and returned instead.
 
     Args:
         model_string: A string identifying the model and its provider
                       (e.g., "openai:gpt-4o-mini", "groq:llama3-70b-8192").
+        tools: Optional tools to bind to the model.
 
     Returns:
-        An initialized instance of the specified chat model.
+        The pooled instance of the specified chat model, bound to `tools` if given.
     """
-    # Delegate the model creation to our new, centralized factory function.
-    return create_model(model_string)
+    if tools is None:
+        return _model_pool.get(model_string)
+    return _model_pool.get_bound(model_string, tools, get_tool_fingerprint(tools))
+
+
+def clear_model_pool() -> None:
+    """Evict every pooled chat model instance and close its clients."""
+    _model_pool.clear()
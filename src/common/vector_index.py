@@ -0,0 +1,445 @@
+"""FAISS index construction for the vector store.
+
+Supports exact (`flat`) search and two approximate nearest-neighbour index
+types: `hnsw` (graph-based, no training) and `ivf` (inverted lists, trained
+on the data). All indexes use L2 distance, like the original flat index.
+
+Any index type can store compressed codes instead of float32 vectors:
+`sq8` (one byte per dimension, 4x smaller) or `pq` (product quantization,
+`pq_m` bytes per vector). `RerankingIndex` recovers the accuracy lost to
+compression by re-scoring the top candidates against exact vectors kept in
+a file on disk rather than in memory.
+
+`search_index` restricts a search to a subset of positions, either by
+scoring the subset exactly when it is small or by passing a FAISS
+`IDSelector` into the index's own search, so filtered searches never
+over-fetch and post-filter.
+
+FAISS is imported lazily so importing this module stays cheap.
+"""
+
+import logging
+import math
+import tempfile
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    import faiss  # type: ignore[import-untyped]
+    import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_TYPES = ("flat", "hnsw", "ivf")
+# Filtered searches over at most this many positions are scored exactly.
+EXACT_SUBSET_LIMIT = 2048
+QUANTIZATION_TYPES = ("none", "sq8", "pq")
+
+# Defaults for the tunable parameters of each index type.
+DEFAULT_INDEX_PARAMS: Dict[str, Any] = {
+    "m": 32,  # HNSW: neighbours per node
+    "ef_construction": 40,  # HNSW: candidate list size while building
+    "ef_search": 64,  # HNSW: candidate list size while searching
+    "nlist": 0,  # IVF: number of inverted lists; 0 picks one from the corpus size
+    "nprobe": 8,  # IVF: lists visited per query
+    "pq_m": 0,  # PQ: sub-quantizers, i.e. bytes per vector; 0 picks one from the dimension
+    "pq_nbits": 8,  # PQ: bits per sub-quantizer code
+}
+
+
+def validate_index_type(kind: str) -> str:
+    """Return the normalized index type, raising ValueError if it is unknown."""
+    normalized = str(kind).strip().lower()
+    if normalized not in INDEX_TYPES:
+        raise ValueError(
+            f"Unsupported vector index type: '{kind}'. "
+            f"Supported types are {', '.join(repr(t) for t in INDEX_TYPES)}."
+        )
+    return normalized
+
+
+def validate_quantization(quantization: str) -> str:
+    """Return the normalized quantization type, raising ValueError if it is unknown."""
+    normalized = str(quantization).strip().lower()
+    if normalized not in QUANTIZATION_TYPES:
+        raise ValueError(
+            f"Unsupported vector quantization: '{quantization}'. "
+            f"Supported types are {', '.join(repr(t) for t in QUANTIZATION_TYPES)}."
+        )
+    return normalized
+
+
+def resolve_index_params(params: Optional[Mapping[str, Any]] = None) -> Dict[str, Any]:
+    """Merge user-supplied index parameters over the defaults."""
+    resolved = dict(DEFAULT_INDEX_PARAMS)
+    resolved.update(params or {})
+    return resolved
+
+
+def auto_nlist(num_vectors: int) -> int:
+    """Pick a number of IVF lists for a corpus size.
+
+    Uses the usual `4 * sqrt(n)` rule of thumb, capped so every list gets at
+    least 39 training points (FAISS's minimum for stable k-means).
+    """
+    return max(1, min(int(4 * math.sqrt(num_vectors)), num_vectors // 39))
+
+
+def auto_pq_m(dimension: int) -> int:
+    """Pick a number of PQ sub-quantizers for a dimension.
+
+    Aims for sub-vectors of about 8 dimensions (a 16x compression at 8 bits
+    per code), using the largest divisor of `dimension` that does not exceed
+    `dimension // 8`.
+    """
+    target = max(1, dimension // 8)
+    return next(m for m in range(target, 0, -1) if dimension % m == 0)
+
+
+def _pq_shape(dimension: int, num_vectors: int, options: Mapping[str, Any]) -> Tuple[int, int]:
+    m = int(options["pq_m"]) or auto_pq_m(dimension)
+    if dimension % m:
+        raise ValueError(f"pq_m={m} must divide the embedding dimension {dimension}.")
+    # k-means wants ~39 training points per centroid; use fewer bits on small corpora.
+    affordable_bits = int(math.log2(num_vectors / 39)) if num_vectors >= 78 else 1
+    return m, max(1, min(int(options["pq_nbits"]), affordable_bits))
+
+
+def create_flat_index(dimension: int) -> "faiss.Index":
+    """Create an empty exact-search L2 index."""
+    import faiss
+
+    return faiss.IndexFlatL2(dimension)
+
+
+def build_index(
+    kind: str,
+    vectors: "np.ndarray",
+    params: Optional[Mapping[str, Any]] = None,
+    quantization: str = "none",
+) -> "faiss.Index":
+    """Build an index of the given type over `vectors`.
+
+    Args:
+        kind: One of `INDEX_TYPES`.
+        vectors: A `(n, d)` float32 array of vectors to index, in order, so
+                 position `i` of the new index holds `vectors[i]`. Quantized
+                 and IVF indexes are also trained on them.
+        params: Overrides for `DEFAULT_INDEX_PARAMS`.
+        quantization: One of `QUANTIZATION_TYPES`.
+
+    Returns:
+        The populated index.
+    """
+    import faiss
+    import numpy as np
+
+    kind = validate_index_type(kind)
+    quantization = validate_quantization(quantization)
+    options = resolve_index_params(params)
+    vectors = np.ascontiguousarray(vectors, dtype="float32")
+    num_vectors, dimension = vectors.shape
+    sq8 = faiss.ScalarQuantizer.QT_8bit
+    if quantization == "pq":
+        pq_m, pq_nbits = _pq_shape(dimension, num_vectors, options)
+
+    if kind == "flat":
+        if quantization == "sq8":
+            index = faiss.IndexScalarQuantizer(dimension, sq8, faiss.METRIC_L2)
+        elif quantization == "pq":
+            index = faiss.IndexPQ(dimension, pq_m, pq_nbits)
+        else:
+            index = faiss.IndexFlatL2(dimension)
+    elif kind == "hnsw":
+        if quantization == "sq8":
+            index = faiss.IndexHNSWSQ(dimension, sq8, int(options["m"]))
+        elif quantization == "pq":
+            index = faiss.IndexHNSWPQ(dimension, pq_m, int(options["m"]), pq_nbits)
+        else:
+            index = faiss.IndexHNSWFlat(dimension, int(options["m"]))
+        index.hnsw.efConstruction = int(options["ef_construction"])
+        index.hnsw.efSearch = int(options["ef_search"])
+    else:
+        nlist = int(options["nlist"]) or auto_nlist(num_vectors)
+        quantizer = faiss.IndexFlatL2(dimension)
+        if quantization == "sq8":
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq8)
+        elif quantization == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_nbits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        index.nprobe = min(int(options["nprobe"]), nlist)
+
+    if not index.is_trained:
+        index.train(vectors)
+    ensure_direct_map(index)
+    if num_vectors:
+        index.add(vectors)
+    logger.info(
+        f"Built {kind} index ({quantization} quantization) over {num_vectors} vectors "
+        f"(dimension={dimension})."
+    )
+    return index
+
+
+def index_kind(index: Any) -> str:
+    """Return the `INDEX_TYPES` name of an index built by this module."""
+    import faiss
+
+    index = getattr(index, "base_index", index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf"
+    return "flat"
+
+
+def index_quantization(index: Any) -> str:
+    """Return the `QUANTIZATION_TYPES` name of an index built by this module."""
+    import faiss
+
+    index = getattr(index, "base_index", index)
+    if isinstance(index, faiss.IndexHNSW):
+        index = faiss.downcast_index(index.storage)
+    if isinstance(index, faiss.IndexScalarQuantizer | faiss.IndexIVFScalarQuantizer):
+        return "sq8"
+    if isinstance(index, faiss.IndexPQ | faiss.IndexIVFPQ):
+        return "pq"
+    return "none"
+
+
+def ensure_direct_map(index: Any) -> None:
+    """Give an IVF index the position -> list map that reconstructing vectors needs.
+
+    Building the map changes the index, so this is done when an index is
+    built or restored, before it is shared, and never from a search or read
+    that may run concurrently with others.
+    """
+    import faiss
+
+    base = getattr(index, "base_index", index)
+    if isinstance(base, faiss.IndexIVF) and base.direct_map.type == faiss.DirectMap.NoMap:
+        base.make_direct_map()
+
+
+def _can_reconstruct(index: Any) -> bool:
+    import faiss
+
+    return not (isinstance(index, faiss.IndexIVF) and index.direct_map.type == faiss.DirectMap.NoMap)
+
+
+def reconstruct_vectors(index: "faiss.Index", start: int = 0, end: Optional[int] = None) -> "np.ndarray":
+    """Return the stored vectors at positions `[start, end)` of an index.
+
+    Raises:
+        ValueError: If the index is an IVF index without a direct map (see
+            `ensure_direct_map`).
+    """
+    import numpy as np
+
+    end = index.ntotal if end is None else end
+    if end <= start:
+        return np.empty((0, index.d), dtype="float32")
+    if not _can_reconstruct(index):
+        raise ValueError("IVF index has no direct map; call ensure_direct_map before sharing it.")
+    vectors: np.ndarray = index.reconstruct_n(start, end - start)
+    return vectors
+
+
+def _selector_params(index: Any, selector: "faiss.IDSelector") -> "faiss.SearchParameters":
+    """Return search parameters applying `selector` while keeping the index's own tuning."""
+    import faiss
+
+    if isinstance(index, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=index.hnsw.efSearch)
+    if isinstance(index, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=index.nprobe)
+    return faiss.SearchParameters(sel=selector)
+
+
+def _empty_results(num_queries: int, k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    import numpy as np
+
+    return np.full((num_queries, k), np.inf, dtype="float32"), np.full((num_queries, k), -1, dtype="int64")
+
+
+def _search_subset(index: Any, queries: "np.ndarray", k: int, ids: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+    """Score the vectors at `ids` exactly, for subsets too small to be worth an index search."""
+    import faiss
+    import numpy as np
+
+    vectors = np.vstack([index.reconstruct(int(i)) for i in ids]).astype("float32")
+    distances, labels = _empty_results(len(queries), k)
+    found_distances, found = faiss.knn(queries, vectors, min(k, len(ids)))
+    distances[:, : found.shape[1]] = found_distances
+    labels[:, : found.shape[1]] = np.where(found >= 0, ids[np.maximum(found, 0)], -1)
+    return distances, labels
+
+
+def search_index(
+    index: Any, queries: "np.ndarray", k: int, ids: Optional["np.ndarray"] = None
+) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Search an index, optionally only among the vectors at positions `ids`.
+
+    Small subsets (up to `EXACT_SUBSET_LIMIT`) are scored exactly against
+    the reconstructed vectors, so the cost of a selective filter scales with
+    the number of matches. Larger
+    subsets are searched through the index with an `IDSelectorBatch`, which
+    FAISS applies during the scan or graph traversal.
+
+    Args:
+        index: An index built by this module, a `RerankingIndex`, or the
+               `IndexShards` of a memory-mapped snapshot.
+        queries: A `(n, d)` float32 array of query vectors.
+        k: The number of results per query.
+        ids: The positions to search among, or None to search everything.
+
+    Returns:
+        FAISS-style `(distances, labels)` arrays, padded with `inf` and -1.
+    """
+    import faiss
+    import numpy as np
+
+    queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, index.d)
+    results: Tuple[np.ndarray, np.ndarray]
+    if ids is None:
+        results = index.search(queries, k)
+        return results
+    ids = np.unique(np.asarray(ids, dtype="int64"))
+    if not len(ids):
+        return _empty_results(len(queries), k)
+
+    if isinstance(index, faiss.IndexShards):
+        # Shards number their vectors from zero; search each with local positions.
+        distances, labels = _empty_results(len(queries), 0)
+        offset = 0
+        for shard in index.referenced_segments:
+            local = ids[(ids >= offset) & (ids < offset + shard.ntotal)] - offset
+            if len(local):
+                shard_distances, shard_labels = search_index(shard, queries, k, local)
+                distances = np.hstack([distances, shard_distances])
+                labels = np.hstack([labels, np.where(shard_labels >= 0, shard_labels + offset, -1)])
+            offset += shard.ntotal
+        order = np.argsort(distances, axis=1)[:, :k]
+        distances = np.take_along_axis(distances, order, axis=1)
+        labels = np.take_along_axis(labels, order, axis=1)
+        padded_distances, padded_labels = _empty_results(len(queries), k)
+        padded_distances[:, : distances.shape[1]] = distances
+        padded_labels[:, : labels.shape[1]] = labels
+        return padded_distances, padded_labels
+
+    base = getattr(index, "base_index", index)
+    # Flat PQ indexes do not accept selectors, so they always score the subset.
+    # An IVF index without a direct map cannot reconstruct, so it always uses one.
+    if (len(ids) <= EXACT_SUBSET_LIMIT and _can_reconstruct(index)) or isinstance(base, faiss.IndexPQ):
+        return _search_subset(index, queries, k, ids)
+    selector = faiss.IDSelectorBatch(ids)
+    results = index.search(queries, k, params=_selector_params(base, selector))
+    return results
+
+
+class RerankingIndex:
+    """Wraps a quantized index and re-ranks its results by exact distance.
+
+    Each search asks the quantized index for `k * factor` candidates, reads
+    their float32 vectors from a file on disk, and returns the `k` that are
+    truly closest. The float copy is memory-mapped, so it costs disk space
+    rather than resident memory, and only the candidate rows are paged in.
+    `reconstruct` and `reconstruct_n` also read the exact vectors, so
+    snapshots of a re-ranked store are lossless.
+
+    Supports the parts of the FAISS index interface the vector store uses.
+
+    Args:
+        base_index: The quantized index holding `vectors`.
+        vectors: The float32 vectors stored in `base_index`, in order.
+        factor: How many candidates to fetch per requested result.
+        directory: Where to create the float file; the system temp directory by default.
+    """
+
+    def __init__(
+        self, base_index: "faiss.Index", vectors: "np.ndarray", factor: int, directory: Optional[str] = None
+    ) -> None:
+        """Wrap `base_index`, copying `vectors` to a new float file."""
+        import numpy as np
+
+        if factor < 1:
+            raise ValueError("factor must be a positive integer.")
+        self.base_index = base_index
+        self.factor = int(factor)
+        self.d = int(base_index.d)
+        # An anonymous file: it is removed from disk as soon as it is closed.
+        self._file = tempfile.TemporaryFile(dir=directory)
+        self._rows = 0
+        self._vectors = np.empty((0, self.d), dtype="float32")
+        self._append(vectors)
+
+    @property
+    def ntotal(self) -> int:
+        """The number of stored vectors."""
+        return int(self.base_index.ntotal)
+
+    @property
+    def is_trained(self) -> bool:
+        """Whether the quantized index is trained."""
+        return bool(self.base_index.is_trained)
+
+    def _append(self, vectors: "np.ndarray") -> None:
+        import numpy as np
+
+        vectors = np.ascontiguousarray(vectors, dtype="float32").reshape(-1, self.d)
+        if not len(vectors):
+            return
+        self._file.seek(self._rows * self.d * 4)
+        self._file.write(vectors.tobytes())
+        self._file.flush()
+        self._rows += len(vectors)
+        self._vectors = np.memmap(self._file, dtype="float32", mode="r", shape=(self._rows, self.d))
+
+    def add(self, vectors: "np.ndarray") -> None:
+        """Add vectors to the quantized index and the on-disk float copy."""
+        self.base_index.add(vectors)
+        self._append(vectors)
+
+    def search(
+        self, queries: "np.ndarray", k: int, params: Optional["faiss.SearchParameters"] = None
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Return the `k` nearest stored vectors by exact squared L2 distance."""
+        import numpy as np
+
+        queries = np.ascontiguousarray(queries, dtype="float32").reshape(-1, self.d)
+        _, candidates = self.base_index.search(queries, k * self.factor, params=params)
+        distances = np.full((len(queries), k), np.inf, dtype="float32")
+        labels = np.full((len(queries), k), -1, dtype="int64")
+        for row, (query, ids) in enumerate(zip(queries, candidates)):
+            # Sorted IDs read the float file in order.
+            ids = np.sort(ids[ids >= 0])
+            if not len(ids):
+                continue
+            exact = ((self._vectors[ids] - query) ** 2).sum(axis=1)
+            order = np.argsort(exact)[:k]
+            distances[row, : len(order)] = exact[order]
+            labels[row, : len(order)] = ids[order]
+        return distances, labels
+
+    def reconstruct(self, key: int) -> "np.ndarray":
+        """Return the exact stored vector at a position."""
+        import numpy as np
+
+        return np.array(self._vectors[key])
+
+    def reconstruct_n(self, start: int, count: int) -> "np.ndarray":
+        """Return the exact stored vectors at positions `[start, start + count)`."""
+        import numpy as np
+
+        return np.array(self._vectors[start:start + count])
+
+    def remove_ids(self, ids: Any) -> int:
+        """Not supported: the float file cannot drop rows."""
+        raise RuntimeError("Re-ranked quantized indexes do not support deleting vectors.")
+
+    def close(self) -> None:
+        """Release the on-disk float copy."""
+        import numpy as np
+
+        self._vectors = np.empty((0, self.d), dtype="float32")
+        self._file.close()
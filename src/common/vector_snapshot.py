@@ -0,0 +1,404 @@
+"""On-disk snapshots of the FAISS vector store.
+
+A snapshot directory holds:
+
+- `manifest.json`: the vector count, dimension, segment list, index file and
+  the committed length of the docstore log. It is replaced atomically and
+  written last, so a crash mid-snapshot leaves the previous snapshot intact.
+- `segment-NNNNNN.faiss`: flat FAISS indexes holding consecutive runs of
+  the exact vectors. Each incremental snapshot writes only the vectors added
+  since the last one as a new segment, instead of rewriting every vector.
+  Segments are merged size-tiered: a new segment absorbs the segments
+  before it while they are no larger than it, so each vector is rewritten
+  O(log n) times rather than on every snapshot.
+- `index-NNNNNN.faiss`: for stores promoted to an HNSW, IVF or quantized
+  index, that index as FAISS wrote it, covering the first `count` vectors.
+  Restores read it back instead of rebuilding a flat index, and add any
+  vectors snapshotted since. It is rewritten once those exceed
+  `INDEX_REWRITE_RATIO` of it, or on `compact`.
+- `docstore.jsonl`: one line per vector position with its docstore ID, text
+  and metadata, appended to in the same way.
+
+Read-only restores memory-map the index (`IO_FLAG_MMAP_IFC`) and serve
+searches straight from the mapped files, letting worker processes share
+pages through the OS page cache; writable restores load a private copy,
+since FAISS cannot add to a mapped index.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from .vector_index import (
+    RerankingIndex,
+    create_flat_index,
+    ensure_direct_map,
+    index_kind,
+    index_quantization,
+    reconstruct_vectors,
+)
+
+if TYPE_CHECKING:
+    import faiss  # type: ignore[import-untyped]
+    from langchain_community.docstore.base import Docstore
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 2
+# Version 1 snapshots have flat segments only, which version 2 reads as is.
+_READABLE_VERSIONS = (1, 2)
+MANIFEST_FILE = "manifest.json"
+DOCSTORE_FILE = "docstore.jsonl"
+
+# The index file is rewritten once the vectors added since it was written
+# exceed this fraction of it, keeping restores cheap at an amortized cost of
+# a few index writes per vector.
+INDEX_REWRITE_RATIO = 0.25
+
+
+def read_manifest(path: str) -> Optional[Dict[str, Any]]:
+    """Return the manifest of the snapshot in `path`, or None if there is none."""
+    manifest_path = Path(path).expanduser() / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    manifest: Dict[str, Any] = json.loads(manifest_path.read_text(encoding="utf-8"))
+    if manifest.get("version") not in _READABLE_VERSIONS:
+        raise ValueError(
+            f"Unsupported vector store snapshot version {manifest.get('version')!r} in {path}."
+        )
+    return manifest
+
+
+def _write_manifest(directory: Path, manifest: Dict[str, Any]) -> None:
+    temp_path = directory / f"{MANIFEST_FILE}.tmp"
+    temp_path.write_text(json.dumps(manifest), encoding="utf-8")
+    os.replace(temp_path, directory / MANIFEST_FILE)
+
+
+def _write_segment(directory: Path, number: int, vectors: Any) -> Dict[str, Any]:
+    import faiss
+
+    segment = create_flat_index(vectors.shape[1])
+    segment.add(vectors)
+    name = f"segment-{number:06d}.faiss"
+    faiss.write_index(segment, str(directory / name))
+    return {"file": name, "count": int(len(vectors))}
+
+
+def _read_segment(directory: Path, segment: Dict[str, Any]) -> "faiss.Index":
+    """Memory-map a segment. The result must never be written to."""
+    import faiss
+
+    return faiss.read_index(
+        str(directory / segment["file"]), faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+    )
+
+
+def _write_index(directory: Path, number: int, index: Any) -> Dict[str, Any]:
+    """Write a promoted index as FAISS serializes it, unwrapping re-ranking."""
+    import faiss
+
+    name = f"index-{number:06d}.faiss"
+    faiss.write_index(getattr(index, "base_index", index), str(directory / name))
+    return {
+        "file": name,
+        "count": int(index.ntotal),
+        "kind": index_kind(index),
+        "quantization": index_quantization(index),
+    }
+
+
+def _segment_vectors(directory: Path, manifest: Dict[str, Any], start: int, end: int) -> Any:
+    """Return the exact vectors at positions `[start, end)` from the segments."""
+    import numpy as np
+
+    parts = [np.empty((0, manifest["dimension"]), dtype="float32")]
+    offset = 0
+    for segment in manifest["segments"]:
+        low, high = max(start, offset), min(end, offset + segment["count"])
+        if low < high:
+            parts.append(reconstruct_vectors(_read_segment(directory, segment), low - offset, high - offset))
+        offset += segment["count"]
+    return np.concatenate(parts)
+
+
+def _tier_segments(segments: List[Dict[str, Any]], max_segments: int) -> int:
+    """Return how many trailing segments to merge after a new one was appended.
+
+    The new segment absorbs the segments before it while each is no larger
+    than what has been gathered so far, so a vector's segment at least
+    doubles in size each time it is rewritten. If that still leaves more
+    than `max_segments`, the smallest trailing segments are merged too.
+    """
+    gathered = segments[-1]["count"]
+    run = 1
+    while run < len(segments) and segments[-run - 1]["count"] <= gathered:
+        gathered += segments[-run - 1]["count"]
+        run += 1
+    return max(run, len(segments) - max(1, max_segments) + 1)
+
+
+def _docstore_lines(
+    docstore: "Docstore", index_to_docstore_id: Dict[int, str], start: int, end: int
+) -> bytes:
+    lines = []
+    for position in range(start, end):
+        doc_id = index_to_docstore_id[position]
+        document = docstore.search(doc_id)
+        if isinstance(document, str):
+            raise ValueError(f"Docstore is missing document {doc_id!r} at position {position}.")
+        record = {"id": doc_id, "page_content": document.page_content, "metadata": document.metadata}
+        lines.append(json.dumps(record, ensure_ascii=False))
+    return "".join(line + "\n" for line in lines).encode("utf-8")
+
+
+def write_snapshot(
+    index: "faiss.Index",
+    docstore: "Docstore",
+    index_to_docstore_id: Dict[int, str],
+    path: str,
+    *,
+    compact: bool = False,
+    max_segments: int = 16,
+) -> Dict[str, Any]:
+    """Write a store's index and docstore to a snapshot directory.
+
+    If the directory already holds a snapshot of a prefix of this store,
+    only the vectors and documents added since are written, as a new segment
+    and appended docstore lines, and segments are merged size-tiered (see
+    `_tier_segments`). Otherwise, or when `compact` is set, the snapshot is
+    rewritten as a single segment. An HNSW, IVF or quantized index is also
+    written as an index file when it has none of its type, or when it has
+    fallen `INDEX_REWRITE_RATIO` behind.
+
+    The caller must keep the index from changing while this runs.
+
+    Args:
+        index: The store's FAISS index.
+        docstore: The store's docstore.
+        index_to_docstore_id: The store's mapping from index position to docstore ID.
+        path: The snapshot directory, created if needed.
+        compact: Rewrite the whole snapshot as one segment and one index file.
+        max_segments: The most segments to keep; beyond it the smallest trailing ones are merged.
+
+    Returns:
+        The new manifest.
+    """
+    directory = Path(path).expanduser()
+    directory.mkdir(parents=True, exist_ok=True)
+    total = int(index.ntotal)
+    manifest = read_manifest(path)
+
+    is_prefix = (
+        manifest is not None
+        and manifest["dimension"] == index.d
+        and manifest["count"] <= total
+        and (manifest["count"] == 0 or index_to_docstore_id.get(manifest["count"] - 1) == manifest["last_id"])
+    )
+    write_index, kept_index = _plan_index_file(index, manifest if is_prefix and not compact else None)
+    up_to_date = manifest is not None and is_prefix and manifest["count"] == total and not compact
+    if manifest is not None and up_to_date and not write_index and kept_index == manifest.get("index"):
+        return manifest
+
+    previous_files = [segment["file"] for segment in manifest["segments"]] if manifest else []
+    if manifest and manifest.get("index"):
+        previous_files.append(manifest["index"]["file"])
+    merged_files: List[str] = []
+    next_segment = manifest["next_segment"] if manifest else 0
+    docstore_path = directory / DOCSTORE_FILE
+
+    if manifest is not None and is_prefix and not compact:
+        start = manifest["count"]
+        segments = list(manifest["segments"])
+        if start < total:
+            segments.append(_write_segment(directory, next_segment, reconstruct_vectors(index, start)))
+            next_segment += 1
+            with open(docstore_path, "r+b" if docstore_path.exists() else "w+b") as docstore_file:
+                # Drop anything a crashed snapshot appended past the committed length.
+                docstore_file.truncate(manifest["docstore_bytes"])
+                docstore_file.seek(manifest["docstore_bytes"])
+                docstore_file.write(_docstore_lines(docstore, index_to_docstore_id, start, total))
+                docstore_bytes = docstore_file.tell()
+            run = _tier_segments(segments, max_segments)
+            if run > 1:
+                tail = segments[-run:]
+                merged_files = [segment["file"] for segment in tail]
+                segments[-run:] = [_merge_segments(directory, tail, next_segment)]
+                next_segment += 1
+        else:
+            docstore_bytes = manifest["docstore_bytes"]
+        mode = "incremental"
+    else:
+        segments = [_write_segment(directory, next_segment, reconstruct_vectors(index))]
+        next_segment += 1
+        temp_docstore = directory / f"{DOCSTORE_FILE}.tmp"
+        temp_docstore.write_bytes(_docstore_lines(docstore, index_to_docstore_id, 0, total))
+        os.replace(temp_docstore, docstore_path)
+        docstore_bytes = docstore_path.stat().st_size
+        mode = "full"
+
+    index_entry = kept_index
+    if write_index:
+        index_entry = _write_index(directory, next_segment, index)
+        next_segment += 1
+
+    new_manifest = {
+        "version": SNAPSHOT_VERSION,
+        "dimension": int(index.d),
+        "count": total,
+        "last_id": index_to_docstore_id.get(total - 1) if total else None,
+        "segments": segments,
+        "index": index_entry,
+        "next_segment": next_segment,
+        "docstore_bytes": docstore_bytes,
+    }
+    _write_manifest(directory, new_manifest)
+
+    live_files = {segment["file"] for segment in segments}
+    if index_entry:
+        live_files.add(index_entry["file"])
+    for name in previous_files + merged_files:
+        if name not in live_files:
+            (directory / name).unlink(missing_ok=True)
+    logger.info(f"Wrote {mode} vector store snapshot to {directory} ({total} vectors, {len(segments)} segments).")
+    return new_manifest
+
+
+def _plan_index_file(index: Any, manifest: Optional[Dict[str, Any]]) -> Tuple[bool, Optional[Dict[str, Any]]]:
+    """Decide whether to write the index file.
+
+    Returns whether to write it and, if not, the manifest's entry to keep,
+    which may lag behind until it is due for a rewrite. A flat store needs
+    no index file.
+    """
+    kind, quantization = index_kind(index), index_quantization(index)
+    if (kind, quantization) == ("flat", "none"):
+        return False, None
+    entry = manifest.get("index") if manifest else None
+    if not entry or (entry["kind"], entry["quantization"]) != (kind, quantization):
+        return True, None
+    if int(index.ntotal) - entry["count"] > INDEX_REWRITE_RATIO * entry["count"]:
+        return True, None
+    return False, entry
+
+
+def _merge_segments(directory: Path, segments: List[Dict[str, Any]], number: int) -> Dict[str, Any]:
+    import numpy as np
+
+    vectors = np.concatenate([reconstruct_vectors(_read_segment(directory, s)) for s in segments])
+    return _write_segment(directory, number, vectors)
+
+
+def load_snapshot(
+    path: str,
+    *,
+    read_only: bool = False,
+    rerank_factor: int = 0,
+    rerank_directory: Optional[str] = None,
+) -> Tuple["faiss.Index", "InMemoryDocstore", Dict[int, str]]:
+    """Restore an index and docstore from a snapshot directory.
+
+    A promoted store comes back as the index type it was saved as, with the
+    vectors snapshotted since its index file was written added to it.
+
+    Args:
+        path: The snapshot directory.
+        read_only: Serve the index from memory-mapped files instead of
+                   loading it into memory. The returned index must not be
+                   added to.
+        rerank_factor: If positive and the saved index is quantized, wrap it
+                       in a `RerankingIndex` over the snapshot's exact vectors.
+        rerank_directory: Where the `RerankingIndex` keeps its exact vectors.
+
+    Returns:
+        An `(index, docstore, index_to_docstore_id)` tuple.
+    """
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_core.documents import Document
+
+    manifest = read_manifest(path)
+    if manifest is None:
+        raise FileNotFoundError(f"No vector store snapshot found in {path}.")
+    directory = Path(path).expanduser()
+    if manifest.get("index"):
+        index = _load_promoted_index(directory, manifest, read_only, rerank_factor, rerank_directory)
+    else:
+        index = _load_flat_index(directory, manifest, read_only)
+
+    documents: Dict[str, Document] = {}
+    index_to_docstore_id: Dict[int, str] = {}
+    with open(directory / DOCSTORE_FILE, "rb") as docstore_file:
+        data = docstore_file.read(manifest["docstore_bytes"])
+    for position, line in enumerate(data.decode("utf-8").splitlines()):
+        record = json.loads(line)
+        documents[record["id"]] = Document(
+            id=record["id"], page_content=record["page_content"], metadata=record["metadata"]
+        )
+        index_to_docstore_id[position] = record["id"]
+
+    if len(index_to_docstore_id) != index.ntotal:
+        raise ValueError(
+            f"Corrupt vector store snapshot in {path}: {index.ntotal} vectors "
+            f"but {len(index_to_docstore_id)} documents."
+        )
+    logger.info(
+        f"Restored {index_kind(index)} vector store snapshot from {directory} ({index.ntotal} vectors, "
+        f"{'memory-mapped' if read_only else 'in memory'})."
+    )
+    return index, InMemoryDocstore(documents), index_to_docstore_id
+
+
+def _load_flat_index(directory: Path, manifest: Dict[str, Any], read_only: bool) -> "faiss.Index":
+    import faiss
+
+    if not read_only:
+        # A private copy: read the first segment whole, then append the rest.
+        segments = manifest["segments"]
+        if not segments:
+            return create_flat_index(manifest["dimension"])
+        index = faiss.read_index(str(directory / segments[0]["file"]))
+        for segment in segments[1:]:
+            index.add(reconstruct_vectors(_read_segment(directory, segment)))
+        return index
+    mapped = [_read_segment(directory, segment) for segment in manifest["segments"]]
+    if len(mapped) == 1:
+        return mapped[0]
+    # Searches every mapped segment, offsetting IDs so positions stay global.
+    shards = faiss.IndexShards(manifest["dimension"], False, True)
+    for segment in mapped:
+        shards.add_shard(segment)
+    shards.referenced_segments = mapped
+    return shards
+
+
+def _load_promoted_index(
+    directory: Path,
+    manifest: Dict[str, Any],
+    read_only: bool,
+    rerank_factor: int,
+    rerank_directory: Optional[str],
+) -> Any:
+    import faiss
+
+    entry = manifest["index"]
+    behind = manifest["count"] - entry["count"]
+    # FAISS cannot add to a mapped index, so one with vectors to catch up on is loaded.
+    mapped = read_only and behind == 0
+    if read_only and not mapped:
+        logger.warning(
+            f"The index file in {directory} lacks the last {behind} vectors, so it is loaded "
+            "into memory rather than mapped; save the store with compact=True to map it."
+        )
+    flags = faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY if mapped else 0
+    index: Any = faiss.read_index(str(directory / entry["file"]), flags)
+    # Snapshots saved before IVF indexes were built with a direct map lack one.
+    ensure_direct_map(index)
+    if entry["quantization"] != "none" and rerank_factor > 0:
+        exact = _segment_vectors(directory, manifest, 0, entry["count"])
+        index = RerankingIndex(index, exact, rerank_factor, rerank_directory)
+    if behind:
+        index.add(_segment_vectors(directory, manifest, entry["count"], manifest["count"]))
+    return index
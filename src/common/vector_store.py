@@ -1,21 +1,834 @@
-import faiss
-from langchain.vectorstores import FAISS
-from langchain.embeddings import OpenAIEmbeddings
-from langchain.docstore.in_memory import InMemoryDocstore
+"""A lazily initialized, namespaced FAISS vector store shared by the agent's tools.
 
-# Initialize a FAISS vector store
-embedding_size = 1536  # Dimensions of OpenAI embeddings
-index = faiss.IndexFlatL2(embedding_size)
-embedding_fn = OpenAIEmbeddings().embed_query
-docstore = InMemoryDocstore({})
+Nothing expensive happens at import time: FAISS, the embedding client, and
+the index are only created on the first `add_document` or `search_documents`
+call, using the settings recorded by `configure_vector_store`.
 
-vector_store = FAISS(embedding_fn, index, docstore, {})
+Documents live in namespaces (collections), for example one per tenant or
+per conversation thread. Each namespace has its own index, docstore, lock,
+and metadata index, so a search only scans its own namespace and a write to
+one namespace never waits for searches in another. Searches can be filtered
+by document metadata; the filter is resolved to index positions before the
+search and applied inside it (see `vector_index.search_index`), so k results
+come back even when few documents match.
 
-def add_document(document: str):
+Each namespace also keeps a BM25 index of its texts (see `lexical_index`).
+Searches run in one of three modes: "vector" embeds the query and searches
+FAISS; "lexical" answers from the BM25 index alone, with no embedding call,
+which suits keyword and ID-like queries; "hybrid" runs both concurrently and
+merges them by reciprocal rank fusion.
+
+Documents can be added one at a time, in bulk through `add_documents` (which
+embeds them in batches), or through the per-event-loop `IngestQueue`, which
+coalesces concurrent single-document submissions into one bulk write.
+
+Each namespace starts with an exact flat index. If `Context.vector_index_type`
+names an approximate index (HNSW or IVF), or `Context.vector_quantization`
+asks for compressed codes (which must be trained on data), the namespace is
+promoted in a background thread once it holds
+`Context.vector_index_promote_threshold` documents; the flat index keeps
+serving searches until the new one is ready.
+
+When `Context.vector_store_path` is set, each namespace is restored from its
+snapshot on first use, and every write is appended to the snapshot (see
+`vector_snapshot`). With `Context.vector_store_read_only`, snapshots are
+memory-mapped instead and writes are rejected.
+"""
+
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+import weakref
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from .concurrency import ReadWriteLock
+from .context import Context
+from .embedding_cache import CachedEmbeddings, get_embedding_cache
+from .embeddings import HashingEmbeddings, create_embeddings, get_embedding_dimension
+from .lexical_index import BM25Index, reciprocal_rank_fusion
+from .metadata_index import MetadataIndex
+from .vector_index import (
+    RerankingIndex,
+    build_index,
+    create_flat_index,
+    index_kind,
+    index_quantization,
+    reconstruct_vectors,
+    search_index,
+    validate_index_type,
+    validate_quantization,
+)
+from .vector_snapshot import load_snapshot, read_manifest, write_snapshot
+
+if TYPE_CHECKING:
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_NAMESPACE = "default"
+
+SEARCH_MODES = ("vector", "lexical", "hybrid")
+
+# Hybrid searches fuse this many times k candidates from each ranking.
+HYBRID_CANDIDATE_FACTOR = 4
+
+# Namespaces that are safe to use as a directory name as they are.
+_SAFE_NAMESPACE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]{0,127}")
+
+
+@dataclass
+class _Collection:
+    """The index, documents, and locks of one namespace."""
+
+    namespace: str
+    store: "FAISS"
+    # Searches hold the index for reading; adds and the promotion hand-over for writing.
+    lock: ReadWriteLock = field(default_factory=ReadWriteLock)
+    snapshot_lock: threading.Lock = field(default_factory=threading.Lock)
+    metadata_index: MetadataIndex = field(default_factory=MetadataIndex)
+    lexical_index: BM25Index = field(default_factory=BM25Index)
+    promotion_thread: Optional[threading.Thread] = None
+
+
+_collections: Dict[str, _Collection] = {}
+# The embedding model and its output size, shared by every namespace.
+_embeddings: Optional[Tuple["Embeddings", int]] = None
+_context: Optional[Context] = None
+_default_context: Optional[Context] = None
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def configure_vector_store(context: Context) -> None:
+    """Record the context used to build the vector store on first use.
+
+    The store is process-wide, so its embedding model, dimension, path and
+    other store-level settings only take effect if they are recorded before
+    it is built; later changes to the embedding settings are logged and
+    ignored. Per-run settings, such as the namespace template, are read from
+    each run's own context instead (see `resolve_namespace`).
+
+    Args:
+        context: The agent context carrying the vector store settings.
+    """
+    global _context
+    if _collections and _context is not None:
+        for name in ("embedding_model", "embedding_dimension"):
+            if getattr(context, name) != getattr(_context, name):
+                logger.warning(
+                    f"Vector store already built with {name}="
+                    f"{getattr(_context, name)!r}; ignoring {getattr(context, name)!r}."
+                )
+        return
+    _context = context
+
+
+def _settings() -> Context:
+    """Return the recorded context, or a default one if none was recorded."""
+    global _default_context
+    if _context is not None:
+        return _context
+    if _default_context is None:
+        _default_context = Context()
+    return _default_context
+
+
+def resolve_namespace(config: Optional[Mapping[str, Any]] = None, context: Optional[Context] = None) -> str:
+    """Return the namespace a run's document tools should use.
+
+    Fills the run's `Context.vector_store_namespace` template with its
+    configurable values, so "{thread_id}" gives every conversation its own
+    collection.
+
+    Args:
+        config: The run's `RunnableConfig`.
+        context: The run's context. Each run's own template is used, so runs
+            with different templates, e.g. one per tenant, stay apart; the
+            recorded context is only a fallback for calls outside a run.
+
+    Raises:
+        ValueError: If the template names a value the run does not set.
+            Falling back to a shared namespace could leak documents between
+            tenants, so this is an error rather than a default.
+    """
+    template = (context or _settings()).vector_store_namespace
+    configurable = (config or {}).get("configurable") or {}
+    values = {key: value for key, value in configurable.items() if isinstance(value, str | int)}
+    try:
+        return _check_namespace(template.format(**values))
+    except KeyError as e:
+        raise ValueError(
+            f"vector_store_namespace '{template}' needs the configurable value {e}, "
+            "which this run does not set."
+        ) from None
+
+
+def validate_search_mode(mode: str) -> str:
+    """Return `mode` if it is a supported search mode, raising ValueError otherwise."""
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unsupported search mode: '{mode}'. Supported modes are {', '.join(SEARCH_MODES)}.")
+    return mode
+
+
+def _check_namespace(namespace: str) -> str:
+    if not isinstance(namespace, str) or not namespace:
+        raise ValueError("namespace must be a non-empty string.")
+    return namespace
+
+
+def _namespace_path(base: str, namespace: str) -> str:
+    """Return the snapshot directory of a namespace under the store's directory."""
+    if namespace == DEFAULT_NAMESPACE:
+        return base
+    name = namespace
+    if not _SAFE_NAMESPACE.fullmatch(namespace):
+        name = "ns-" + hashlib.sha256(namespace.encode("utf-8")).hexdigest()[:32]
+    return os.path.join(base, "namespaces", name)
+
+
+def _create_embeddings(context: Context) -> "Embeddings":
+    """Create the embedding model used by the vector store."""
+    return create_embeddings(context.embedding_model, dimension=context.embedding_dimension or None)
+
+
+# Backend settings that change the vectors a model returns for the same text.
+_EMBEDDING_SETTINGS = (
+    "task_type",
+    "embed_instruction",
+    "query_instruction",
+    "model_kwargs",
+    "encode_kwargs",
+    "query_encode_kwargs",
+)
+
+
+def _embedding_model_name(embeddings: "Embeddings") -> str:
+    """Return an identifier for an embedding model and its settings, used to namespace cache keys."""
+    name = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+    size = (
+        getattr(embeddings, "dimension", None)
+        or getattr(embeddings, "dimensions", None)
+        or getattr(embeddings, "size", None)
+    )
+    parts = [type(embeddings).__name__, str(name or ""), str(size or "")]
+    settings = {key: getattr(embeddings, key) for key in _EMBEDDING_SETTINGS if getattr(embeddings, key, None)}
+    if settings:
+        encoded = json.dumps(settings, sort_keys=True, default=str).encode("utf-8")
+        parts.append(hashlib.sha256(encoded).hexdigest()[:16])
+    return ":".join(parts)
+
+
+def _build_embeddings(context: Context) -> Tuple["Embeddings", int]:
+    """Create the embedding model shared by every namespace, with its output size."""
+    raw_embeddings = _create_embeddings(context)
+    embedding_size = get_embedding_dimension(raw_embeddings, context.embedding_model)
+    if context.embedding_dimension and context.embedding_dimension != embedding_size:
+        raise ValueError(
+            f"embedding_dimension is {context.embedding_dimension}, but embedding model "
+            f"'{context.embedding_model}' produces {embedding_size}-dimensional vectors."
+        )
+    if isinstance(raw_embeddings, HashingEmbeddings):
+        return raw_embeddings, embedding_size
+    # Every remote embedding request, for ingestion and for search, goes through
+    # the content-addressed cache so repeated texts never reach the network.
+    embeddings = CachedEmbeddings(
+        raw_embeddings,
+        cache=get_embedding_cache(context.embedding_cache_path, context.embedding_cache_max_entries),
+        model_name=_embedding_model_name(raw_embeddings),
+    )
+    return embeddings, embedding_size
+
+
+def _build_collection(context: Context, namespace: str) -> _Collection:
+    """Build a namespace's store, restoring it from its snapshot if there is one."""
+    global _embeddings
+    from langchain_community.docstore.in_memory import InMemoryDocstore
+    from langchain_community.vectorstores import FAISS
+    from langchain_core.documents import Document
+
+    validate_index_type(context.vector_index_type)
+    validate_quantization(context.vector_quantization)
+    validate_search_mode(context.vector_search_mode)
+    if _embeddings is None:
+        _embeddings = _build_embeddings(context)
+    embeddings, embedding_size = _embeddings
+
+    path = _namespace_path(context.vector_store_path, namespace) if context.vector_store_path else ""
+    if path and read_manifest(path) is not None:
+        index, docstore, index_to_docstore_id = load_snapshot(
+            path,
+            read_only=context.vector_store_read_only,
+            rerank_factor=int(context.vector_rerank_factor),
+            rerank_directory=context.vector_store_path,
+        )
+        if index.d != embedding_size:
+            raise ValueError(
+                f"Vector store snapshot in {path} has dimension {index.d}, "
+                f"but the embedding model produces {embedding_size}-dimensional vectors."
+            )
+        collection = _Collection(namespace, FAISS(embeddings, index, docstore, index_to_docstore_id))
+        documents: List[Document] = []
+        for position in range(len(index_to_docstore_id)):
+            document = docstore.search(index_to_docstore_id[position])
+            if isinstance(document, str):
+                raise ValueError(f"Vector store snapshot in {path} is missing document {position}.")
+            documents.append(document)
+        collection.metadata_index.add(0, (document.metadata for document in documents))
+        collection.lexical_index.add(0, (document.page_content for document in documents))
+        return collection
+    if context.vector_store_read_only:
+        # Nothing was ever written to this namespace, so there is nothing to map.
+        logger.info(f"No snapshot for vector store namespace '{namespace}'; serving it empty.")
+
+    store = FAISS(embeddings, create_flat_index(embedding_size), InMemoryDocstore({}), {})
+    logger.info(
+        f"Initialized FAISS vector store namespace '{namespace}' "
+        f"({context.embedding_model}, dimension={embedding_size})."
+    )
+    return _Collection(namespace, store)
+
+
+def _get_collection(namespace: str = DEFAULT_NAMESPACE) -> _Collection:
+    """Return a namespace's collection, building it on first access."""
+    collection = _collections.get(namespace)
+    if collection is None:
+        _check_namespace(namespace)
+        with _lock:
+            collection = _collections.get(namespace)
+            if collection is None:
+                collection = _collections[namespace] = _build_collection(_settings(), namespace)
+    return collection
+
+
+async def _aget_collection(namespace: str = DEFAULT_NAMESPACE) -> _Collection:
+    """Return a namespace's collection, building it in the thread pool on first access."""
+    collection = _collections.get(namespace)
+    if collection is not None:
+        return collection
+    return await _run_in_pool(_get_collection, namespace)
+
+
+def get_vector_store(namespace: str = DEFAULT_NAMESPACE) -> "FAISS":
+    """Return a namespace's vector store, building it on first access."""
+    return _get_collection(namespace).store
+
+
+def list_namespaces() -> List[str]:
+    """Return the namespaces loaded in this process."""
+    return sorted(_collections)
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, int(_settings().vector_store_max_workers)),
+                    thread_name_prefix="vector-store",
+                )
+    return _executor
+
+
+async def _run_in_pool(func: Callable[..., T], *args: Any) -> T:
+    """Run blocking vector store work in the store's bounded thread pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), functools.partial(func, *args))
+
+
+def reset_vector_store() -> None:
+    """Discard every namespace, the recorded settings, and the thread pool."""
+    global _embeddings, _context, _default_context, _executor
+    with _lock:
+        _collections.clear()
+        _embeddings = None
+        _context = None
+        _default_context = None
+        _ingest_queues.clear()
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+            _executor = None
+
+
+def _check_add_arguments(
+    documents: Sequence[str], metadatas: Optional[Sequence[Dict[str, Any]]], batch_size: Optional[int]
+) -> int:
+    """Validate the arguments of an add and return the effective batch size."""
+    if metadatas is not None and len(metadatas) != len(documents):
+        raise ValueError("metadatas must have the same length as documents.")
+    settings = _settings()
+    if settings.vector_store_read_only:
+        # Read-only stores search memory-mapped files that must never be written to.
+        raise RuntimeError("The vector store is read-only; documents cannot be added.")
+    batch_size = int(batch_size or settings.embedding_batch_size)
+    if batch_size <= 0:
+        raise ValueError("batch_size must be a positive integer.")
+    return batch_size
+
+
+def _batches(
+    documents: Sequence[str], metadatas: Optional[Sequence[Dict[str, Any]]], batch_size: int
+) -> Iterator[Tuple[List[str], List[Dict[str, Any]]]]:
+    for start in range(0, len(documents), batch_size):
+        texts = list(documents[start:start + batch_size])
+        if metadatas is None:
+            yield texts, [{} for _ in texts]
+        else:
+            yield texts, [dict(metadata or {}) for metadata in metadatas[start:start + batch_size]]
+
+
+def _store_embeddings(store: "FAISS") -> "Embeddings":
+    if store.embeddings is None:
+        raise RuntimeError("The vector store has no Embeddings object to batch requests with.")
+    return store.embeddings
+
+
+def _write_batch(
+    collection: _Collection, texts: List[str], vectors: List[List[float]], metadatas: List[Dict[str, Any]]
+) -> List[str]:
+    """Add embedded documents to a namespace, excluding its searches while it changes."""
+    store = collection.store
+    with collection.lock.write():
+        start = len(store.index_to_docstore_id)
+        ids = store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+        collection.metadata_index.add(start, metadatas)
+        collection.lexical_index.add(start, texts)
+    return ids
+
+
+def _after_write(collection: _Collection) -> None:
+    """Persist and, if due, promote a namespace's index after documents were added."""
+    if _settings().vector_store_path:
+        save_vector_store(namespace=collection.namespace)
+    _maybe_promote_index(collection)
+
+
+def add_documents(
+    documents: Sequence[str],
+    metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    batch_size: Optional[int] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+) -> List[str]:
+    """Add many documents to the vector store with batched embedding calls.
+
+    Documents are embedded `batch_size` at a time through a single
+    `embed_documents` request per batch and added to the index in one
+    operation per batch, instead of one request and one add per document.
+
+    Args:
+        documents: The texts to add.
+        metadatas: Optional metadata dicts, one per document.
+        batch_size: Documents per embedding request. Defaults to
+                    `Context.embedding_batch_size`.
+        namespace: The namespace to add the documents to.
+
+    Returns:
+        The docstore IDs of the added documents, in input order.
+    """
+    batch_size = _check_add_arguments(documents, metadatas, batch_size)
+    collection = _get_collection(namespace)
+    embeddings = _store_embeddings(collection.store)
+
+    ids: List[str] = []
+    for texts, batch_metadatas in _batches(documents, metadatas, batch_size):
+        vectors = embeddings.embed_documents(texts)
+        ids.extend(_write_batch(collection, texts, vectors, batch_metadatas))
+    logger.debug(f"Added {len(documents)} documents to namespace '{namespace}' in batches of {batch_size}.")
+    if documents:
+        _after_write(collection)
+    return ids
+
+
+async def aadd_documents(
+    documents: Sequence[str],
+    metadatas: Optional[Sequence[Dict[str, Any]]] = None,
+    batch_size: Optional[int] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+) -> List[str]:
+    """Add many documents to the vector store without blocking the event loop.
+
+    The async counterpart of `add_documents`: embedding requests are awaited
+    through the model's async client, and index writes, snapshots, and
+    promotion checks run in the store's bounded thread pool.
+
+    Args:
+        documents: The texts to add.
+        metadatas: Optional metadata dicts, one per document.
+        batch_size: Documents per embedding request. Defaults to
+                    `Context.embedding_batch_size`.
+        namespace: The namespace to add the documents to.
+
+    Returns:
+        The docstore IDs of the added documents, in input order.
+    """
+    batch_size = _check_add_arguments(documents, metadatas, batch_size)
+    collection = await _aget_collection(namespace)
+    embeddings = _store_embeddings(collection.store)
+
+    ids: List[str] = []
+    for texts, batch_metadatas in _batches(documents, metadatas, batch_size):
+        vectors = await embeddings.aembed_documents(texts)
+        ids.extend(await _run_in_pool(_write_batch, collection, texts, vectors, batch_metadatas))
+    logger.debug(f"Added {len(documents)} documents to namespace '{namespace}' in batches of {batch_size}.")
+    if documents:
+        await _run_in_pool(_after_write, collection)
+    return ids
+
+
+def save_vector_store(
+    path: Optional[str] = None, *, compact: bool = False, namespace: str = DEFAULT_NAMESPACE
+) -> None:
+    """Snapshot a namespace of the vector store to a directory.
+
+    Only documents added since the previous snapshot in `path` are written,
+    unless `compact` is set or the snapshot does not match this store, in
+    which case it is rewritten in full.
+
+    Args:
+        path: The snapshot directory. Defaults to the namespace's directory
+              under `Context.vector_store_path`.
+        compact: Rewrite the snapshot as a single segment.
+        namespace: The namespace to snapshot.
+    """
+    settings = _settings()
+    if not path:
+        if not settings.vector_store_path:
+            raise ValueError("No snapshot directory given and Context.vector_store_path is not set.")
+        path = _namespace_path(settings.vector_store_path, namespace)
+    collection = _get_collection(namespace)
+    store = collection.store
+    # Searches may continue while the snapshot is written; other writers may not.
+    with collection.snapshot_lock, collection.lock.read():
+        write_snapshot(
+            store.index,
+            store.docstore,
+            store.index_to_docstore_id,
+            path,
+            compact=compact,
+            max_segments=int(settings.vector_store_max_segments),
+        )
+
+
+def promote_index(
+    kind: str,
+    params: Optional[Dict[str, Any]] = None,
+    quantization: str = "none",
+    rerank_factor: int = 0,
+    rerank_directory: Optional[str] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+) -> None:
+    """Rebuild a namespace's index as `kind` while the current index keeps serving.
+
+    The vectors present when promotion starts are copied out and indexed
+    without blocking searches or writes. Vectors added in the meantime are
+    then copied over while holding the index lock for writing, and the new
+    index replaces the old one in a single attribute assignment, so
+    positions (and therefore docstore IDs) are preserved.
+
+    Args:
+        kind: The target index type (see `vector_index.INDEX_TYPES`).
+        params: Index parameters overriding `vector_index.DEFAULT_INDEX_PARAMS`.
+        quantization: How the new index stores vectors (see `vector_index.QUANTIZATION_TYPES`).
+        rerank_factor: If positive and the index is quantized, keep exact
+                       vectors on disk and re-rank `k * rerank_factor`
+                       candidates per search (see `vector_index.RerankingIndex`).
+        rerank_directory: Where to keep the exact vectors; the temp directory by default.
+        namespace: The namespace whose index is replaced.
+    """
+    collection = _get_collection(namespace)
+    store = collection.store
+    old_index = store.index
+    with collection.lock.read():
+        snapshot_size = old_index.ntotal
+        vectors = reconstruct_vectors(old_index, 0, snapshot_size)
+    new_index = build_index(kind, vectors, params, quantization)
+    if quantization != "none" and rerank_factor > 0:
+        new_index = RerankingIndex(new_index, vectors, rerank_factor, rerank_directory)
+    with collection.lock.write():
+        delta = reconstruct_vectors(old_index, snapshot_size)
+        if len(delta):
+            new_index.add(delta)
+        store.index = new_index
+    logger.info(
+        f"Promoted namespace '{namespace}' to a {kind} index with {quantization} quantization "
+        f"({new_index.ntotal} vectors, {len(delta)} added during the rebuild)."
+    )
+    settings = _settings()
+    if settings.vector_store_path and not settings.vector_store_read_only:
+        # Persist the new index so a restart restores it rather than a flat one.
+        save_vector_store(namespace=namespace)
+
+
+def _maybe_promote_index(collection: _Collection) -> None:
+    """Start a background promotion if a namespace has outgrown its flat index."""
+    settings = _settings()
+    index = collection.store.index
+    target = validate_index_type(settings.vector_index_type)
+    quantization = validate_quantization(settings.vector_quantization)
+    if (index_kind(index), index_quantization(index)) == (target, quantization):
+        return
+    if index.ntotal < int(settings.vector_index_promote_threshold):
+        return
+    with _lock:
+        thread = collection.promotion_thread
+        if thread is not None and thread.is_alive():
+            return
+        collection.promotion_thread = threading.Thread(
+            target=promote_index,
+            args=(target, dict(settings.vector_index_params or {})),
+            kwargs={
+                "quantization": quantization,
+                "rerank_factor": int(settings.vector_rerank_factor),
+                "rerank_directory": settings.vector_store_path or None,
+                "namespace": collection.namespace,
+            },
+            name=f"vector-index-promotion-{collection.namespace}",
+            daemon=True,
+        )
+        collection.promotion_thread.start()
+
+
+def wait_for_index_promotion(timeout: Optional[float] = None, namespace: Optional[str] = None) -> bool:
+    """Wait for running index promotions to finish.
+
+    Args:
+        timeout: The maximum number of seconds to wait for each promotion.
+        namespace: The namespace to wait for, or None for every namespace.
+
+    Returns:
+        True if no promotion is running when this returns.
+    """
+    if namespace is None:
+        collections = list(_collections.values())
+    else:
+        collections = [_collections[namespace]] if namespace in _collections else []
+    done = True
+    for collection in collections:
+        thread = collection.promotion_thread
+        if thread is not None:
+            thread.join(timeout)
+            done = done and not thread.is_alive()
+    return done
+
+
+def add_document(document: str, namespace: str = DEFAULT_NAMESPACE) -> None:
     """Adds a document to the vector store."""
-    vector_store.add_texts([document])
+    add_documents([document], namespace=namespace)
 
-def search_documents(query: str, k: int = 4) -> list[str]:
+
+# A queued submission: document, metadata, namespace, and the future awaiting its ID.
+_Pending = Tuple[str, Optional[Dict[str, Any]], str, "asyncio.Future[str]"]
+
+
+class IngestQueue:
+    """Coalesces concurrent document submissions into batched writes.
+
+    Each `submit` call waits for its document to be written. Pending documents
+    are flushed through `aadd_documents`, one write per namespace, so the
+    event loop stays free, as soon as `max_batch` of them have accumulated or
+    `max_delay` seconds after the first one arrived, whichever comes first.
+
+    Args:
+        max_batch: Flush once this many documents are pending.
+        max_delay: Flush at most this many seconds after the first pending document.
+    """
+
+    def __init__(self, max_batch: int, max_delay: float) -> None:
+        """Create an empty queue that flushes by batch size or delay."""
+        self.max_batch = max(1, int(max_batch))
+        self.max_delay = max(0.0, float(max_delay))
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._writes: set[asyncio.Task[None]] = set()
+
+    async def submit(
+        self, document: str, metadata: Optional[Dict[str, Any]] = None, namespace: str = DEFAULT_NAMESPACE
+    ) -> str:
+        """Queue a document and return its docstore ID once it has been written."""
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future[str] = loop.create_future()
+        self._pending.append((document, metadata, namespace, future))
+        if len(self._pending) >= self.max_batch:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay, self.flush)
+        return await future
+
+    def flush(self) -> None:
+        """Start writing every pending document now."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        by_namespace: Dict[str, List[_Pending]] = defaultdict(list)
+        for pending in batch:
+            by_namespace[pending[2]].append(pending)
+        loop = asyncio.get_running_loop()
+        for namespace, group in by_namespace.items():
+            task = loop.create_task(self._write(namespace, group))
+            self._writes.add(task)
+            task.add_done_callback(self._writes.discard)
+
+    async def _write(self, namespace: str, batch: List[_Pending]) -> None:
+        try:
+            ids = await aadd_documents(
+                [document for document, _, _, _ in batch],
+                metadatas=[metadata or {} for _, metadata, _, _ in batch],
+                namespace=namespace,
+            )
+        except Exception as e:
+            for *_, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (*_, future), doc_id in zip(batch, ids):
+            if not future.done():
+                future.set_result(doc_id)
+
+
+# One queue per event loop, since queued futures belong to the loop that made them.
+_ingest_queues: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, IngestQueue]" = weakref.WeakKeyDictionary()
+
+
+def get_ingest_queue() -> IngestQueue:
+    """Return the ingest queue for the running event loop, creating it if needed."""
+    loop = asyncio.get_running_loop()
+    queue = _ingest_queues.get(loop)
+    if queue is None:
+        settings = _settings()
+        queue = IngestQueue(
+            max_batch=settings.ingest_max_batch,
+            max_delay=settings.ingest_max_delay_ms / 1000,
+        )
+        _ingest_queues[loop] = queue
+    return queue
+
+
+def _vector_positions(
+    collection: _Collection, vector: List[float], k: int, filter: Optional[Mapping[str, Any]]
+) -> List[int]:
+    """Return the positions nearest to `vector`, never searching during a write to the namespace."""
+    import numpy as np
+
+    with collection.lock.read():
+        ids = collection.metadata_index.positions(filter) if filter else None
+        _, labels = search_index(collection.store.index, np.asarray([vector], dtype="float32"), k, ids)
+    return [int(i) for i in labels[0] if i >= 0]
+
+
+def _lexical_positions(
+    collection: _Collection, query: str, k: int, filter: Optional[Mapping[str, Any]]
+) -> List[int]:
+    """Return the positions that best match `query` by BM25."""
+    with collection.lock.read():
+        ids = collection.metadata_index.positions(filter) if filter else None
+        return [position for position, _ in collection.lexical_index.search(query, k, ids)]
+
+
+def _texts(collection: _Collection, positions: Sequence[int]) -> list[str]:
+    store = collection.store
+    with collection.lock.read():
+        documents = [store.docstore.search(store.index_to_docstore_id[i]) for i in positions]
+    return [document.page_content for document in documents if not isinstance(document, str)]
+
+
+def _search_texts(collection: _Collection, find: Callable[..., List[int]], *args: Any) -> list[str]:
+    """Run a position search and read the texts found, in one trip to the pool."""
+    return _texts(collection, find(collection, *args))
+
+
+def _search_mode(mode: Optional[str]) -> str:
+    return validate_search_mode(mode or _settings().vector_search_mode)
+
+
+def search_documents(
+    query: str,
+    k: int = 4,
+    filter: Optional[Mapping[str, Any]] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+    mode: Optional[str] = None,
+) -> list[str]:
     """Searches for similar documents in the vector store."""
-    results = vector_store.similarity_search(query, k=k)
-    return [doc.page_content for doc in results]
+    mode = _search_mode(mode)
+    collection = _get_collection(namespace)
+    if mode == "lexical":
+        return _texts(collection, _lexical_positions(collection, query, k, filter))
+    if mode == "vector":
+        vector = _store_embeddings(collection.store).embed_query(query)
+        return _texts(collection, _vector_positions(collection, vector, k, filter))
+
+    candidates = k * HYBRID_CANDIDATE_FACTOR
+    # The lexical lookup runs in the pool while this thread waits on the embedding.
+    lexical = _get_executor().submit(_lexical_positions, collection, query, candidates, filter)
+    vector = _store_embeddings(collection.store).embed_query(query)
+    rankings = [_vector_positions(collection, vector, candidates, filter), lexical.result()]
+    return _texts(collection, reciprocal_rank_fusion(rankings, k))
+
+
+async def asearch_documents(
+    query: str,
+    k: int = 4,
+    filter: Optional[Mapping[str, Any]] = None,
+    namespace: str = DEFAULT_NAMESPACE,
+    mode: Optional[str] = None,
+) -> list[str]:
+    """Search for similar documents without blocking the event loop.
+
+    The query is embedded through the model's async client, and everything
+    that takes the collection's lock (the FAISS and BM25 searches and the
+    docstore reads) runs in the store's bounded thread pool, so a write in
+    progress delays this search but never the event loop.
+
+    Args:
+        query: The text to search for.
+        k: The number of documents to return.
+        filter: Metadata conditions the results must meet (see
+                `metadata_index.MetadataIndex`), applied inside the search.
+        namespace: The namespace to search.
+        mode: "vector", "lexical" or "hybrid" (see `SEARCH_MODES`).
+              Defaults to `Context.vector_search_mode`.
+
+    Returns:
+        The texts of the most similar documents, closest first.
+    """
+    mode = _search_mode(mode)
+    collection = await _aget_collection(namespace)
+    if mode == "lexical":
+        return await _run_in_pool(_search_texts, collection, _lexical_positions, query, k, filter)
+    embeddings = _store_embeddings(collection.store)
+    if mode == "vector":
+        vector = await embeddings.aembed_query(query)
+        return await _run_in_pool(_search_texts, collection, _vector_positions, vector, k, filter)
+
+    candidates = k * HYBRID_CANDIDATE_FACTOR
+    vector, lexical = await asyncio.gather(
+        embeddings.aembed_query(query),
+        _run_in_pool(_lexical_positions, collection, query, candidates, filter),
+    )
+    semantic = await _run_in_pool(_vector_positions, collection, vector, candidates, filter)
+    return await _run_in_pool(_texts, collection, reciprocal_rank_fusion([semantic, lexical], k))
@@ -1,60 +1,132 @@
 """Define a custom Reasoning and Action agent."""
 
-from datetime import UTC, datetime
-from typing import Dict, List, Literal, cast
+import logging
+from typing import Any, Dict, List, Literal, cast
 
-from langchain_core.messages import AIMessage, ToolMessage
-from langchain_core.tools import render_text_description
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    BaseMessage,
+    RemoveMessage,
+    ToolMessage,
+    message_chunk_to_message,
+)
 from langgraph.graph import StateGraph
-from langgraph.prebuilt import ToolNode
+from langgraph.runtime import Runtime
 
 from dotenv import load_dotenv
 load_dotenv()
 
+from common import prompts  # noqa: E402
+from common.answer_stream import FinalAnswerParser, chunk_text  # noqa: E402
+from common.checkpointer import checkpointer_from_env  # noqa: E402
 from common.context import Context
+from common.message_window import count_text_tokens, window_messages  # noqa: E402
+from common.prompt_compiler import record_prompt_cache_usage, render_system_prompt  # noqa: E402
+from common.summarization import select_messages_to_fold, update_summary  # noqa: E402
+from common.tool_node import ManagedToolNode, ToolLimits  # noqa: E402
 from common.tools import create_tools
-from common.utils import load_chat_model
+from common.utils import get_message_text, load_chat_model  # noqa: E402
 from react_agent.state import InputState, State
 
-# --- FIX: Simplify the function signature ---
-async def call_model(state: State) -> Dict[str, List[AIMessage]]:
+logger = logging.getLogger(__name__)
+
+def _get_context(runtime: Runtime[Context]) -> Context:
+    """Return the run's context, or one built from the environment if none was passed."""
+    return runtime.context if runtime.context is not None else Context()
+
+async def call_model(state: State, runtime: Runtime[Context]) -> Dict[str, List[AIMessage]]:
     """Calls the LLM with the current state."""
-    # --- FIX: Access context directly from the state ---
-    context = state.context
+    context = _get_context(runtime)
     
     available_tools = await create_tools(context)
-    tool_descriptions = render_text_description(available_tools)
-    system_message = context.system_prompt.format(
-        system_time=datetime.now(tz=UTC).isoformat(),
-        tools=tool_descriptions,
-    )
-    model =  load_chat_model(context.model).bind_tools(available_tools)
-    messages = [{"role": "system", "content": system_message}, *state.messages]
-    response = cast(AIMessage, await model.ainvoke(messages))
+    system_message = render_system_prompt(context, available_tools)
+    if state.summary:
+        system_message += prompts.CONVERSATION_SUMMARY.format(summary=state.summary)
+    model = load_chat_model(context.model, tools=available_tools)
+    history: List[BaseMessage] = list(state.messages)
+    if context.max_prompt_tokens > 0:
+        # The history gets what the system prompt and the reserved answer leave over.
+        budget = context.max_prompt_tokens - context.reserved_output_tokens - count_text_tokens(system_message)
+        history = window_messages(history, budget)
+    messages = [{"role": "system", "content": system_message}, *history]
+    response = await _stream_model(model, messages, runtime)
+    record_prompt_cache_usage(response)
 
     if state.is_last_step and response.tool_calls:
-        return {"messages": [AIMessage(id=response.id, content="Sorry, I could not find an answer in the allowed number of steps.")]}
+        apology = "Sorry, I could not find an answer in the allowed number of steps."
+        runtime.stream_writer({"final_answer": apology})
+        return {"messages": [AIMessage(id=response.id, content=apology)]}
     return {"messages": [response]}
 
-# --- FIX: Simplify the function signature ---
-async def dynamic_tools_node(state: State) -> Dict[str, List[ToolMessage]]:
+async def _stream_model(model: Any, messages: List[Any], runtime: Runtime[Context]) -> AIMessage:
+    """Stream the model's completion and return it as one message.
+
+    Streaming lets `stream_mode="messages"` show tokens as they arrive. The
+    text after "Final Answer:" is also sent to `stream_mode="custom"` as
+    `{"final_answer": ...}` events, so clients can show users the answer
+    without the model's thoughts and tool calls.
+    """
+    parser = FinalAnswerParser()
+    response: AIMessageChunk | None = None
+    async for chunk in model.astream(messages):
+        response = chunk if response is None else response + chunk
+        if answer := parser.feed(chunk_text(chunk)):
+            runtime.stream_writer({"final_answer": answer})
+    if response is None:
+        raise ValueError("The model returned an empty stream.")
+    message = cast(AIMessage, message_chunk_to_message(response))
+    if not parser.found and not message.tool_calls:
+        # The model answered without the marker; the whole reply is the answer.
+        runtime.stream_writer({"final_answer": get_message_text(message)})
+    return message
+
+async def summarize_conversation(state: State, runtime: Runtime[Context]) -> Dict[str, Any]:
+    """Folds older turns into the running summary once the thread grows long."""
+    context = _get_context(runtime)
+    threshold = context.summarize_after_messages
+    if threshold <= 0 or len(state.messages) <= threshold:
+        return {}
+    folded = select_messages_to_fold(state.messages, context.summary_keep_messages)
+    if not folded:
+        return {}
+    model = load_chat_model(context.summary_model or context.model)
+    try:
+        summary = await update_summary(model, state.summary, folded)
+    except Exception as e:
+        # The turn can go ahead on the full history; the next turn tries again.
+        logger.warning(f"Could not update the conversation summary: {e}")
+        return {}
+    return {"summary": summary, "messages": [RemoveMessage(id=m.id) for m in folded if m.id is not None]}
+
+async def dynamic_tools_node(state: State, runtime: Runtime[Context]) -> Dict[str, List[ToolMessage]]:
     """Executes the tools that the LLM has decided to call."""
-    # --- FIX: Access context directly from the state ---
-    context = state.context
+    context = _get_context(runtime)
     
     available_tools = await create_tools(context)
-    tool_node = ToolNode(available_tools)
+    # Identical in-flight calls, from this message or concurrent runs, share one execution;
+    # blocking tools run in a bounded pool under per-tool limits and timeouts.
+    tool_node = ManagedToolNode(
+        available_tools,
+        coalesce=context.coalesce_tool_calls,
+        limits=ToolLimits.from_context(context),
+    )
     return cast(Dict, await tool_node.ainvoke(state))
 
 # --- Graph Definition ---
-builder = StateGraph(State, input_schema=InputState) # context_schema is no longer needed
+# Configuration is passed per run (`graph.ainvoke(..., context=Context(...))`) rather
+# than kept in the state, so it is not written to every checkpoint.
+builder = StateGraph(State, input_schema=InputState, context_schema=Context)
 
 # --- FIX: Add the plain functions directly as nodes ---
 builder.add_node("call_model", call_model)
 builder.add_node("tools", dynamic_tools_node)
+builder.add_node("summarize_conversation", summarize_conversation)
 # ----------------------------------------------------
 
-builder.add_edge("__start__", "call_model")
+# Summaries are updated once per user turn, not between tool calls.
+builder.add_edge("__start__", "summarize_conversation")
+builder.add_edge("summarize_conversation", "call_model")
 
 def route_model_output(state: State) -> Literal["__end__", "tools"]:
     last_message = state.messages[-1]
@@ -67,4 +139,5 @@ def route_model_output(state: State) -> Literal["__end__", "tools"]:
 builder.add_conditional_edges("call_model", route_model_output)
 builder.add_edge("tools", "call_model")
 
-graph = builder.compile(name="ReAct Agent")
\ No newline at end of file
+# Local persistence is opt-in; the LangGraph server supplies its own checkpointer.
+graph = builder.compile(name="ReAct Agent", checkpointer=checkpointer_from_env())
\ No newline at end of file
@@ -13,10 +13,6 @@ from typing_extensions import Annotated
 from dotenv import load_dotenv
 load_dotenv()
 
-# --- FIX: Import the Context class ---
-from common.context import Context
-# -------------------------------------
-
 @dataclass
 class InputState:
     """Defines the input state for the agent."""
@@ -24,12 +20,12 @@ class InputState:
     messages: Annotated[Sequence[AnyMessage], add_messages] = field(
         default_factory=list
     )
-    # --- FIX: Add context directly to the state ---
-    context: Context = field(default_factory=Context)
-    # --------------------------------------------
 
 @dataclass
 class State(InputState):
     """Represents the complete state of the agent."""
 
-    is_last_step: IsLastStep = field(default=False)
\ No newline at end of file
+    is_last_step: IsLastStep = field(default=False)
+
+    summary: str = field(default="")
+    """A running summary of the messages folded out of `messages` by the summarization node."""
\ No newline at end of file
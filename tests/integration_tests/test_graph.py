@@ -1,9 +1,10 @@
 """Tests for the ReAct agent graph execution."""
 
+import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
-from langchain_core.messages import AIMessage, ToolCall, ToolMessage, HumanMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, ToolCall, ToolMessage, HumanMessage
 
 from common.context import Context
 from react_agent.graph import graph
@@ -13,28 +14,32 @@ load_dotenv()
 
 pytestmark = pytest.mark.asyncio
 
+def _stream(*responses: AIMessage) -> MagicMock:
+    """Mocks `astream`, each call yielding the next response as one chunk."""
+    async def chunks(response: AIMessage):
+        yield AIMessageChunk(content=response.content, tool_call_chunks=[
+            {"name": c["name"], "args": json.dumps(c["args"]), "id": c["id"], "index": i}
+            for i, c in enumerate(response.tool_calls)
+        ])
+    return MagicMock(side_effect=[chunks(r) for r in responses])
+
 @patch("react_agent.graph.load_chat_model")
 async def test_react_agent_simple_passthrough_mocked(
     mock_load_chat_model: MagicMock,
 ) -> None:
     """Tests the agent's ability to answer a simple question directly."""
     mock_model = AsyncMock()
-    mock_model.ainvoke.return_value = AIMessage(content="The founder is Harrison Chase.")
+    mock_model.astream = _stream(AIMessage(content="The founder is Harrison Chase."))
     mock_model.bind_tools.return_value = mock_model
     mock_load_chat_model.return_value = mock_model
 
-    # --- FIX: Pass context as part of the main input dictionary ---
-    graph_input = {
-        "messages": [("user", "Who is the founder of LangChain?")],
-        "context": Context() 
-    }
-    res = await graph.ainvoke(graph_input)
-    # -----------------------------------------------------------
+    graph_input = {"messages": [("user", "Who is the founder of LangChain?")]}
+    res = await graph.ainvoke(graph_input, context=Context())
 
     assert len(res["messages"]) == 2
     final_response = res["messages"][-1].content
     assert "Harrison Chase" in final_response
-    mock_model.ainvoke.assert_awaited_once()
+    mock_model.astream.assert_called_once()
 
 @patch("react_agent.graph.create_tools")
 @patch("react_agent.graph.load_chat_model")
@@ -52,19 +57,14 @@ async def test_react_agent_full_tool_cycle_mocked(
     second_model_response = AIMessage(content="Harrison Chase is the founder of LangChain.")
 
     mock_model = AsyncMock()
-    mock_model.ainvoke.side_effect = [first_model_response, second_model_response]
+    mock_model.astream = _stream(first_model_response, second_model_response)
     mock_model.bind_tools.return_value = mock_model
     mock_load_chat_model.return_value = mock_model
 
-    # --- FIX: Pass context as part of the main input dictionary ---
-    graph_input = {
-        "messages": [("user", "Who is the founder of LangChain?")],
-        "context": Context()
-    }
-    res = await graph.ainvoke(graph_input)
-    # -----------------------------------------------------------
+    graph_input = {"messages": [("user", "Who is the founder of LangChain?")]}
+    res = await graph.ainvoke(graph_input, context=Context())
 
     assert len(res["messages"]) == 4
     assert "Harrison Chase" in res["messages"][3].content
     mock_create_tools.assert_awaited()
-    assert mock_model.ainvoke.await_count == 2
\ No newline at end of file
+    assert mock_model.astream.call_count == 2
\ No newline at end of file
@@ -7,8 +7,8 @@ Ollama, Gemini) without making actual network calls.
 """
 
 import pytest
-from unittest.mock import patch, AsyncMock, MagicMock
-from langchain_core.messages import AIMessage, HumanMessage
+from unittest.mock import patch, MagicMock
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -51,8 +51,10 @@ async def test_agent_workflow_with_all_providers(
         mock_model_instance.bind_tools.return_value = mock_model_instance
 
         # The model will return a simple, direct answer
-        mock_response = AIMessage(content=f"Final Answer: Response from {provider}")
-        mock_model_instance.ainvoke = AsyncMock(return_value=mock_response)
+        async def mock_stream(messages):
+            yield AIMessageChunk(content=f"Final Answer: Response from {provider}")
+
+        mock_model_instance.astream = MagicMock(side_effect=mock_stream)
 
         # The mocked class should return our mocked instance
         mock_chat_class.return_value = mock_model_instance
@@ -64,9 +66,7 @@ async def test_agent_workflow_with_all_providers(
 
         # --- Act ---
         # Run the graph with the specified model provider
-        result = await graph.ainvoke(
-            graph_input, {"configurable": {"context": context}}
-        )
+        result = await graph.ainvoke(graph_input, context=context)
 
         # --- Assert ---
         # 1. Verify the final output of the graph
@@ -79,4 +79,4 @@ async def test_agent_workflow_with_all_providers(
         mock_chat_class.assert_called_once()
 
         # 3. Verify that the model instance was invoked
-        mock_model_instance.ainvoke.assert_awaited_once()
+        mock_model_instance.astream.assert_called_once()
@@ -0,0 +1,91 @@
+"""Unit tests for streaming final-answer extraction."""
+
+from unittest.mock import MagicMock, patch
+
+from langchain_core.messages import AIMessageChunk, HumanMessage
+from langgraph.runtime import Runtime
+
+from common.answer_stream import FinalAnswerParser, chunk_text
+from common.context import Context
+
+
+def _feed(chunks: list) -> str:
+    parser = FinalAnswerParser()
+    return "".join(parser.feed(chunk) for chunk in chunks)
+
+
+class TestFinalAnswerParser:
+    """Tests picking the answer out of streamed text."""
+
+    def test_thought_is_not_emitted(self) -> None:
+        assert _feed(["Thought: I know this.\n", "Final Answer: Paris", " is the capital."]) == "Paris is the capital."
+
+    def test_marker_split_across_chunks(self) -> None:
+        text = "Thought: easy.\nFinal Answer: It is 42."
+        for size in range(1, 8):
+            chunks = [text[i:i + size] for i in range(0, len(text), size)]
+            assert _feed(chunks) == "It is 42."
+
+    def test_answer_tokens_are_emitted_as_they_arrive(self) -> None:
+        parser = FinalAnswerParser()
+        parser.feed("Final Answer: ")
+
+        assert parser.feed("Hello") == "Hello"
+        assert parser.feed(" world") == " world"
+
+    def test_markdown_marker(self) -> None:
+        assert _feed(["**Final Answer:*", "* **Paris**"]) == "**Paris**"
+
+    def test_no_marker(self) -> None:
+        parser = FinalAnswerParser()
+
+        assert parser.feed("Thought: I need to search.\nAction: ...") == ""
+        assert not parser.found
+
+    def test_chunk_text_keeps_spaces_in_content_blocks(self) -> None:
+        chunk = AIMessageChunk(content=[{"type": "text", "text": " world", "index": 0}])
+        assert chunk_text(chunk) == " world"
+
+
+async def _chunks(*texts: str):
+    for text in texts:
+        yield AIMessageChunk(content=text, id="run-1")
+
+
+class TestStreamingCallModel:
+    """Tests that `call_model` streams and reports only the answer."""
+
+    async def test_answer_events_and_full_message(self) -> None:
+        from react_agent.graph import call_model
+        from react_agent.state import State
+
+        model = MagicMock()
+        model.astream.return_value = _chunks("Thought: known.\nFinal ", "Answer: Pa", "ris.")
+        writer = MagicMock()
+        state = State(messages=[HumanMessage(content="Capital of France?", id="h1")])
+
+        with (
+            patch("react_agent.graph.load_chat_model", return_value=model),
+            patch("react_agent.graph.create_tools", return_value=[]),
+        ):
+            update = await call_model(state, Runtime(context=Context(), stream_writer=writer))
+
+        assert update["messages"][0].content == "Thought: known.\nFinal Answer: Paris."
+        assert "".join(call.args[0]["final_answer"] for call in writer.call_args_list) == "Paris."
+
+    async def test_reply_without_marker_is_the_answer(self) -> None:
+        from react_agent.graph import call_model
+        from react_agent.state import State
+
+        model = MagicMock()
+        model.astream.return_value = _chunks("Hello", " there.")
+        writer = MagicMock()
+        state = State(messages=[HumanMessage(content="Hi", id="h1")])
+
+        with (
+            patch("react_agent.graph.load_chat_model", return_value=model),
+            patch("react_agent.graph.create_tools", return_value=[]),
+        ):
+            await call_model(state, Runtime(context=Context(), stream_writer=writer))
+
+        writer.assert_called_once_with({"final_answer": "Hello there."})
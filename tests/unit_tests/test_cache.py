@@ -0,0 +1,59 @@
+"""Unit tests for the shared in-process cache primitives."""
+
+from unittest.mock import patch
+
+import pytest
+
+from common.cache import LRUCache
+
+
+class TestLRUCache:
+    """Tests the size- and time-bounded LRU cache."""
+
+    def test_evicts_least_recently_used_entry(self) -> None:
+        evicted = []
+        cache = LRUCache(maxsize=2, on_evict=lambda k, v: evicted.append(k))
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")  # "b" is now the least recently used entry
+        cache.set("c", 3)
+
+        assert "b" not in cache
+        assert cache.get("a") == 1 and cache.get("c") == 3
+        assert evicted == ["b"]
+
+    def test_entries_expire_after_ttl(self) -> None:
+        cache = LRUCache(maxsize=4, ttl=10)
+        with patch("common.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("common.cache.time.monotonic", return_value=105.0):
+            assert cache.get("a") == 1
+        with patch("common.cache.time.monotonic", return_value=111.0):
+            assert cache.get("a") is None
+        assert cache.hits == 1 and cache.misses == 1
+
+    def test_sliding_ttl_acts_as_idle_timeout(self) -> None:
+        cache = LRUCache(maxsize=4, ttl=10, sliding=True)
+        with patch("common.cache.time.monotonic", return_value=100.0):
+            cache.set("a", 1)
+        with patch("common.cache.time.monotonic", return_value=108.0):
+            assert cache.get("a") == 1
+        with patch("common.cache.time.monotonic", return_value=116.0):
+            assert cache.get("a") == 1
+
+    def test_invalidate_single_key_and_all(self) -> None:
+        evicted = []
+        cache = LRUCache(maxsize=4, on_evict=lambda k, v: evicted.append(k))
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        cache.invalidate("a")
+        assert "a" not in cache and "b" in cache
+
+        cache.invalidate()
+        assert len(cache) == 0
+        assert evicted == ["a", "b"]
+
+    def test_rejects_non_positive_maxsize(self) -> None:
+        with pytest.raises(ValueError, match="maxsize"):
+            LRUCache(maxsize=0)
@@ -0,0 +1,200 @@
+"""Unit tests for the local SQLite checkpointer."""
+
+from typing import Annotated, List
+
+import pytest
+from langchain_core.messages import AIMessage, AnyMessage, HumanMessage
+from langgraph.graph import StateGraph
+from langgraph.graph.message import add_messages
+from typing_extensions import TypedDict
+
+from common.checkpointer import SQLiteCheckpointer
+
+
+class _State(TypedDict):
+    messages: Annotated[List[AnyMessage], add_messages]
+    turns: int
+
+
+def _reply(state: _State) -> dict:
+    count = len(state["messages"])
+    return {"messages": [AIMessage(content=f"reply {count}", id=f"ai-{count}")], "turns": state.get("turns", 0) + 1}
+
+
+def _graph(checkpointer: SQLiteCheckpointer):
+    builder = StateGraph(_State)
+    builder.add_node("reply", _reply)
+    builder.add_edge("__start__", "reply")
+    return builder.compile(checkpointer=checkpointer)
+
+
+def _config(thread: str = "t1") -> dict:
+    return {"configurable": {"thread_id": thread}}
+
+
+async def _chat(graph, turns: int, thread: str = "t1") -> None:
+    for n in range(turns):
+        await graph.ainvoke({"messages": [HumanMessage(content=f"question {n}", id=f"h{thread}-{n}")]}, _config(thread))
+
+
+@pytest.fixture
+def saver(tmp_path):
+    checkpointer = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"), keep_last=0, prune_every=0)
+    yield checkpointer
+    checkpointer.close()
+
+
+def _count(saver: SQLiteCheckpointer, table: str) -> int:
+    return saver._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+class TestPersistence:
+    """Tests storing and restoring threads."""
+
+    async def test_thread_survives_a_reopen(self, tmp_path) -> None:
+        path = str(tmp_path / "checkpoints.sqlite")
+        first = SQLiteCheckpointer(path)
+        await _chat(_graph(first), 2)
+        first.close()
+
+        second = SQLiteCheckpointer(path)
+        state = (await _graph(second).aget_state(_config())).values
+        second.close()
+
+        assert [m.content for m in state["messages"]] == ["question 0", "reply 1", "question 1", "reply 3"]
+        assert state["turns"] == 2
+
+    async def test_history_lists_newest_first(self, saver) -> None:
+        graph = _graph(saver)
+        await _chat(graph, 2)
+
+        history = [snapshot async for snapshot in graph.aget_state_history(_config())]
+        ids = [snapshot.config["configurable"]["checkpoint_id"] for snapshot in history]
+
+        assert ids == sorted(ids, reverse=True)
+        assert len(history[0].values["messages"]) == 4
+        assert len([s async for s in graph.aget_state_history(_config(), limit=2)]) == 2
+
+    async def test_threads_are_isolated(self, saver) -> None:
+        graph = _graph(saver)
+        await _chat(graph, 1, thread="a")
+        await _chat(graph, 3, thread="b")
+        saver.delete_thread("b")
+
+        assert len((await graph.aget_state(_config("a"))).values["messages"]) == 2
+        assert (await graph.aget_state(_config("b"))).values == {}
+
+    async def test_pending_writes_are_stored_as_each_task_finishes(self, saver) -> None:
+        config = {"configurable": {"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "c1"}}
+        await saver.aput_writes(config, [("turns", 1), ("messages", [])], task_id="task")
+
+        assert _count(saver, "writes") == 2
+
+    def test_buffered_writes_wait_until_flushed(self, tmp_path) -> None:
+        saver = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"), buffer_writes=True)
+        config = {"configurable": {"thread_id": "t1", "checkpoint_ns": "", "checkpoint_id": "c1"}}
+        saver.put_writes(config, [("turns", 1)], task_id="task")
+
+        assert _count(saver, "writes") == 0
+        saver.flush()
+        assert _count(saver, "writes") == 1
+        saver.close()
+
+    async def test_metadata_is_decoded_with_its_own_type(self, tmp_path) -> None:
+        import pickle
+
+        from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+        class PickleSerializer(JsonPlusSerializer):
+            def dumps_typed(self, obj):
+                return "pickle", pickle.dumps(obj)
+
+        saver = SQLiteCheckpointer(str(tmp_path / "checkpoints.sqlite"), serde=PickleSerializer(pickle_fallback=True))
+        await _chat(_graph(saver), 1)
+
+        listed = list(saver.list(_config(), filter={"source": "loop"}))
+        saver.close()
+
+        assert listed and all(t.metadata["source"] == "loop" for t in listed)
+
+    async def test_files_without_a_metadata_type_are_migrated(self, tmp_path) -> None:
+        import sqlite3
+
+        path = str(tmp_path / "checkpoints.sqlite")
+        first = SQLiteCheckpointer(path)
+        await _chat(_graph(first), 1)
+        first.close()
+        # Rebuild the table as it was before the metadata type column.
+        conn = sqlite3.connect(path)
+        conn.execute("ALTER TABLE checkpoints DROP COLUMN metadata_type")
+        conn.commit()
+        conn.close()
+
+        second = SQLiteCheckpointer(path)
+        state = await _graph(second).aget_state(_config())
+        second.close()
+
+        assert state.metadata["source"] == "loop"
+        assert len(state.values["messages"]) == 2
+
+
+class TestMessageStorage:
+    """Tests that messages are stored once rather than once per checkpoint."""
+
+    async def test_each_message_is_stored_once(self, saver) -> None:
+        await _chat(_graph(saver), 5)
+
+        # Ten messages, although every checkpoint references a longer history.
+        assert _count(saver, "messages") == 10
+        assert _count(saver, "checkpoints") > 10
+
+    async def test_unchanged_messages_are_not_serialized_again(self, saver) -> None:
+        graph = _graph(saver)
+        await _chat(graph, 3)
+        dumped = []
+        original = saver.serde.dumps_typed
+        saver.serde.dumps_typed = lambda value: dumped.append(value) or original(value)
+
+        await graph.ainvoke({"messages": [HumanMessage(content="one more", id="latest")]}, _config())
+
+        serialized = [value for value in dumped if isinstance(value, (HumanMessage, AIMessage))]
+        assert {message.id for message in serialized} == {"latest", "ai-7"}
+
+
+class TestRetention:
+    """Tests pruning old checkpoints."""
+
+    async def test_prune_keeps_the_latest_checkpoints(self, saver) -> None:
+        graph = _graph(saver)
+        await _chat(graph, 4)
+        before = (await graph.aget_state(_config())).values
+
+        saver.keep_last = 2
+        dropped = saver.prune()
+
+        assert dropped > 0
+        assert _count(saver, "checkpoints") == 2
+        assert (await graph.aget_state(_config())).values == before
+
+    async def test_prune_deletes_only_unreferenced_data(self, saver) -> None:
+        graph = _graph(saver)
+        await _chat(graph, 3)
+        await graph.aupdate_state(_config(), {"messages": []})
+        blobs = _count(saver, "blobs")
+
+        saver.keep_last = 1
+        saver.compact()
+
+        assert _count(saver, "blobs") < blobs
+        # The latest checkpoint still references all six messages.
+        assert _count(saver, "messages") == 6
+
+    async def test_latest_checkpoint_is_kept_regardless_of_age(self, saver) -> None:
+        graph = _graph(saver)
+        await _chat(graph, 2)
+
+        saver.max_age = 1e-9
+        saver.prune()
+
+        assert _count(saver, "checkpoints") == 1
+        assert len((await graph.aget_state(_config())).values["messages"]) == 4
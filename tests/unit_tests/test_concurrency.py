@@ -0,0 +1,133 @@
+"""Unit tests for the shared concurrency primitives."""
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from common.concurrency import ReadWriteLock, SingleFlight
+
+
+class TestReadWriteLock:
+    """Tests reader sharing, writer exclusion, and writer preference."""
+
+    def test_readers_share_the_lock(self) -> None:
+        lock = ReadWriteLock()
+        inside = threading.Barrier(3, timeout=5)
+
+        def read() -> None:
+            with lock.read():
+                inside.wait()
+
+        threads = [threading.Thread(target=read) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        inside.wait()  # Both readers hold the lock at once.
+        for thread in threads:
+            thread.join(timeout=5)
+        assert lock.readers == 0
+
+    def test_writer_excludes_readers(self) -> None:
+        lock = ReadWriteLock()
+        events = []
+
+        def read() -> None:
+            with lock.read():
+                events.append("read")
+
+        with lock.write():
+            reader = threading.Thread(target=read)
+            reader.start()
+            reader.join(timeout=0.1)
+            assert events == []
+            events.append("write done")
+        reader.join(timeout=5)
+
+        assert events == ["write done", "read"]
+
+    def test_waiting_writer_blocks_new_readers(self) -> None:
+        lock = ReadWriteLock()
+        order = []
+
+        def write() -> None:
+            with lock.write():
+                order.append("write")
+
+        def read() -> None:
+            with lock.read():
+                order.append("read")
+
+        with lock.read():
+            writer = threading.Thread(target=write)
+            writer.start()
+            time.sleep(0.05)  # Let the writer start waiting.
+            reader = threading.Thread(target=read)
+            reader.start()
+            time.sleep(0.05)
+            assert order == []
+        writer.join(timeout=5)
+        reader.join(timeout=5)
+
+        assert order == ["write", "read"]
+
+
+class TestSingleFlight:
+    """Tests sharing, release, errors, and cancellation of in-flight calls."""
+
+    async def test_concurrent_calls_share_one_execution(self) -> None:
+        group = SingleFlight()
+        calls = 0
+
+        async def fetch() -> str:
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(group.do("key", fetch) for _ in range(5)))
+
+        assert results == ["result"] * 5
+        assert calls == 1
+        assert (group.executions, group.shared, group.in_flight) == (1, 4, 0)
+
+    async def test_keys_are_released_when_done(self) -> None:
+        group = SingleFlight()
+        calls = 0
+
+        async def fetch() -> int:
+            nonlocal calls
+            calls += 1
+            return calls
+
+        assert await group.do("key", fetch) == 1
+        assert await group.do("key", fetch) == 2
+
+    async def test_errors_reach_every_caller(self) -> None:
+        group = SingleFlight()
+
+        async def fail() -> None:
+            await asyncio.sleep(0.01)
+            raise ConnectionError("down")
+
+        results = await asyncio.gather(group.do("key", fail), group.do("key", fail), return_exceptions=True)
+
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+    async def test_cancelled_caller_does_not_cancel_the_others(self) -> None:
+        group = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch() -> str:
+            await release.wait()
+            return "result"
+
+        first = asyncio.create_task(group.do("key", fetch))
+        second = asyncio.create_task(group.do("key", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        release.set()
+
+        assert await second == "result"
+        with pytest.raises(asyncio.CancelledError):
+            await first
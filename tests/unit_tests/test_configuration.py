@@ -29,6 +29,7 @@ class TestContextConfiguration:
         assert context.model == "openai:gpt-4o-mini"
         assert context.max_search_results == 5
         assert context.mcpo_url == ""
+        assert context.system_time_granularity == 60
         # Check that a default system prompt exists and is not empty
         assert context.system_prompt and isinstance(context.system_prompt, str)
 
@@ -65,6 +66,18 @@ class TestContextConfiguration:
         assert str(context.max_search_results) == "15"
         assert context.mcpo_url == "http://env-url:8080/mcp"
 
+    @patch.dict(os.environ, {"SYSTEM_TIME_GRANULARITY": "300"}, clear=True)
+    def test_numeric_environment_variables_keep_their_type(self) -> None:
+        """Test that numeric fields loaded from the environment are converted."""
+        context = Context()
+        assert context.system_time_granularity == 300
+
+    @patch.dict(os.environ, {"MCP_SERVERS": '["http://a/sse", {"url": "http://b/mcp"}]'}, clear=True)
+    def test_list_environment_variables_are_parsed_as_json(self) -> None:
+        """Test that list fields loaded from the environment are decoded from JSON."""
+        context = Context()
+        assert context.mcp_servers == ["http://a/sse", {"url": "http://b/mcp"}]
+
     @patch.dict(os.environ, {"MODEL": "groq:llama3-8b-8192"}, clear=True)
     def test_explicit_parameters_override_environment_variables(self) -> None:
         """Test that parameters passed to the constructor take precedence over env vars."""
@@ -0,0 +1,105 @@
+"""Unit tests for the persistent, content-addressed embedding cache."""
+
+from unittest.mock import MagicMock
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from common.embedding_cache import (
+    CachedEmbeddings,
+    EmbeddingCache,
+    normalize_text,
+    text_key,
+)
+
+
+@pytest.fixture
+def cache(tmp_path) -> EmbeddingCache:
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite3"), max_entries=100)
+    yield cache
+    cache.close()
+
+
+class TestEmbeddingCache:
+    """Tests the SQLite-backed vector cache."""
+
+    def test_normalized_texts_share_a_key(self) -> None:
+        assert normalize_text("  Hello\n\tworld ") == "Hello world"
+        assert text_key("Hello world") == text_key(" Hello   world\n")
+        assert text_key("Hello world") != text_key("hello world")
+
+    def test_round_trip_and_counters(self, cache: EmbeddingCache) -> None:
+        cache.put_many("model-a", [("k1", [0.5, -1.25])])
+
+        assert cache.get_many("model-a", ["k1", "k2"]) == {"k1": [0.5, -1.25]}
+        assert cache.get_many("model-b", ["k1"]) == {}
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 2
+
+    def test_entries_persist_across_instances(self, tmp_path) -> None:
+        path = str(tmp_path / "nested" / "cache.sqlite3")
+        first = EmbeddingCache(path)
+        first.put_many("model", [("k", [1.0, 2.0])])
+        first.close()
+
+        second = EmbeddingCache(path)
+        assert second.get_many("model", ["k"]) == {"k": [1.0, 2.0]}
+        second.close()
+
+    def test_hits_do_not_write_until_a_batch_is_due(self, cache: EmbeddingCache) -> None:
+        cache.put_many("model", [("k", [1.0])])
+        before = cache._conn.total_changes
+
+        for _ in range(10):
+            cache.get_many("model", ["k"])
+
+        assert cache._conn.total_changes == before
+        cache.flush()
+        assert cache._conn.total_changes == before + 1
+
+    def test_least_recently_used_entries_are_evicted(self) -> None:
+        cache = EmbeddingCache("", max_entries=10)
+        cache.put_many("model", [(f"k{i}", [float(i)]) for i in range(10)])
+        cache.get_many("model", ["k0"])  # Touch the oldest entry.
+
+        cache.put_many("model", [("k10", [10.0])])
+
+        assert len(cache) == 9
+        assert "k0" in cache.get_many("model", ["k0"])
+        assert cache.get_many("model", ["k1"]) == {}
+
+
+class TestCachedEmbeddings:
+    """Tests the caching wrapper around an embedding model."""
+
+    def test_only_misses_reach_the_wrapped_model(self, cache: EmbeddingCache) -> None:
+        inner = MagicMock(wraps=DeterministicFakeEmbedding(size=4))
+        embeddings = CachedEmbeddings(inner, cache, model_name="fake:4")
+
+        first = embeddings.embed_documents(["a", "b", "a"])
+        second = embeddings.embed_documents(["b", "c"])
+
+        assert first[0] == first[2]
+        assert second[0] == first[1]
+        assert inner.embed_documents.call_args_list[0].args[0] == ["a", "b"]
+        assert inner.embed_documents.call_args_list[1].args[0] == ["c"]
+
+    def test_queries_and_documents_are_cached_apart(self, cache: EmbeddingCache) -> None:
+        inner = MagicMock(wraps=DeterministicFakeEmbedding(size=4))
+        embeddings = CachedEmbeddings(inner, cache, model_name="fake:4")
+        embeddings.embed_documents(["stored text"])
+
+        # An asymmetric model may embed a query differently from the same document.
+        embeddings.embed_query("stored text")
+        embeddings.embed_query("new query")
+        embeddings.embed_query("new  query")
+
+        assert [call.args[0] for call in inner.embed_query.call_args_list] == ["stored text", "new query"]
+
+    def test_backend_settings_are_part_of_the_model_name(self) -> None:
+        from common.vector_store import _embedding_model_name
+
+        query = MagicMock(spec=["model", "task_type"], model="embedding-001", task_type="retrieval_query")
+        document = MagicMock(spec=["model", "task_type"], model="embedding-001", task_type="retrieval_document")
+
+        assert _embedding_model_name(query) != _embedding_model_name(document)
@@ -0,0 +1,93 @@
+"""Unit tests for the vector store's embedding backends."""
+
+import math
+from unittest.mock import patch
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from common.embeddings import (
+    HashingEmbeddings,
+    create_embeddings,
+    get_embedding_dimension,
+)
+
+
+class TestHashingEmbeddings:
+    """Tests the local hashing vectorizer."""
+
+    def test_vectors_are_normalized_and_sized(self) -> None:
+        vector = HashingEmbeddings(dimension=32).embed_query("Vector search with FAISS")
+
+        assert len(vector) == 32
+        assert math.isclose(sum(v * v for v in vector), 1.0, rel_tol=1e-9)
+
+    def test_embedding_is_deterministic(self) -> None:
+        embeddings = HashingEmbeddings(dimension=64)
+
+        assert embeddings.embed_query("Hello  World") == embeddings.embed_documents(["hello world"])[0]
+
+    def test_similar_texts_score_higher(self) -> None:
+        embeddings = HashingEmbeddings(dimension=256)
+        query, related, unrelated = embeddings.embed_documents(
+            ["searching documents", "document search engine", "weather forecast for tomorrow"]
+        )
+
+        def dot(a, b):
+            return sum(x * y for x, y in zip(a, b))
+
+        assert dot(query, related) > dot(query, unrelated)
+
+    def test_empty_text_embeds_to_zeros(self) -> None:
+        assert HashingEmbeddings(dimension=4).embed_query("  ") == [0.0] * 4
+
+    def test_invalid_dimension(self) -> None:
+        with pytest.raises(ValueError, match="dimension"):
+            HashingEmbeddings(dimension=0)
+
+
+class TestCreateEmbeddings:
+    """Tests backend selection from embedding strings."""
+
+    def test_hashing_backend_uses_requested_dimension(self) -> None:
+        embeddings = create_embeddings("hashing", dimension=128)
+
+        assert isinstance(embeddings, HashingEmbeddings)
+        assert embeddings.dimension == 128
+
+    def test_hashing_backend_default_dimension(self) -> None:
+        assert get_embedding_dimension(create_embeddings("hashing")) == 512
+
+    def test_openai_backend(self) -> None:
+        embeddings = create_embeddings("openai:text-embedding-3-small", dimension=256)
+
+        assert embeddings.model == "text-embedding-3-small"
+        assert get_embedding_dimension(embeddings, "openai:text-embedding-3-small") == 256
+
+    def test_known_dimension_avoids_probe(self) -> None:
+        embeddings = create_embeddings("openai:text-embedding-ada-002")
+
+        with patch.object(type(embeddings), "embed_query") as mock_embed:
+            assert get_embedding_dimension(embeddings, "openai:text-embedding-ada-002") == 1536
+        mock_embed.assert_not_called()
+
+    def test_unknown_dimension_is_probed(self) -> None:
+        class Unsized(Embeddings):
+            def embed_documents(self, texts):
+                return [self.embed_query(t) for t in texts]
+
+            def embed_query(self, text):
+                return [0.0] * 24
+
+        assert get_embedding_dimension(Unsized()) == 24
+
+    @pytest.mark.parametrize(
+        "embedding_string, match",
+        [
+            ("openai", "Expected format"),
+            ("unknown:model", "Unsupported embedding provider"),
+        ],
+    )
+    def test_invalid_strings(self, embedding_string: str, match: str) -> None:
+        with pytest.raises(ValueError, match=match):
+            create_embeddings(embedding_string)
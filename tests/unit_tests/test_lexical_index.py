@@ -0,0 +1,45 @@
+"""Unit tests for the BM25 index and reciprocal rank fusion."""
+
+from common.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def _index(*texts: str) -> BM25Index:
+    index = BM25Index()
+    index.add(0, texts)
+    return index
+
+
+def test_tokenize_keeps_compound_identifiers() -> None:
+    assert tokenize("Invoice INV-2024-001 paid") == ["invoice", "inv", "2024", "001", "paid", "inv-2024-001"]
+
+
+def test_rare_terms_outrank_common_ones() -> None:
+    index = _index("the cat sat", "the dog sat", "the cat and the faiss index")
+
+    assert [position for position, _ in index.search("faiss cat", k=3)] == [2, 0]
+
+
+def test_exact_identifier_ranks_first() -> None:
+    index = _index("order 2024 001 shipped", "order INV-2024-001 shipped", "invoice 2024")
+
+    assert index.search("INV-2024-001", k=1)[0][0] == 1
+
+
+def test_search_is_restricted_to_ids() -> None:
+    index = _index("alpha", "alpha beta", "alpha gamma")
+
+    assert sorted(position for position, _ in index.search("alpha", k=5, ids=[0, 2])) == [0, 2]
+    assert index.search("delta", k=5) == []
+
+
+def test_documents_are_indexed_at_their_positions() -> None:
+    index = _index("alpha")
+    index.add(1, ["beta"])
+
+    assert index.search("beta", k=1)[0][0] == 1
+    assert len(index) == 2
+
+
+def test_reciprocal_rank_fusion_rewards_agreement() -> None:
+    assert reciprocal_rank_fusion([[1, 2, 3], [4, 2, 5]], k=2) == [2, 1]
+    assert reciprocal_rank_fusion([[], [5]], k=3) == [5]
@@ -0,0 +1,91 @@
+"""Unit tests for token-budgeted message windowing."""
+
+from unittest.mock import patch
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from common import message_window
+from common.message_window import TRUNCATION_NOTE, count_message_tokens, window_messages
+
+
+def _turn(n: int, words: int = 50) -> list:
+    """A user question, a tool call with its result, and an answer."""
+    text = " ".join(["word"] * words)
+    return [
+        HumanMessage(content=f"question {n} {text}", id=f"h{n}"),
+        AIMessage(content="", id=f"c{n}", tool_calls=[{"name": "search", "args": {"q": str(n)}, "id": f"t{n}"}]),
+        ToolMessage(content=f"result {n} {text}", tool_call_id=f"t{n}", id=f"r{n}"),
+        AIMessage(content=f"answer {n}", id=f"a{n}"),
+    ]
+
+
+class TestCountMessageTokens:
+    """Tests token counting and its per-message cache."""
+
+    def test_counts_are_cached_by_message_id(self) -> None:
+        message = HumanMessage(content="a cached message", id="cached-1")
+        first = count_message_tokens(message)
+
+        with patch.object(message_window, "count_text_tokens", side_effect=AssertionError):
+            assert count_message_tokens(message) == first
+
+    def test_tool_calls_are_counted(self) -> None:
+        plain = AIMessage(content="", id="plain")
+        calling = AIMessage(content="", id="calling", tool_calls=[{"name": "search", "args": {"q": "x" * 100}, "id": "t"}])
+        assert count_message_tokens(calling) > count_message_tokens(plain)
+
+
+class TestWindowMessages:
+    """Tests trimming the history to a budget."""
+
+    def test_everything_fits(self) -> None:
+        history = _turn(1) + _turn(2)
+        assert window_messages(history, 100_000) == history
+
+    def test_drops_oldest_turns_first(self) -> None:
+        history = _turn(1) + _turn(2) + _turn(3)
+        budget = sum(count_message_tokens(m) for m in history[4:])
+
+        assert [m.id for m in window_messages(history, budget)] == [m.id for m in history[4:]]
+
+    def test_tool_calls_stay_with_their_results(self) -> None:
+        history = _turn(1) + _turn(2)
+        # Room for the last turn's answer and tool result, but not its call.
+        budget = sum(count_message_tokens(m) for m in history[4:]) - 1
+        kept = window_messages(history, budget)
+
+        calls = {c["id"] for m in kept if isinstance(m, AIMessage) for c in m.tool_calls}
+        results = {m.tool_call_id for m in kept if isinstance(m, ToolMessage)}
+        assert calls == results
+
+    def test_latest_user_message_is_always_kept(self) -> None:
+        history = _turn(1) + [HumanMessage(content=" ".join(["long"] * 500), id="latest")]
+
+        assert [m.id for m in window_messages(history, 10)] == ["latest"]
+
+    def test_window_starts_at_a_user_message(self) -> None:
+        history = _turn(1) + _turn(2)
+        budget = sum(count_message_tokens(m) for m in history[5:])
+
+        kept = window_messages(history, budget)
+        assert isinstance(kept[0], HumanMessage)
+        assert kept[0].id == "h2"
+
+    def test_oversized_tool_results_of_the_current_turn_are_truncated(self) -> None:
+        history = _turn(1) + [
+            HumanMessage(content="question 2", id="h2"),
+            AIMessage(content="", id="c2", tool_calls=[
+                {"name": "search", "args": {"q": "a"}, "id": "t2a"},
+                {"name": "search", "args": {"q": "b"}, "id": "t2b"},
+            ]),
+            ToolMessage(content="short result", tool_call_id="t2a", id="r2a"),
+            ToolMessage(content=" ".join(["huge"] * 5_000), tool_call_id="t2b", id="r2b"),
+        ]
+        budget = 300
+
+        kept = window_messages(history, budget)
+
+        assert [m.id for m in kept] == ["h2", "c2", "r2a", "r2b"]
+        assert kept[2].content == "short result"
+        assert kept[3].content.startswith("huge huge") and kept[3].content.endswith(TRUNCATION_NOTE)
+        assert sum(count_message_tokens(m) for m in kept) <= budget
@@ -0,0 +1,38 @@
+"""Unit tests for the metadata index used to pre-filter vector searches."""
+
+import pytest
+
+from common.metadata_index import MetadataIndex
+
+
+@pytest.fixture
+def index() -> MetadataIndex:
+    index = MetadataIndex()
+    index.add(0, [{"source": "wiki", "year": 2020}, {"source": "web", "tags": ["ai", "ml"]}, None])
+    index.add(3, [{"source": "wiki", "tags": ["ml"], "year": 2021}])
+    return index
+
+
+def test_single_condition(index: MetadataIndex) -> None:
+    assert index.positions({"source": "wiki"}).tolist() == [0, 3]
+
+
+def test_conditions_are_combined(index: MetadataIndex) -> None:
+    assert index.positions({"source": "wiki", "tags": "ml"}).tolist() == [3]
+    assert index.positions({"source": "web", "year": 2020}).tolist() == []
+
+
+def test_list_values_match_any(index: MetadataIndex) -> None:
+    assert index.positions({"year": [2020, 2021]}).tolist() == [0, 3]
+    assert index.positions({"tags": "ai"}).tolist() == [1]
+
+
+def test_unknown_keys_match_nothing(index: MetadataIndex) -> None:
+    assert index.positions({"author": "x"}).tolist() == []
+
+
+def test_invalid_filters_are_rejected(index: MetadataIndex) -> None:
+    with pytest.raises(ValueError, match="at least one"):
+        index.positions({})
+    with pytest.raises(ValueError, match="hashable"):
+        index.positions({"source": [{"nested": 1}]})
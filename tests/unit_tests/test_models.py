@@ -5,15 +5,35 @@ This file tests the model factory (`create_model`), the helper function to
 list supported models, and the `load_chat_model` utility.
 """
 
-from unittest.mock import patch, MagicMock
+from typing import Any
+from unittest.mock import patch, MagicMock, PropertyMock
 import pytest
+from langchain_core.tools import tool
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
-from common.models import create_model, get_supported_models
-from common.utils import load_chat_model
+from common.models import (
+    ModelPool,
+    close_model_clients,
+    create_model,
+    get_supported_models,
+)
+from common.utils import (
+    _tool_fingerprints,
+    clear_model_pool,
+    get_tool_fingerprint,
+    load_chat_model,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_model_pool():
+    """Start every test with an empty process-wide model pool."""
+    clear_model_pool()
+    yield
+    clear_model_pool()
 
 # A list of model providers to test.
 # When a new provider is added, its info should be added here for automatic testing.
@@ -90,4 +110,100 @@ class TestLoadChatModelUtil:
 
         # Assert
         assert result is mock_model_instance
-        mock_create_model.assert_called_once_with(model_string)
\ No newline at end of file
+        mock_create_model.assert_called_once_with(model_string)
+
+class TestModelPool:
+    """Tests the pooled, connection-reusing model instances."""
+
+    @patch("common.utils.create_model")
+    def test_load_chat_model_reuses_pooled_instance(self, mock_create_model: MagicMock) -> None:
+        first = load_chat_model("openai:gpt-4o-mini")
+        second = load_chat_model("openai:gpt-4o-mini")
+
+        assert first is second
+        mock_create_model.assert_called_once_with("openai:gpt-4o-mini")
+
+    @patch("common.utils.create_model")
+    def test_bound_variant_is_memoized_per_tool_set(self, mock_create_model: MagicMock) -> None:
+        tool_a, tool_b = MagicMock(), MagicMock()
+        tool_a.name, tool_a.description, tool_a.args = "a", "Tool A", {}
+        tool_b.name, tool_b.description, tool_b.args = "b", "Tool B", {}
+        model = mock_create_model.return_value
+        model.bind_tools.side_effect = lambda tools: MagicMock(name=f"bound-{len(tools)}")
+
+        first = load_chat_model("openai:gpt-4o-mini", tools=[tool_a])
+        again = load_chat_model("openai:gpt-4o-mini", tools=[tool_a])
+        other = load_chat_model("openai:gpt-4o-mini", tools=[tool_a, tool_b])
+
+        assert first is again
+        assert other is not first
+        assert model.bind_tools.call_count == 2
+
+    def test_pool_keys_include_kwargs(self) -> None:
+        factory = MagicMock(side_effect=lambda *a, **kw: MagicMock())
+        pool = ModelPool(factory)
+
+        assert pool.get("openai:gpt-4o", temperature=0) is pool.get("openai:gpt-4o", temperature=0)
+        assert pool.get("openai:gpt-4o", temperature=0) is not pool.get("openai:gpt-4o", temperature=1)
+        assert factory.call_count == 2
+
+    @patch("common.models.close_model_clients")
+    def test_evicted_models_are_closed(self, mock_close: MagicMock) -> None:
+        pool = ModelPool(MagicMock(side_effect=lambda *a, **kw: MagicMock()), maxsize=1)
+        first = pool.get("groq:llama3-8b-8192")
+
+        pool.get("groq:llama3-70b-8192")
+
+        mock_close.assert_called_once_with(first)
+        assert len(pool) == 1
+
+
+class TestCloseModelClients:
+    """Tests releasing the network clients of evicted models."""
+
+    def test_closes_owned_sdk_client(self) -> None:
+        root_client = MagicMock()
+        resource = MagicMock(_client=root_client)
+        model = MagicMock(spec=["client", "http_client"])
+        model.client, model.http_client = resource, None
+
+        close_model_clients(model)
+
+        root_client.close.assert_called_once()
+
+    def test_leaves_caller_owned_http_client_open(self) -> None:
+        root_client = MagicMock()
+        model = MagicMock(spec=["client", "http_client"])
+        model.client, model.http_client = MagicMock(_client=root_client), MagicMock()
+
+        close_model_clients(model)
+
+        root_client.close.assert_not_called()
+
+
+def _search_tool(description: str) -> Any:
+    def search(q: str) -> str:
+        return q
+
+    return tool("search", description=description)(search)
+
+
+def test_tool_fingerprint_depends_on_tool_content() -> None:
+    search = _search_tool("Search the web")
+    clone = _search_tool("Search the web")
+    other = _search_tool("Search the news")
+
+    assert get_tool_fingerprint([search]) == get_tool_fingerprint([clone])
+    assert get_tool_fingerprint([search]) != get_tool_fingerprint([other])
+
+
+def test_tool_fingerprint_is_memoized_per_tool_set() -> None:
+    tools = [_search_tool("Search the web"), _search_tool("Search the news")]
+    hits = _tool_fingerprints.hits
+    fingerprint = get_tool_fingerprint(tools)
+
+    with patch.object(type(tools[0]), "args", new_callable=PropertyMock) as args:
+        assert get_tool_fingerprint(list(tools)) == fingerprint
+
+    args.assert_not_called()
+    assert _tool_fingerprints.hits == hits + 1
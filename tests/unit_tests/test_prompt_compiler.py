@@ -0,0 +1,115 @@
+"""Unit tests for cached system-prompt rendering."""
+
+from datetime import UTC, datetime
+from unittest.mock import MagicMock, PropertyMock, patch
+
+from langchain_core.messages import AIMessage
+from langchain_core.tools import render_text_description, tool
+
+from common.context import Context
+from common.prompt_compiler import (
+    PromptCompiler,
+    format_system_time,
+    get_prompt_cache_stats,
+    record_prompt_cache_usage,
+    render_system_prompt,
+    split_template,
+)
+from common.prompts import SYSTEM_PROMPT
+
+
+@tool
+def lookup(query: str) -> str:
+    """Look something up."""
+    return query
+
+
+NOW = datetime(2024, 5, 1, 12, 34, 56, 789000, tzinfo=UTC)
+
+
+class TestSplitTemplate:
+    """Tests splitting templates at the first volatile field."""
+
+    def test_halves_render_like_the_original(self) -> None:
+        template = "A {{literal}} {tools:>3} then {system_time!r} and {tools}."
+        prefix, suffix = split_template(template)
+
+        assert prefix == "A {{literal}} {tools:>3} then "
+        assert prefix.format(tools="x") + suffix.format(tools="x", system_time="t") == template.format(
+            tools="x", system_time="t"
+        )
+
+    def test_template_without_volatile_fields_has_empty_suffix(self) -> None:
+        assert split_template("Only {tools}") == ("Only {tools}", "")
+
+
+class TestPromptCompiler:
+    """Tests the memoizing prompt compiler."""
+
+    def test_matches_plain_format_with_rounded_time(self) -> None:
+        rendered = PromptCompiler().render(SYSTEM_PROMPT, [lookup], granularity=60, now=NOW)
+
+        expected = SYSTEM_PROMPT.format(
+            tools=render_text_description([lookup]),
+            system_time="2024-05-01T12:34:00+00:00",
+        )
+        assert rendered == expected
+
+    def test_volatile_time_is_at_the_end_of_the_default_prompt(self) -> None:
+        compiler = PromptCompiler()
+        first = compiler.render(SYSTEM_PROMPT, [lookup], granularity=0, now=NOW)
+        later = compiler.render(SYSTEM_PROMPT, [lookup], granularity=0, now=NOW.replace(hour=13))
+        prefix, _ = compiler.compile(SYSTEM_PROMPT, [lookup])
+
+        assert first != later
+        assert first.startswith(prefix) and later.startswith(prefix)
+        assert len(prefix) > 0.9 * len(first)
+
+    def test_tool_descriptions_are_rendered_once(self) -> None:
+        compiler = PromptCompiler()
+        with patch(
+            "common.prompt_compiler.render_text_description", wraps=render_text_description
+        ) as mock_render:
+            for _ in range(3):
+                compiler.render(SYSTEM_PROMPT, [lookup], now=NOW)
+
+        mock_render.assert_called_once()
+
+    def test_repeated_renders_do_not_rebuild_tool_schemas(self) -> None:
+        compiler = PromptCompiler()
+        compiler.render(SYSTEM_PROMPT, [lookup], now=NOW)
+        with patch.object(type(lookup), "args", new_callable=PropertyMock) as args:
+            compiler.render(SYSTEM_PROMPT, [lookup], now=NOW)
+
+        args.assert_not_called()
+
+    def test_render_system_prompt_uses_context_granularity(self) -> None:
+        context = Context(system_prompt="Time: {system_time}", system_time_granularity=3600)
+        with patch("common.prompt_compiler.datetime") as mock_datetime:
+            mock_datetime.now.return_value = NOW
+            mock_datetime.fromtimestamp.side_effect = datetime.fromtimestamp
+            assert render_system_prompt(context, []) == "Time: 2024-05-01T12:00:00+00:00"
+
+
+def test_format_system_time_without_rounding() -> None:
+    assert format_system_time(0, NOW) == NOW.isoformat()
+
+
+def test_record_prompt_cache_usage() -> None:
+    before = get_prompt_cache_stats()
+    response = AIMessage(
+        content="",
+        usage_metadata={
+            "input_tokens": 1200,
+            "output_tokens": 10,
+            "total_tokens": 1210,
+            "input_token_details": {"cache_read": 1024},
+        },
+    )
+
+    assert record_prompt_cache_usage(response) == 1024
+    assert record_prompt_cache_usage(AIMessage(content="no usage")) is None
+    after = get_prompt_cache_stats()
+    assert after["calls"] == before["calls"] + 1
+    assert after["cached_tokens"] == before["cached_tokens"] + 1024
+    assert record_prompt_cache_usage(MagicMock(usage_metadata=None)) is None
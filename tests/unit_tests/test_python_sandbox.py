@@ -0,0 +1,124 @@
+"""Unit tests for the process-pool Python sandbox."""
+
+from typing import Any, Iterator, List
+
+import pytest
+from langchain_core.tools import ToolException
+
+from common.python_sandbox import PythonSandbox, SandboxedPythonREPLTool
+
+
+@pytest.fixture(scope="module")
+def sandbox() -> Iterator[PythonSandbox]:
+    sandbox = PythonSandbox(
+        max_workers=2, max_tasks_per_worker=0, cpu_time_limit=1, wall_time_limit=3, memory_limit_mb=64
+    )
+    sandbox.start()
+    yield sandbox
+    sandbox.close()
+
+
+class TestPythonSandbox:
+    """Tests running code in worker processes under limits."""
+
+    def test_returns_printed_output(self, sandbox: PythonSandbox) -> None:
+        assert sandbox.execute("import os\nprint(os.getpid() != 0, 6 * 7)") == "True 42\n"
+
+    def test_exceptions_are_returned_as_output(self, sandbox: PythonSandbox) -> None:
+        assert sandbox.execute("1 / 0") == "ZeroDivisionError('division by zero')"
+
+    def test_calls_without_a_session_start_fresh(self, sandbox: PythonSandbox) -> None:
+        sandbox.execute("leftover = 1")
+        assert "NameError" in sandbox.execute("print(leftover)")
+
+    def test_sessions_keep_their_state(self, sandbox: PythonSandbox) -> None:
+        sandbox.execute("total = 40", session="a")
+        sandbox.execute("total = 0", session="b")
+        assert sandbox.execute("print(total + 2)", session="a") == "42\n"
+
+    def test_wall_clock_limit_replaces_the_worker(self, sandbox: PythonSandbox) -> None:
+        restarts = sandbox.restarts
+        with pytest.raises(ToolException, match="time limit"):
+            sandbox.execute("import time\ntime.sleep(10)")
+        assert sandbox.restarts == restarts + 1
+        assert sandbox.execute("print('still serving')") == "still serving\n"
+
+    def test_waiting_for_a_worker_counts_against_the_wall_clock_limit(self) -> None:
+        import threading
+        import time
+
+        sandbox = PythonSandbox(max_workers=1, max_tasks_per_worker=0, wall_time_limit=1.5)
+        try:
+            sandbox.start()
+            busy = threading.Thread(target=sandbox.execute, args=("import time\ntime.sleep(1)",))
+            busy.start()
+            time.sleep(0.1)
+            started = time.monotonic()
+            # About a second goes to waiting for the busy worker, leaving too little to sleep another.
+            with pytest.raises(ToolException, match="time limit"):
+                sandbox.execute("import time\ntime.sleep(1)")
+            assert time.monotonic() - started < 2.5
+            busy.join()
+        finally:
+            sandbox.close()
+
+    def test_cpu_time_limit(self, sandbox: PythonSandbox) -> None:
+        with pytest.raises(ToolException, match="CPU time limit"):
+            sandbox.execute("while True:\n    pass")
+
+    def test_memory_limit(self, sandbox: PythonSandbox) -> None:
+        with pytest.raises(ToolException, match="memory limit"):
+            sandbox.execute("block = bytearray(256 * 1024 * 1024)")
+
+    def test_workers_are_recycled_after_max_tasks(self) -> None:
+        sandbox = PythonSandbox(max_workers=1, max_tasks_per_worker=2)
+        try:
+            pids = {sandbox.execute("import os\nprint(os.getpid())") for _ in range(4)}
+            assert len(pids) == 2
+            assert sandbox.restarts == 2
+        finally:
+            sandbox.close()
+
+    def test_workers_are_replaced_without_holding_the_pool_lock(self) -> None:
+        import threading
+
+        sandbox = PythonSandbox(max_workers=1, max_tasks_per_worker=1)
+        spawn = sandbox._spawn
+        lock_free: List[bool] = []
+
+        def checked_spawn() -> Any:
+            # The condition is reentrant, so probe it from another thread.
+            def probe() -> None:
+                acquired = sandbox._cond.acquire(blocking=False)
+                lock_free.append(acquired)
+                if acquired:
+                    sandbox._cond.release()
+
+            thread = threading.Thread(target=probe)
+            thread.start()
+            thread.join()
+            return spawn()
+
+        try:
+            sandbox.start()
+            sandbox._spawn = checked_spawn  # type: ignore[method-assign]
+            assert sandbox.execute("print(1)") == "1\n"
+            assert sandbox.execute("print(2)") == "2\n"
+            assert lock_free == [True, True]
+            assert sandbox.restarts == 2
+        finally:
+            sandbox.close()
+
+
+class TestSandboxedPythonREPLTool:
+    """Tests the REPL tool on top of the sandbox."""
+
+    def test_per_thread_state(self, sandbox: PythonSandbox) -> None:
+        tool = SandboxedPythonREPLTool(sandbox=sandbox, per_thread_state=True)
+        thread = {"configurable": {"thread_id": "conversation-1"}}
+
+        tool.invoke({"query": "```python\nanswer = 42\n```"}, config=thread)
+
+        assert tool.invoke({"query": "print(answer)"}, config=thread) == "42\n"
+        assert "NameError" in tool.invoke({"query": "print(answer)"}, config={"configurable": {"thread_id": "other"}})
+        assert set(tool.tool_call_schema.model_json_schema()["properties"]) == {"query"}
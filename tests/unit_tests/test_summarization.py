@@ -0,0 +1,121 @@
+"""Unit tests for incremental conversation summarization."""
+
+from unittest.mock import AsyncMock, patch
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage, ToolMessage
+from langgraph.runtime import Runtime
+
+from common.context import Context
+from common.summarization import (
+    format_transcript,
+    select_messages_to_fold,
+    update_summary,
+)
+
+
+def _turn(n: int) -> list:
+    return [
+        HumanMessage(content=f"question {n}", id=f"h{n}"),
+        AIMessage(content="", id=f"c{n}", tool_calls=[{"name": "search", "args": {"q": str(n)}, "id": f"t{n}"}]),
+        ToolMessage(content=f"result {n}", name="search", tool_call_id=f"t{n}", id=f"r{n}"),
+        AIMessage(content=f"answer {n}", id=f"a{n}"),
+    ]
+
+
+class TestSelectMessagesToFold:
+    """Tests choosing where the summary ends and the kept history begins."""
+
+    def test_cuts_before_a_user_message(self) -> None:
+        history = _turn(1) + _turn(2) + _turn(3)
+
+        folded = select_messages_to_fold(history, keep=5)
+
+        assert [m.id for m in folded] == [m.id for m in history[:4]]
+
+    def test_keeps_at_least_the_requested_messages(self) -> None:
+        history = _turn(1) + _turn(2)
+
+        assert select_messages_to_fold(history, keep=5) == []
+        assert len(select_messages_to_fold(history, keep=4)) == 4
+
+    def test_never_separates_tool_calls_from_results(self) -> None:
+        history = _turn(1) + _turn(2) + [HumanMessage(content="latest", id="h3")]
+
+        for keep in range(1, len(history) + 1):
+            folded = select_messages_to_fold(history, keep)
+            assert not folded or isinstance(history[len(folded)], HumanMessage)
+
+
+class TestUpdateSummary:
+    """Tests extending the running summary."""
+
+    def test_transcript_includes_tool_calls_and_results(self) -> None:
+        transcript = format_transcript(_turn(1))
+
+        assert "User: question 1" in transcript
+        assert 'Assistant called search with {"q": "1"}' in transcript
+        assert "search returned: result 1" in transcript
+        assert "Assistant: answer 1" in transcript
+
+    async def test_sends_only_the_previous_summary_and_new_messages(self) -> None:
+        model = AsyncMock()
+        model.ainvoke.return_value = AIMessage(content=" The user asked about 2. ")
+
+        summary = await update_summary(model, "The user asked about 1.", _turn(2))
+
+        prompt = model.ainvoke.call_args.args[0][0]["content"]
+        assert summary == "The user asked about 2."
+        assert "The user asked about 1." in prompt
+        assert "question 2" in prompt and "question 1" not in prompt
+
+    async def test_summary_tokens_are_not_streamed(self) -> None:
+        from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+        from langgraph.graph import StateGraph
+        from typing_extensions import TypedDict
+
+        class _State(TypedDict):
+            summary: str
+
+        model = GenericFakeChatModel(messages=iter([AIMessage(content="The user asked about 2.")]))
+
+        async def _summarize(state: _State) -> dict:
+            return {"summary": await update_summary(model, "", _turn(2))}
+
+        builder = StateGraph(_State)
+        builder.add_node("summarize", _summarize)
+        builder.add_edge("__start__", "summarize")
+        graph = builder.compile()
+
+        streamed = [chunk async for chunk in graph.astream({"summary": ""}, stream_mode="messages")]
+
+        assert streamed == []
+
+
+class TestSummarizationNode:
+    """Tests the graph node that folds old turns."""
+
+    async def test_folds_old_turns_with_the_summary_model(self) -> None:
+        from react_agent.graph import summarize_conversation
+        from react_agent.state import State
+
+        model = AsyncMock()
+        model.ainvoke.return_value = AIMessage(content="Summary of turns 1 and 2.")
+        history = _turn(1) + _turn(2) + [HumanMessage(content="latest", id="h3")]
+        context = Context(summarize_after_messages=6, summary_keep_messages=1, summary_model="groq:cheap")
+        state = State(messages=history)
+
+        with patch("react_agent.graph.load_chat_model", return_value=model) as load:
+            update = await summarize_conversation(state, Runtime(context=context))
+
+        load.assert_called_once_with("groq:cheap")
+        assert update["summary"] == "Summary of turns 1 and 2."
+        assert all(isinstance(m, RemoveMessage) for m in update["messages"])
+        assert [m.id for m in update["messages"]] == [m.id for m in history[:8]]
+
+    async def test_short_threads_are_left_alone(self) -> None:
+        from react_agent.graph import summarize_conversation
+        from react_agent.state import State
+
+        runtime = Runtime(context=Context(summarize_after_messages=6))
+
+        assert await summarize_conversation(State(messages=_turn(1)), runtime) == {}
@@ -0,0 +1,140 @@
+"""Unit tests for the search tool result cache."""
+
+from pathlib import Path
+from unittest.mock import AsyncMock, patch
+
+from langchain_community.utilities import ArxivAPIWrapper, WikipediaAPIWrapper
+from langchain_tavily import TavilySearch
+
+from common.context import Context
+from common.tool_cache import (
+    CachedArxivQueryRun,
+    CachedTavilySearch,
+    CachedWikipediaQueryRun,
+    ToolResultCache,
+    get_tool_cache,
+    tool_cache_key,
+)
+from common.tools import create_tools, invalidate_tool_registry
+
+
+class TestToolResultCache:
+    """Tests keys, expiry, eviction, persistence and metrics."""
+
+    def test_equivalent_arguments_share_a_key(self) -> None:
+        key = tool_cache_key("wikipedia", {"query": "Alan  Turing "})
+
+        assert tool_cache_key("wikipedia", {"query": "alan turing", "lang": None}) == key
+        assert tool_cache_key("arxiv", {"query": "alan turing"}) != key
+        assert tool_cache_key("wikipedia", {"query": "alan turing"}, {"top_k": 5}) != key
+
+    def test_entries_expire_after_their_own_ttl(self) -> None:
+        cache = ToolResultCache()
+        with patch("common.tool_cache.time.time", return_value=1000.0):
+            cache.set("tavily_search", "news", "fresh news", ttl=60)
+            cache.set("wikipedia", "page", "stable page", ttl=3600)
+        with patch("common.tool_cache.time.time", return_value=1100.0):
+            assert cache.get("tavily_search", "news") is None
+            assert cache.get("wikipedia", "page") == "stable page"
+
+    def test_least_recently_used_entries_are_evicted(self) -> None:
+        cache = ToolResultCache(max_entries=2)
+        cache.set("t", "a", 1, ttl=60)
+        cache.set("t", "b", 2, ttl=60)
+        cache.get("t", "a")
+        cache.set("t", "c", 3, ttl=60)
+
+        assert cache.get("t", "b") is None
+        assert cache.get("t", "a") == 1
+
+    def test_results_persist_on_disk(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "tools.sqlite")
+        cache = ToolResultCache(path)
+        cache.set("arxiv", "k", {"papers": ["attention"]}, ttl=60)
+        cache.close()
+
+        assert ToolResultCache(path).get("arxiv", "k") == {"papers": ["attention"]}
+
+    def test_one_cache_per_database_file(self, tmp_path: Path) -> None:
+        path = str(tmp_path / "shared.sqlite")
+        cache = get_tool_cache(path, max_entries=10)
+
+        assert get_tool_cache(path, max_entries=20) is cache
+        assert cache.max_entries == 10
+        cache.close()
+
+    def test_hit_rates_are_tracked_per_tool(self) -> None:
+        cache = ToolResultCache()
+        cache.set("wikipedia", "k", "page", ttl=60)
+        cache.get("wikipedia", "k")
+        cache.get("wikipedia", "other")
+        cache.get("arxiv", "k2")
+
+        stats = cache.stats()
+        assert stats["hits"] == 1 and stats["misses"] == 2
+        assert stats["tools"]["wikipedia"]["hit_rate"] == 0.5
+        assert stats["tools"]["arxiv"] == {"hits": 0, "misses": 1, "hit_rate": 0.0}
+
+
+class TestCachedTools:
+    """Tests the cached tool subclasses."""
+
+    def test_repeated_queries_skip_the_network(self) -> None:
+        cache = ToolResultCache()
+        tool = CachedWikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(), result_cache=cache, cache_ttl=60)
+
+        with patch.object(WikipediaAPIWrapper, "run", return_value="Turing was a mathematician.") as mock_run:
+            assert tool.invoke({"query": "Alan Turing"}) == "Turing was a mathematician."
+            assert tool.invoke({"query": "alan turing"}) == "Turing was a mathematician."
+
+        mock_run.assert_called_once()
+        assert cache.stats()["tools"]["wikipedia"]["hits"] == 1
+
+    async def test_async_calls_are_cached(self) -> None:
+        cache = ToolResultCache()
+        tool = CachedTavilySearch(max_results=3, result_cache=cache, cache_ttl=60)
+        response = {"query": "langgraph", "results": [{"title": "LangGraph"}]}
+
+        with patch.object(
+            type(tool.api_wrapper), "raw_results_async", new_callable=AsyncMock, return_value=response
+        ) as mock_search:
+            assert await tool.ainvoke({"query": "LangGraph"}) == response
+            assert await tool.ainvoke({"query": "langgraph"}) == response
+
+        assert mock_search.await_count == 1
+
+    def test_errors_are_not_cached(self) -> None:
+        cache = ToolResultCache()
+        arxiv = CachedArxivQueryRun(api_wrapper=ArxivAPIWrapper(), result_cache=cache, cache_ttl=60)
+        tavily = CachedTavilySearch(max_results=3, result_cache=cache, cache_ttl=60)
+
+        with patch.object(ArxivAPIWrapper, "run", return_value="Arxiv exception: timed out") as mock_run:
+            arxiv.invoke({"query": "transformers"})
+            arxiv.invoke({"query": "transformers"})
+        with patch.object(type(tavily.api_wrapper), "raw_results", side_effect=ConnectionError) as mock_search:
+            tavily.invoke({"query": "news"})
+            tavily.invoke({"query": "news"})
+
+        assert mock_run.call_count == 2
+        assert mock_search.call_count == 2
+
+    def test_zero_ttl_disables_caching(self) -> None:
+        tool = CachedWikipediaQueryRun(api_wrapper=WikipediaAPIWrapper(), result_cache=ToolResultCache(), cache_ttl=0)
+
+        with patch.object(WikipediaAPIWrapper, "run", return_value="page") as mock_run:
+            tool.invoke({"query": "x"})
+            tool.invoke({"query": "x"})
+
+        assert mock_run.call_count == 2
+
+    async def test_create_tools_uses_the_configured_ttls(self) -> None:
+        invalidate_tool_registry()
+        tools = await create_tools(Context(tool_cache_ttls={"wikipedia": 5}))
+
+        search_tool = next(t for t in tools if isinstance(t, TavilySearch))
+        wikipedia_tool = next(t for t in tools if t.name == "wikipedia")
+        assert isinstance(search_tool, CachedTavilySearch) and search_tool.cache_ttl == 600
+        assert wikipedia_tool.cache_ttl == 5
+        assert search_tool.result_cache is wikipedia_tool.result_cache
+        invalidate_tool_registry()
+
@@ -0,0 +1,363 @@
+"""Unit tests for the managed tools node."""
+
+import asyncio
+import threading
+import time
+from typing import Any, Dict, List
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import StructuredTool, tool
+
+from common.concurrency import SingleFlight
+from common.tool_node import (
+    EXECUTOR_METADATA_KEY,
+    SINGLEFLIGHT_METADATA_KEY,
+    ManagedToolNode,
+    ToolLimits,
+    get_tool_latency_stats,
+    has_native_async,
+)
+
+
+def _message(*calls: Dict[str, Any]) -> Dict[str, List[AIMessage]]:
+    return {"messages": [AIMessage(content="", tool_calls=[{"type": "tool_call", **call} for call in calls])]}
+
+
+def _counting_tool(delay: float = 0.01):
+    calls: List[str] = []
+
+    @tool
+    async def lookup(query: str) -> str:
+        """Looks something up."""
+        calls.append(query)
+        await asyncio.sleep(delay)
+        return f"answer to {query}"
+
+    return lookup, calls
+
+
+class TestCoalescing:
+    """Tests sharing identical calls while keeping per-call ToolMessages."""
+
+    async def test_parallel_identical_calls_share_one_execution(self) -> None:
+        lookup, calls = _counting_tool()
+        node = ManagedToolNode([lookup], singleflight=SingleFlight())
+
+        result = await node.ainvoke(
+            _message(
+                {"name": "lookup", "args": {"query": "x"}, "id": "call_1"},
+                {"name": "lookup", "args": {"query": "x"}, "id": "call_2"},
+                {"name": "lookup", "args": {"query": "y"}, "id": "call_3"},
+            )
+        )
+
+        messages = result["messages"]
+        assert calls == ["x", "y"]
+        assert [m.tool_call_id for m in messages] == ["call_1", "call_2", "call_3"]
+        assert messages[0].content == messages[1].content == "answer to x"
+        assert all(isinstance(m, ToolMessage) for m in messages)
+
+    async def test_concurrent_runs_share_one_execution(self) -> None:
+        lookup, calls = _counting_tool()
+        group = SingleFlight()
+
+        results = await asyncio.gather(
+            ManagedToolNode([lookup], singleflight=group).ainvoke(
+                _message({"name": "lookup", "args": {"query": "x"}, "id": "run_a"})
+            ),
+            ManagedToolNode([lookup], singleflight=group).ainvoke(
+                _message({"name": "lookup", "args": {"query": "x"}, "id": "run_b"})
+            ),
+        )
+
+        assert calls == ["x"]
+        assert [r["messages"][0].tool_call_id for r in results] == ["run_a", "run_b"]
+
+    async def test_runs_with_different_tool_instances_do_not_share(self) -> None:
+        first, first_calls = _counting_tool()
+        second, second_calls = _counting_tool()
+        group = SingleFlight()
+
+        await asyncio.gather(
+            ManagedToolNode([first], singleflight=group).ainvoke(
+                _message({"name": "lookup", "args": {"query": "x"}, "id": "run_a"})
+            ),
+            ManagedToolNode([second], singleflight=group).ainvoke(
+                _message({"name": "lookup", "args": {"query": "x"}, "id": "run_b"})
+            ),
+        )
+
+        assert first_calls == ["x"]
+        assert second_calls == ["x"]
+
+    async def test_opted_out_tools_run_every_call(self) -> None:
+        lookup, calls = _counting_tool()
+        lookup.metadata = {SINGLEFLIGHT_METADATA_KEY: False}
+        node = ManagedToolNode([lookup], singleflight=SingleFlight())
+
+        await node.ainvoke(
+            _message(
+                {"name": "lookup", "args": {"query": "x"}, "id": "call_1"},
+                {"name": "lookup", "args": {"query": "x"}, "id": "call_2"},
+            )
+        )
+
+        assert calls == ["x", "x"]
+
+    async def test_config_reading_tools_coalesce_only_within_a_tenant(self) -> None:
+        calls: List[str] = []
+
+        @tool
+        async def private_lookup(query: str, config: RunnableConfig) -> str:
+            """Looks something up in the caller's own data."""
+            thread_id = config["configurable"]["thread_id"]
+            calls.append(thread_id)
+            await asyncio.sleep(0.01)
+            return f"{thread_id}: {query}"
+
+        group = SingleFlight()
+
+        def run(thread_id: str, call_id: str):
+            return ManagedToolNode([private_lookup], singleflight=group).ainvoke(
+                _message({"name": "private_lookup", "args": {"query": "x"}, "id": call_id}),
+                config={"configurable": {"thread_id": thread_id}},
+            )
+
+        results = await asyncio.gather(run("a", "1"), run("b", "2"), run("a", "3"))
+
+        assert sorted(calls) == ["a", "b"]
+        assert [r["messages"][0].content for r in results] == ["a: x", "b: x", "a: x"]
+
+    async def test_errors_are_reported_to_every_caller(self) -> None:
+        @tool
+        async def broken(query: str) -> str:
+            """Always fails."""
+            await asyncio.sleep(0.01)
+            raise ValueError("service unavailable")
+
+        node = ManagedToolNode([broken], singleflight=SingleFlight())
+        result = await node.ainvoke(
+            _message(
+                {"name": "broken", "args": {"query": "x"}, "id": "call_1"},
+                {"name": "broken", "args": {"query": "x"}, "id": "call_2"},
+            )
+        )
+
+        assert [(m.tool_call_id, m.status) for m in result["messages"]] == [("call_1", "error"), ("call_2", "error")]
+
+
+class TestExecutionLimits:
+    """Tests the bounded pool, per-tool concurrency limits and timeouts."""
+
+    async def test_sync_tools_run_in_the_tool_pool(self) -> None:
+        threads: List[str] = []
+
+        @tool
+        def blocking(query: str) -> str:
+            """Blocks while it works."""
+            threads.append(threading.current_thread().name)
+            return query
+
+        assert not has_native_async(blocking)
+        node = ManagedToolNode([blocking], singleflight=SingleFlight())
+        result = await node.ainvoke(_message({"name": "blocking", "args": {"query": "x"}, "id": "call_1"}))
+
+        assert result["messages"][0].content == "x"
+        assert threads[0].startswith("tool")
+
+    async def test_concurrency_limit_is_per_tool(self) -> None:
+        running = 0
+        peak = 0
+        lock = threading.Lock()
+
+        @tool
+        def slow(query: str) -> str:
+            """Takes a while."""
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            time.sleep(0.02)
+            with lock:
+                running -= 1
+            return query
+
+        node = ManagedToolNode(
+            [slow], coalesce=False, limits=ToolLimits(max_workers=8, concurrency={"slow": 2})
+        )
+        result = await node.ainvoke(
+            _message(*({"name": "slow", "args": {"query": str(i)}, "id": f"call_{i}"} for i in range(6)))
+        )
+
+        assert [m.content for m in result["messages"]] == [str(i) for i in range(6)]
+        assert peak == 2
+
+    async def test_timed_out_calls_return_an_error_message(self) -> None:
+        @tool
+        def hangs(query: str) -> str:
+            """Never answers in time."""
+            time.sleep(0.2)
+            return query
+
+        @tool
+        async def fast(query: str) -> str:
+            """Answers at once."""
+            return query
+
+        node = ManagedToolNode(
+            [hangs, fast], singleflight=SingleFlight(), limits=ToolLimits(timeouts={"hangs": 0.05})
+        )
+        started = time.perf_counter()
+        result = await node.ainvoke(
+            _message(
+                {"name": "hangs", "args": {"query": "x"}, "id": "call_1"},
+                {"name": "fast", "args": {"query": "y"}, "id": "call_2"},
+            )
+        )
+
+        timed_out, answered = result["messages"]
+        assert time.perf_counter() - started < 0.15
+        assert (timed_out.tool_call_id, timed_out.status) == ("call_1", "error")
+        assert "0.05 seconds" in timed_out.content
+        assert (answered.content, answered.status) == ("y", "success")
+
+    async def test_async_timeouts_cancel_the_call(self) -> None:
+        @tool
+        async def stalls(query: str) -> str:
+            """Waits forever."""
+            await asyncio.sleep(10)
+            return query
+
+        node = ManagedToolNode([stalls], limits=ToolLimits(default_timeout=0.02))
+        result = await node.ainvoke(_message({"name": "stalls", "args": {"query": "x"}, "id": "call_1"}))
+
+        assert result["messages"][0].status == "error"
+
+    async def test_executor_metadata_overrides_detection(self) -> None:
+        threads: List[str] = []
+
+        def run(query: str) -> str:
+            threads.append(threading.current_thread().name)
+            return query
+
+        async def arun(query: str) -> str:
+            return await asyncio.get_running_loop().run_in_executor(None, run, query)
+
+        wrapped = StructuredTool.from_function(func=run, coroutine=arun, name="wrapped", description="Wraps run.")
+        wrapped.metadata = {EXECUTOR_METADATA_KEY: "thread"}
+
+        assert has_native_async(wrapped)
+        await ManagedToolNode([wrapped]).ainvoke(_message({"name": "wrapped", "args": {"query": "x"}, "id": "call_1"}))
+        assert threads[0].startswith("tool")
+
+
+class TestStepLimits:
+    """Tests the per-step parallelism cap, deadline and latency records."""
+
+    async def test_parallel_calls_are_capped_per_step(self) -> None:
+        running = 0
+        peak = 0
+
+        @tool
+        async def fetch(query: str) -> str:
+            """Fetches something."""
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return query
+
+        node = ManagedToolNode([fetch], coalesce=False, limits=ToolLimits(max_parallel_calls=2))
+        result = await node.ainvoke(
+            _message(*({"name": "fetch", "args": {"query": str(i)}, "id": f"call_{i}"} for i in range(5)))
+        )
+
+        assert [m.content for m in result["messages"]] == [str(i) for i in range(5)]
+        assert peak == 2
+
+    async def test_calls_past_the_step_deadline_time_out(self) -> None:
+        @tool
+        async def step_fast(query: str) -> str:
+            """Answers at once."""
+            return query
+
+        @tool
+        async def step_slow(query: str) -> str:
+            """Takes far too long."""
+            await asyncio.sleep(10)
+            return query
+
+        node = ManagedToolNode([step_fast, step_slow], limits=ToolLimits(step_timeout=0.05))
+        started = time.perf_counter()
+        result = await node.ainvoke(
+            _message(
+                {"name": "step_fast", "args": {"query": "x"}, "id": "call_1"},
+                {"name": "step_slow", "args": {"query": "y"}, "id": "call_2"},
+            )
+        )
+
+        answered, timed_out = result["messages"]
+        assert time.perf_counter() - started < 1
+        assert (answered.content, answered.status) == ("x", "success")
+        assert (timed_out.tool_call_id, timed_out.status) == ("call_2", "error")
+        assert "deadline" in timed_out.content
+        stats = get_tool_latency_stats()
+        assert stats["step_slow"]["timeouts"] == 1
+        assert stats["step_fast"]["calls"] == 1
+
+    async def test_latency_is_attached_to_each_message(self) -> None:
+        lookup, _ = _counting_tool()
+        node = ManagedToolNode([lookup], singleflight=SingleFlight())
+
+        result = await node.ainvoke(
+            _message(
+                {"name": "lookup", "args": {"query": "x"}, "id": "call_1"},
+                {"name": "lookup", "args": {"query": "x"}, "id": "call_2"},
+            )
+        )
+
+        assert all(m.response_metadata["latency_ms"] >= 5 for m in result["messages"])
+
+
+class TestToolNodeApi:
+    """`ManagedToolNode` must work through public `ToolNode` API only."""
+
+    def test_overrides_no_private_tool_node_methods(self) -> None:
+        from langgraph.prebuilt import ToolNode
+
+        overridden = {
+            name
+            for name, value in vars(ManagedToolNode).items()
+            if callable(value) and hasattr(ToolNode, name) and not name.startswith("__")
+        }
+
+        assert overridden == {"ainvoke"}
+
+    async def test_injected_state_reaches_wrapped_tools_uncoalesced(self) -> None:
+        from typing import Annotated
+
+        from langgraph.prebuilt import InjectedState
+
+        calls: List[str] = []
+
+        @tool
+        async def whoami(query: str, state: Annotated[Dict[str, Any], InjectedState]) -> str:
+            """Answers from the graph state."""
+            calls.append(query)
+            await asyncio.sleep(0.01)
+            return state["user"]
+
+        node = ManagedToolNode([whoami], singleflight=SingleFlight())
+        message = _message(
+            {"name": "whoami", "args": {"query": "x"}, "id": "call_1"},
+            {"name": "whoami", "args": {"query": "x"}, "id": "call_2"},
+        )
+        result = await node.ainvoke({**message, "user": "ada"})
+
+        assert [m.content for m in result["messages"]] == ["ada", "ada"]
+        assert calls == ["x", "x"]
+        assert node.tools_by_name["whoami"].tool_call_schema.model_json_schema() == (
+            whoami.tool_call_schema.model_json_schema()
+        )
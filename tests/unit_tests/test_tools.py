@@ -2,15 +2,25 @@
 Comprehensive unit tests for the agent's tool creation and management module.
 """
 
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 # FIX: Import the new, non-deprecated class
 from langchain_tavily import TavilySearch
+from langchain_core.tools import StructuredTool
 from langchain_experimental.tools import PythonREPLTool
 
 from common.context import Context
-from common.tools import create_tools, get_mcpo_tools
+from common import tools as tools_module
+from common.tools import (
+    clear_mcp_cache,
+    create_tools,
+    get_mcp_tools,
+    get_mcpo_tools,
+    invalidate_tool_registry,
+    resolve_mcp_servers,
+)
 
 # Mark all tests in this file as asyncio
 pytestmark = pytest.mark.asyncio
@@ -20,11 +30,12 @@ pytestmark = pytest.mark.asyncio
 def reset_mcp_client_cache():
     """
     This fixture automatically runs before each test in this file.
-    It resets the global _mcp_client to prevent test pollution.
+    It resets the MCPO client pool and tool registry to prevent test pollution.
     """
-    from common import tools
-    tools._mcp_client = None
+    clear_mcp_cache()
+    invalidate_tool_registry()
     yield
+    clear_mcp_cache()
 # --------------------------------------------------------------------
 
 class TestLocalToolCreation:
@@ -43,6 +54,42 @@ class TestLocalToolCreation:
         assert search_tool.max_results == 10
 
 
+class TestToolRegistry:
+    """Tests the process-wide registry that shares built tool sets."""
+
+    async def test_equivalent_contexts_share_one_tool_set(self) -> None:
+        first = await create_tools(Context(max_search_results=3))
+        second = await create_tools(Context(max_search_results=3, model="groq:llama3-8b-8192"))
+
+        assert second is first
+
+    async def test_tool_affecting_fields_get_separate_entries(self) -> None:
+        first = await create_tools(Context(max_search_results=3))
+        second = await create_tools(Context(max_search_results=4))
+
+        assert second is not first
+        search_tool = next(t for t in second if isinstance(t, TavilySearch))
+        assert search_tool.max_results == 4
+
+    async def test_invalidate_forces_rebuild(self) -> None:
+        context = Context(max_search_results=3)
+        first = await create_tools(context)
+
+        invalidate_tool_registry(context)
+
+        assert await create_tools(context) is not first
+
+    @patch("common.tools.get_mcp_tools", new_callable=AsyncMock)
+    async def test_remote_tools_are_resolved_on_every_call(self, mock_get_mcp_tools: AsyncMock) -> None:
+        mock_get_mcp_tools.return_value = []
+        context = Context(mcpo_url="http://down-server/mcp")
+
+        await create_tools(context)
+        await create_tools(context)
+
+        assert mock_get_mcp_tools.await_count == 2
+
+
 class TestMCPOIntegration:
     """Tests the integration with the OpenWebUI MCPO client."""
 
@@ -75,22 +122,186 @@ class TestMCPOIntegration:
         assert tools == []
 
 
+class TestMCPOCaching:
+    """Tests the per-URL client pool, tool-list cache, and circuit breaker."""
+
+    @staticmethod
+    def _client(get_tools: AsyncMock) -> MagicMock:
+        client = MagicMock()
+        client.get_tools = get_tools
+        return client
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_fresh_tool_list_is_served_from_cache(self, mock_mcp_client_class: MagicMock) -> None:
+        get_tools = AsyncMock(return_value=["remote"])
+        mock_mcp_client_class.return_value = self._client(get_tools)
+
+        assert await get_mcpo_tools("http://a/mcp") == ["remote"]
+        assert await get_mcpo_tools("http://a/mcp") == ["remote"]
+
+        get_tools.assert_awaited_once()
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_clients_are_pooled_per_url(self, mock_mcp_client_class: MagicMock) -> None:
+        mock_mcp_client_class.side_effect = lambda config: self._client(
+            AsyncMock(return_value=[config["openwebui_mcpo"]["url"]])
+        )
+
+        assert await get_mcpo_tools("http://a/mcp") == ["http://a/mcp"]
+        assert await get_mcpo_tools("http://b/mcp") == ["http://b/mcp"]
+        assert mock_mcp_client_class.call_count == 2
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_stale_list_is_served_while_refreshing(self, mock_mcp_client_class: MagicMock) -> None:
+        get_tools = AsyncMock(side_effect=[["v1"], ["v2"]])
+        mock_mcp_client_class.return_value = self._client(get_tools)
+
+        assert await get_mcpo_tools("http://a/mcp", ttl=0) == ["v1"]
+        assert await get_mcpo_tools("http://a/mcp", ttl=0) == ["v1"]
+        await next(iter(tools_module._mcp_servers.values())).refresh_task
+
+        assert await get_mcpo_tools("http://a/mcp", ttl=60) == ["v2"]
+        assert get_tools.await_count == 2
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_slow_server_times_out(self, mock_mcp_client_class: MagicMock) -> None:
+        async def hang() -> list:
+            await asyncio.sleep(10)
+            return ["late"]
+
+        mock_mcp_client_class.return_value = self._client(AsyncMock(side_effect=hang))
+
+        assert await get_mcpo_tools("http://slow/mcp", timeout=0.01) == []
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_circuit_breaker_stops_calling_failing_server(
+        self, mock_mcp_client_class: MagicMock
+    ) -> None:
+        get_tools = AsyncMock(side_effect=ConnectionError("down"))
+        mock_mcp_client_class.return_value = self._client(get_tools)
+
+        for _ in range(tools_module.MCPO_FAILURE_THRESHOLD + 2):
+            assert await get_mcpo_tools("http://dead/mcp") == []
+
+        assert get_tools.await_count == tools_module.MCPO_FAILURE_THRESHOLD
+
+
+class TestMultiServerDiscovery:
+    """Tests concurrent tool discovery across several MCP servers."""
+
+    @staticmethod
+    def _remote_tool(name: str) -> StructuredTool:
+        return StructuredTool.from_function(func=lambda: name, name=name, description=f"Remote {name}.")
+
+    def test_resolve_mcp_servers(self) -> None:
+        context = Context(
+            mcpo_url="http://mcpo/sse",
+            mcp_servers=[
+                "http://plain/sse",
+                {"name": "docs", "url": "http://docs/mcp", "transport": "streamable_http", "timeout": 2},
+                {"command": "python", "args": ["server.py"]},
+            ],
+        )
+
+        assert resolve_mcp_servers(context) == [
+            {"name": "openwebui_mcpo", "url": "http://mcpo/sse", "transport": "sse"},
+            {"name": "mcp_0", "url": "http://plain/sse", "transport": "sse"},
+            {"name": "docs", "url": "http://docs/mcp", "transport": "streamable_http", "timeout": 2},
+            {"name": "mcp_2", "command": "python", "args": ["server.py"], "transport": "stdio"},
+        ]
+
+    def test_resolve_mcp_servers_skips_incomplete_entries(self, caplog: pytest.LogCaptureFixture) -> None:
+        context = Context(mcp_servers=[{"name": "broken"}, "http://plain/sse"])
+
+        assert resolve_mcp_servers(context) == [{"name": "mcp_1", "url": "http://plain/sse", "transport": "sse"}]
+        assert "'url' or 'command'" in caplog.text
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_servers_are_queried_concurrently_with_partial_results(
+        self, mock_mcp_client_class: MagicMock
+    ) -> None:
+        async def fetch(name: str, delay: float) -> list:
+            await asyncio.sleep(delay)
+            return [self._remote_tool(f"{name}_tool")]
+
+        delays = {"fast": 0.05, "medium": 0.1, "hung": 10}
+
+        def make_client(config: dict) -> MagicMock:
+            (name,) = config
+            client = MagicMock()
+            client.get_tools = lambda: fetch(name, delays[name])
+            return client
+
+        mock_mcp_client_class.side_effect = make_client
+        servers = [
+            {"name": "fast", "url": "http://fast/sse", "transport": "sse"},
+            {"name": "medium", "url": "http://medium/sse", "transport": "sse"},
+            {"name": "hung", "url": "http://hung/sse", "transport": "sse", "timeout": 0.15},
+        ]
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        tools = await get_mcp_tools(servers, timeout=1)
+        elapsed = loop.time() - started
+
+        assert [t.name for t in tools] == ["fast_tool", "medium_tool"]
+        assert elapsed < 0.3
+
+    @patch("common.tools.MultiServerMCPClient")
+    async def test_name_collisions_are_prefixed_with_server_name(
+        self, mock_mcp_client_class: MagicMock
+    ) -> None:
+        tool_sets = {
+            "alpha": [self._remote_tool("search"), self._remote_tool("alpha_only")],
+            "beta-2": [self._remote_tool("search"), self._remote_tool("wikipedia")],
+        }
+
+        def make_client(config: dict) -> MagicMock:
+            (name,) = config
+            client = MagicMock()
+            client.get_tools = AsyncMock(return_value=tool_sets[name])
+            return client
+
+        mock_mcp_client_class.side_effect = make_client
+        servers = [
+            {"name": "alpha", "url": "http://alpha/sse", "transport": "sse"},
+            {"name": "beta-2", "url": "http://beta/sse", "transport": "sse"},
+        ]
+
+        tools = await get_mcp_tools(servers, reserved_names=frozenset({"wikipedia"}))
+        again = await get_mcp_tools(servers, reserved_names=frozenset({"wikipedia"}))
+
+        assert [t.name for t in tools] == ["alpha__search", "alpha_only", "beta-2__search", "beta-2__wikipedia"]
+        assert again is tools
+        assert tool_sets["alpha"][0].name == "search"
+
+    def test_merged_lists_are_cached_by_tool_definitions(self) -> None:
+        reserved = frozenset({"wikipedia"})
+        merged = tools_module._merge_server_tools(["a"], ([self._remote_tool("search")],), reserved)
+
+        # A refreshed list with the same definitions reuses the merged list.
+        assert tools_module._merge_server_tools(["a"], ([self._remote_tool("search")],), reserved) is merged
+        assert tools_module._merge_server_tools(["a"], ([self._remote_tool("lookup")],), reserved) is not merged
+
+
 class TestCombinedToolCreation:
     """Tests the combination of local and remote tools."""
 
-    @patch("common.tools.get_mcpo_tools", new_callable=AsyncMock)
+    @patch("common.tools.get_mcp_tools", new_callable=AsyncMock)
     async def test_create_tools_combines_local_and_remote(
-        self, mock_get_mcpo_tools: AsyncMock
+        self, mock_get_mcp_tools: AsyncMock
     ) -> None:
         mock_remote_tool = MagicMock(name="RemoteSearch")
-        mock_get_mcpo_tools.return_value = [mock_remote_tool]
+        mock_get_mcp_tools.return_value = [mock_remote_tool]
         context = Context(mcpo_url="http://test-server/mcp")
 
         all_tools = await create_tools(context)
 
-        mock_get_mcpo_tools.assert_awaited_once_with("http://test-server/mcp")
+        mock_get_mcp_tools.assert_awaited_once()
+        servers = mock_get_mcp_tools.await_args.args[0]
+        assert servers == [{"name": "openwebui_mcpo", "url": "http://test-server/mcp", "transport": "sse"}]
         assert len(all_tools) == 7
         # FIX: Check for the new class name
         assert any(isinstance(t, TavilySearch) for t in all_tools)
         assert any(isinstance(t, PythonREPLTool) for t in all_tools)
-        assert mock_remote_tool in all_tools
\ No newline at end of file
+        assert mock_remote_tool in all_tools
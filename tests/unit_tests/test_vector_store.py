@@ -0,0 +1,702 @@
+"""Unit tests for the shared, lazily initialized vector store."""
+
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from common import vector_store
+from common.context import Context
+from common.embeddings import HashingEmbeddings
+
+_create_embeddings = vector_store._create_embeddings
+
+SRC_DIR = Path(__file__).resolve().parents[2] / "src"
+
+
+@pytest.fixture(autouse=True)
+def fake_embeddings():
+    """Back the store with small, deterministic, offline embeddings."""
+    vector_store.reset_vector_store()
+    with patch(
+        "common.vector_store._create_embeddings",
+        side_effect=lambda context: DeterministicFakeEmbedding(size=context.embedding_dimension or 8),
+    ):
+        yield
+    vector_store.reset_vector_store()
+
+
+def _run_import_probe(code: str) -> dict:
+    env = {k: v for k, v in os.environ.items() if k != "OPENAI_API_KEY"}
+    env["PYTHONPATH"] = str(SRC_DIR)
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        capture_output=True,
+        text=True,
+        env=env,
+        check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class TestLazyInitialization:
+    """Tests that the store is only built when first used."""
+
+    def test_import_defers_faiss_and_embedding_setup(self) -> None:
+        """Importing the tools must not pay for FAISS or the embedding client.
+
+        Runs in a fresh interpreter without OPENAI_API_KEY, which used to make
+        the import fail, and checks that FAISS is loaded and the embeddings
+        are built by the first vector store call rather than by the import.
+        """
+        probe = _run_import_probe(
+            "import json, os, sys\n"
+            "import common.tools\n"
+            "from common import vector_store\n"
+            "on_import = {'faiss': 'faiss' in sys.modules, 'embeddings': vector_store._embeddings is not None,"
+            " 'collections': bool(vector_store._collections)}\n"
+            "os.environ['EMBEDDING_MODEL'] = 'hashing'\n"
+            "vector_store.get_vector_store()\n"
+            "on_first_use = {'faiss': 'faiss' in sys.modules, 'embeddings': vector_store._embeddings is not None,"
+            " 'collections': bool(vector_store._collections)}\n"
+            "print(json.dumps({'on_import': on_import, 'on_first_use': on_first_use}))\n"
+        )
+
+        assert probe["on_import"] == {"faiss": False, "embeddings": False, "collections": False}, probe
+        assert probe["on_first_use"] == {"faiss": True, "embeddings": True, "collections": True}, probe
+
+    def test_store_is_built_on_first_use(self) -> None:
+        assert vector_store.list_namespaces() == []
+
+        vector_store.add_document("FAISS is a library for similarity search.")
+
+        assert vector_store.list_namespaces() == [vector_store.DEFAULT_NAMESPACE]
+        assert vector_store.get_vector_store() is vector_store._collections[vector_store.DEFAULT_NAMESPACE].store
+
+    def test_embedding_dimension_comes_from_context(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=16))
+
+        assert vector_store.get_vector_store().index.d == 16
+
+    def test_search_reuses_cached_query_embeddings(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        vector_store.add_document("gamma")
+
+        with patch.object(
+            DeterministicFakeEmbedding, "embed_query", autospec=True, return_value=[0.0] * 8
+        ) as mock_embed_query:
+            vector_store.search_documents("a repeated query", k=1)
+            vector_store.search_documents("a  repeated query ", k=1)
+
+        # The repeat normalizes to the first query.
+        mock_embed_query.assert_called_once()
+
+    def test_local_backend_sizes_the_index(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_model="hashing", embedding_dimension=64))
+
+        with patch("common.vector_store._create_embeddings", _create_embeddings):
+            store = vector_store.get_vector_store()
+            vector_store.add_documents(["the cat sat on the mat", "stock prices fell sharply"])
+
+            assert isinstance(store.embeddings, HashingEmbeddings)
+            assert store.index.d == 64
+            assert vector_store.search_documents("a cat on a mat", k=1) == ["the cat sat on the mat"]
+
+    def test_dimension_mismatch_is_rejected(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=16))
+
+        with patch(
+            "common.vector_store._create_embeddings", return_value=DeterministicFakeEmbedding(size=8)
+        ):
+            with pytest.raises(ValueError, match="produces 8-dimensional vectors"):
+                vector_store.get_vector_store()
+
+    def test_add_and_search_round_trip(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        vector_store.add_document("alpha")
+        vector_store.add_document("beta")
+
+        assert vector_store.search_documents("alpha", k=1) == ["alpha"]
+
+
+class TestBulkIngestion:
+    """Tests batched embedding and the coalescing ingest queue."""
+
+    def test_add_documents_batches_embedding_requests(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        store = vector_store.get_vector_store()
+        documents = [f"snippet {i}" for i in range(10)]
+
+        with patch.object(
+            DeterministicFakeEmbedding, "embed_documents", autospec=True,
+            side_effect=lambda self, texts: [self.embed_query(t) for t in texts],
+        ) as mock_embed:
+            ids = vector_store.add_documents(documents, batch_size=4)
+
+        assert [len(call.args[1]) for call in mock_embed.call_args_list] == [4, 4, 2]
+        assert len(ids) == 10 and store.index.ntotal == 10
+        assert store.docstore.search(ids[7]).page_content == "snippet 7"
+
+    def test_add_documents_validates_arguments(self) -> None:
+        with pytest.raises(ValueError, match="batch_size"):
+            vector_store.add_documents(["a"], batch_size=-1)
+        with pytest.raises(ValueError, match="metadatas"):
+            vector_store.add_documents(["a", "b"], metadatas=[{}])
+
+    async def test_ingest_queue_coalesces_concurrent_submissions(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        queue = vector_store.IngestQueue(max_batch=100, max_delay=0.01)
+
+        with patch(
+            "common.vector_store.aadd_documents", wraps=vector_store.aadd_documents
+        ) as mock_add:
+            ids = await asyncio.gather(*(queue.submit(f"doc {i}") for i in range(5)))
+
+        mock_add.assert_called_once()
+        assert mock_add.call_args.args[0] == [f"doc {i}" for i in range(5)]
+        assert len(set(ids)) == 5
+
+    async def test_ingest_queue_flushes_on_size_threshold(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        queue = vector_store.IngestQueue(max_batch=2, max_delay=60)
+
+        with patch(
+            "common.vector_store.aadd_documents", wraps=vector_store.aadd_documents
+        ) as mock_add:
+            await asyncio.wait_for(asyncio.gather(queue.submit("a"), queue.submit("b")), timeout=5)
+
+        mock_add.assert_called_once_with(["a", "b"], metadatas=[{}, {}], namespace=vector_store.DEFAULT_NAMESPACE)
+
+    async def test_ingest_queue_propagates_write_errors(self) -> None:
+        queue = vector_store.IngestQueue(max_batch=1, max_delay=0)
+
+        with patch("common.vector_store.aadd_documents", side_effect=RuntimeError("embedding failed")):
+            with pytest.raises(RuntimeError, match="embedding failed"):
+                await queue.submit("a")
+
+    async def test_add_document_tool_goes_through_the_queue(self) -> None:
+        from common.tools import add_document_tool
+
+        vector_store.configure_vector_store(Context(embedding_dimension=8, ingest_max_delay_ms=1))
+        result = await add_document_tool.ainvoke({"document": "queued"})
+
+        assert "queued" in result
+        assert vector_store.search_documents("queued", k=1) == ["queued"]
+
+
+class TestAsyncAccess:
+    """Tests the async API and the locking around the shared index."""
+
+    async def test_async_round_trip(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+
+        ids = await vector_store.aadd_documents(["alpha", "beta"], metadatas=[{"n": 1}, {"n": 2}])
+
+        assert len(ids) == 2
+        assert await vector_store.asearch_documents("beta", k=1) == ["beta"]
+
+    async def test_async_calls_use_async_embeddings(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+
+        with patch.object(
+            DeterministicFakeEmbedding, "embed_documents", autospec=True, side_effect=AssertionError
+        ), patch.object(DeterministicFakeEmbedding, "embed_query", autospec=True, side_effect=AssertionError):
+            with patch.object(
+                DeterministicFakeEmbedding, "aembed_documents", autospec=True,
+                side_effect=lambda self, texts: [[1.0] * 8 for _ in texts],
+            ) as mock_aembed_documents, patch.object(
+                DeterministicFakeEmbedding, "aembed_query", autospec=True,
+                side_effect=lambda self, text: [1.0] * 8,
+            ) as mock_aembed_query:
+                # Texts no other test uses, so the shared embedding cache cannot answer them.
+                await vector_store.aadd_documents(["async-only document"])
+                assert await vector_store.asearch_documents("async-only query", k=1) == ["async-only document"]
+
+        mock_aembed_documents.assert_called_once()
+        mock_aembed_query.assert_called_once()
+
+    async def test_slow_embedding_does_not_block_the_event_loop(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        await vector_store.aadd_documents(["alpha"])
+        # Queries are cached apart from documents, so cache "alpha" as a query first.
+        await vector_store.asearch_documents("alpha", k=1)
+        release = asyncio.Event()
+
+        async def slow_embedding(self, text):
+            await release.wait()
+            return [0.0] * 8
+
+        with patch.object(DeterministicFakeEmbedding, "aembed_query", slow_embedding):
+            slow_search = asyncio.create_task(vector_store.asearch_documents("slow query", k=1))
+            # A second search for cached text completes while the first is still waiting.
+            assert await asyncio.wait_for(vector_store.asearch_documents("alpha", k=1), 5) == ["alpha"]
+            assert not slow_search.done()
+            release.set()
+            assert await asyncio.wait_for(slow_search, 5) == ["alpha"]
+
+    @pytest.mark.parametrize("mode", ["lexical", "vector", "hybrid"])
+    async def test_search_during_a_write_does_not_block_the_event_loop(self, mode) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        await vector_store.aadd_documents(["alpha"])
+        await vector_store.asearch_documents("alpha", k=1, mode=mode)
+        ticks = 0
+
+        async def ticker() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticking = asyncio.create_task(ticker())
+        with vector_store._collections[vector_store.DEFAULT_NAMESPACE].lock.write():
+            search = asyncio.create_task(vector_store.asearch_documents("alpha", k=1, mode=mode))
+            await asyncio.sleep(0.2)
+            # The search waits for the writer in the pool while the loop keeps running.
+            assert not search.done()
+            assert ticks >= 5
+        assert await asyncio.wait_for(search, 5) == ["alpha"]
+        ticking.cancel()
+
+    def test_searches_wait_for_writes(self) -> None:
+        import threading
+
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        vector_store.add_documents(["alpha"])
+        store = vector_store.get_vector_store()
+        results = []
+
+        with vector_store._collections[vector_store.DEFAULT_NAMESPACE].lock.write():
+            searcher = threading.Thread(
+                target=lambda: results.append(vector_store.search_documents("beta", k=1))
+            )
+            searcher.start()
+            searcher.join(timeout=0.2)
+            assert searcher.is_alive()
+            store.add_texts(["beta"])
+
+        searcher.join(timeout=5)
+        assert results == [["beta"]]
+
+
+class TestIndexPromotion:
+    """Tests the background promotion from a flat index to an approximate one."""
+
+    def test_invalid_index_type_is_rejected(self) -> None:
+        vector_store.configure_vector_store(Context(vector_index_type="annoy"))
+
+        with pytest.raises(ValueError, match="Unsupported vector index type"):
+            vector_store.get_vector_store()
+
+    @pytest.mark.parametrize("kind", ["hnsw", "ivf"])
+    def test_store_is_promoted_past_the_threshold(self, kind: str) -> None:
+        from common.vector_index import index_kind
+
+        vector_store.configure_vector_store(
+            Context(embedding_dimension=8, vector_index_type=kind, vector_index_promote_threshold=100)
+        )
+        vector_store.add_documents([f"doc {i}" for i in range(50)])
+        store = vector_store.get_vector_store()
+        assert index_kind(store.index) == "flat"
+
+        vector_store.add_documents([f"doc {i}" for i in range(50, 120)])
+        assert vector_store.wait_for_index_promotion(timeout=10)
+
+        assert index_kind(store.index) == kind
+        assert store.index.ntotal == 120
+        assert vector_store.search_documents("doc 77", k=1) == ["doc 77"]
+
+    def test_documents_added_during_the_rebuild_are_kept(self) -> None:
+        from common import vector_index
+
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        vector_store.add_documents([f"doc {i}" for i in range(20)])
+        store = vector_store.get_vector_store()
+
+        def build_while_writing(*args):
+            vector_store.add_documents(["late arrival"])
+            return vector_index.build_index(*args)
+
+        with patch("common.vector_store.build_index", side_effect=build_while_writing):
+            vector_store.promote_index("hnsw")
+
+        assert store.index.ntotal == 21
+        assert vector_store.search_documents("late arrival", k=1) == ["late arrival"]
+
+
+class TestQuantization:
+    """Tests promotion to quantized indexes, with and without re-ranking."""
+
+    @pytest.mark.parametrize("kind", ["flat", "hnsw", "ivf"])
+    @pytest.mark.parametrize("quantization", ["sq8", "pq"])
+    def test_store_is_promoted_to_quantized_codes(self, kind: str, quantization: str) -> None:
+        from common.vector_index import index_kind, index_quantization
+
+        vector_store.configure_vector_store(
+            Context(
+                embedding_dimension=16,
+                vector_index_type=kind,
+                vector_quantization=quantization,
+                vector_index_promote_threshold=200,
+            )
+        )
+        vector_store.add_documents([f"doc {i}" for i in range(200)])
+        assert vector_store.wait_for_index_promotion(timeout=10)
+
+        store = vector_store.get_vector_store()
+        assert (index_kind(store.index), index_quantization(store.index)) == (kind, quantization)
+        assert store.index.ntotal == 200
+
+    def test_reranking_restores_exact_results(self) -> None:
+        from common.vector_index import RerankingIndex
+
+        vector_store.configure_vector_store(
+            Context(
+                embedding_dimension=16,
+                vector_quantization="pq",
+                vector_index_params={"pq_m": 2},
+                vector_rerank_factor=50,
+                vector_index_promote_threshold=300,
+            )
+        )
+        documents = [f"doc {i}" for i in range(300)]
+        vector_store.add_documents(documents)
+        assert vector_store.wait_for_index_promotion(timeout=10)
+        vector_store.add_documents(["after promotion"])
+
+        store = vector_store.get_vector_store()
+        assert isinstance(store.index, RerankingIndex)
+        # Two bytes per vector cannot tell 300 documents apart; the float copy can.
+        for text in ["doc 5", "doc 123", "doc 299", "after promotion"]:
+            assert vector_store.search_documents(text, k=1) == [text]
+        assert store.index.reconstruct_n(0, 301).shape == (301, 16)
+
+    def test_invalid_quantization_is_rejected(self) -> None:
+        vector_store.configure_vector_store(Context(vector_quantization="int4"))
+
+        with pytest.raises(ValueError, match="Unsupported vector quantization"):
+            vector_store.get_vector_store()
+
+
+class TestSnapshots:
+    """Tests persisting the store to disk and restoring it."""
+
+    def _restart(self, **settings) -> None:
+        vector_store.reset_vector_store()
+        vector_store.configure_vector_store(Context(embedding_dimension=8, **settings))
+
+    def test_documents_survive_a_restart(self, tmp_path: Path) -> None:
+        self._restart(vector_store_path=str(tmp_path))
+        vector_store.add_documents(["alpha", "beta"], metadatas=[{"n": 1}, {"n": 2}])
+
+        self._restart(vector_store_path=str(tmp_path))
+        store = vector_store.get_vector_store()
+
+        assert store.index.ntotal == 2
+        assert vector_store.search_documents("beta", k=1) == ["beta"]
+        assert store.similarity_search("alpha", k=1)[0].metadata == {"n": 1}
+
+    def test_snapshots_append_only_new_vectors(self, tmp_path: Path) -> None:
+        from common.vector_snapshot import read_manifest
+
+        self._restart(vector_store_path=str(tmp_path))
+        vector_store.add_documents(["alpha", "beta"])
+        first_segment = read_manifest(str(tmp_path))["segments"][0]
+        first_bytes = (tmp_path / first_segment["file"]).read_bytes()
+
+        vector_store.add_documents(["gamma"])
+        manifest = read_manifest(str(tmp_path))
+
+        assert [s["count"] for s in manifest["segments"]] == [2, 1]
+        assert (tmp_path / first_segment["file"]).read_bytes() == first_bytes
+        assert manifest["count"] == 3
+
+    def test_trailing_segments_are_merged(self, tmp_path: Path) -> None:
+        from common.vector_snapshot import read_manifest
+
+        self._restart(vector_store_path=str(tmp_path), vector_store_max_segments=3)
+        for i in range(5):
+            vector_store.add_documents([f"doc {i}"])
+
+        manifest = read_manifest(str(tmp_path))
+        assert len(manifest["segments"]) <= 3
+        assert sum(s["count"] for s in manifest["segments"]) == 5
+        assert len(list(tmp_path.glob("segment-*.faiss"))) == len(manifest["segments"])
+
+        self._restart(vector_store_path=str(tmp_path))
+        assert vector_store.search_documents("doc 3", k=1) == ["doc 3"]
+
+    def test_segments_are_merged_size_tiered(self, tmp_path: Path) -> None:
+        from common.vector_snapshot import read_manifest
+
+        self._restart(vector_store_path=str(tmp_path), vector_store_max_segments=100)
+        for i in range(20):
+            vector_store.add_documents([f"doc {i}"])
+
+        # Like a binary counter: each vector was rewritten at most log2(20) times.
+        assert [s["count"] for s in read_manifest(str(tmp_path))["segments"]] == [16, 4]
+
+    @pytest.mark.parametrize("kind, quantization", [("hnsw", "none"), ("ivf", "sq8"), ("flat", "pq")])
+    @pytest.mark.parametrize("read_only", [False, True])
+    def test_promoted_index_type_is_restored(
+        self, tmp_path: Path, kind: str, quantization: str, read_only: bool
+    ) -> None:
+        from common.vector_index import index_kind, index_quantization
+
+        self._restart(vector_store_path=str(tmp_path))
+        vector_store.add_documents([f"doc {i}" for i in range(400)])
+        vector_store.promote_index(kind, quantization=quantization)
+        vector_store.add_documents(["late doc"])
+        before = vector_store.search_documents("late doc", k=3)
+
+        self._restart(vector_store_path=str(tmp_path), vector_store_read_only=read_only)
+        index = vector_store.get_vector_store().index
+
+        assert (index_kind(index), index_quantization(index)) == (kind, quantization)
+        assert index.ntotal == 401
+        # The same index, not a rebuild, so the same (approximate) results.
+        assert vector_store.search_documents("late doc", k=3) == before
+
+    def test_reranked_index_is_restored_with_exact_vectors(self, tmp_path: Path) -> None:
+        from common.vector_index import RerankingIndex
+
+        self._restart(vector_store_path=str(tmp_path), vector_rerank_factor=4)
+        vector_store.add_documents([f"doc {i}" for i in range(400)])
+        vector_store.promote_index("flat", quantization="sq8", rerank_factor=4)
+
+        # Nothing was added since the promotion, so the index file is mapped.
+        self._restart(vector_store_path=str(tmp_path), vector_rerank_factor=4, vector_store_read_only=True)
+        index = vector_store.get_vector_store().index
+
+        assert isinstance(index, RerankingIndex)
+        assert vector_store.search_documents("doc 7", k=1) == ["doc 7"]
+
+    def test_read_only_restore_is_memory_mapped(self, tmp_path: Path) -> None:
+        self._restart(vector_store_path=str(tmp_path))
+        vector_store.add_documents(["alpha", "beta"])
+        vector_store.add_documents(["gamma"])
+
+        self._restart(vector_store_path=str(tmp_path), vector_store_read_only=True)
+
+        assert vector_store.search_documents("gamma", k=1) == ["gamma"]
+        assert vector_store.search_documents("alpha", k=1) == ["alpha"]
+        with pytest.raises(RuntimeError, match="read-only"):
+            vector_store.add_documents(["delta"])
+
+    def test_uncommitted_docstore_lines_are_discarded(self, tmp_path: Path) -> None:
+        self._restart(vector_store_path=str(tmp_path))
+        vector_store.add_documents(["alpha"])
+        # Simulate a snapshot that crashed after appending to the docstore log.
+        with open(tmp_path / "docstore.jsonl", "a", encoding="utf-8") as f:
+            f.write('{"id": "orphan", "page_content": "lost", "metadata": {}}\n')
+
+        vector_store.add_documents(["beta"])
+        self._restart(vector_store_path=str(tmp_path))
+
+        assert vector_store.get_vector_store().index.ntotal == 2
+        assert sorted(vector_store.search_documents("alpha", k=2)) == ["alpha", "beta"]
+
+    def test_mismatched_snapshot_is_rewritten(self, tmp_path: Path) -> None:
+        from common.vector_snapshot import read_manifest
+
+        self._restart(vector_store_path=str(tmp_path))
+        vector_store.add_documents(["alpha", "beta"])
+
+        self._restart()
+        vector_store.add_documents(["other store"])
+        vector_store.save_vector_store(str(tmp_path))
+
+        manifest = read_manifest(str(tmp_path))
+        assert manifest["count"] == 1 and len(manifest["segments"]) == 1
+
+
+class TestNamespaces:
+    """Tests namespaced collections and metadata-filtered searches."""
+
+    def test_namespaces_are_isolated(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        vector_store.add_documents(["tenant a secret"], namespace="a")
+        vector_store.add_documents(["tenant b secret"], namespace="b")
+
+        assert vector_store.search_documents("tenant a secret", k=5, namespace="b") == ["tenant b secret"]
+        assert vector_store.search_documents("anything", k=5) == []
+        assert vector_store.list_namespaces() == ["a", "b", vector_store.DEFAULT_NAMESPACE]
+
+    def test_filter_is_applied_inside_the_search(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        texts = [f"doc {i}" for i in range(50)]
+        metadatas = [{"source": "wiki" if i % 10 == 0 else "web", "tags": ["even" if i % 2 == 0 else "odd"]}
+                     for i in range(50)]
+        vector_store.add_documents(texts, metadatas=metadatas)
+
+        results = vector_store.search_documents("doc 7", k=10, filter={"source": "wiki"})
+
+        # Post-filtering the 10 nearest documents would almost never return all 5 matches.
+        assert sorted(results) == ["doc 0", "doc 10", "doc 20", "doc 30", "doc 40"]
+        assert vector_store.search_documents("doc 7", k=3, filter={"source": "wiki", "tags": "odd"}) == []
+        assert vector_store.search_documents("doc 3", k=1, filter={"tags": ["odd"]}) == ["doc 3"]
+        assert vector_store.search_documents("doc 3", k=1, filter={"source": "blog"}) == []
+
+    @pytest.mark.parametrize("kind", ["hnsw", "ivf"])
+    def test_filter_on_approximate_indexes(self, kind: str) -> None:
+        from common import vector_index
+
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        count = vector_index.EXACT_SUBSET_LIMIT + 500
+        vector_store.add_documents(
+            [f"doc {i}" for i in range(count)], metadatas=[{"bucket": i % 2} for i in range(count)]
+        )
+        vector_store.promote_index(kind)
+
+        results = vector_store.search_documents("doc 1", k=5, filter={"bucket": 1})
+
+        assert len(results) == 5
+        assert all(int(text.split()[1]) % 2 == 1 for text in results)
+        assert results[0] == "doc 1"
+
+    def test_reads_never_change_a_promoted_ivf_index(self) -> None:
+        import faiss
+
+        from common import vector_index
+
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        vector_store.add_documents([f"doc {i}" for i in range(300)], metadatas=[{"bucket": i % 3} for i in range(300)])
+        vector_store.promote_index("ivf")
+        index = vector_store.get_vector_store().index
+
+        assert index.direct_map.type != faiss.DirectMap.NoMap
+        # Searches and reconstructs run under the read lock, so they must not build the map.
+        with patch.object(type(index), "make_direct_map", side_effect=AssertionError("index mutated")):
+            assert vector_store.search_documents("doc 3", k=1, filter={"bucket": 0}) == ["doc 3"]
+            assert len(vector_index.reconstruct_vectors(index)) == 300
+
+    def test_namespaces_are_snapshotted_separately(self, tmp_path: Path) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8, vector_store_path=str(tmp_path)))
+        vector_store.add_documents(["default doc"], metadatas=[{"kind": "note"}])
+        vector_store.add_documents(["thread doc"], metadatas=[{"kind": "note"}], namespace="thread-1")
+        vector_store.add_documents(["odd doc"], namespace="user/../1")
+
+        vector_store.reset_vector_store()
+        vector_store.configure_vector_store(Context(embedding_dimension=8, vector_store_path=str(tmp_path)))
+
+        assert (tmp_path / "namespaces" / "thread-1" / "manifest.json").exists()
+        assert not (tmp_path / "namespaces" / "1").exists()
+        assert vector_store.search_documents("x", k=5, filter={"kind": "note"}, namespace="thread-1") == [
+            "thread doc"
+        ]
+        assert vector_store.search_documents("x", k=5, namespace="user/../1") == ["odd doc"]
+        assert vector_store.search_documents("x", k=5) == ["default doc"]
+
+    async def test_ingest_queue_writes_each_namespace(self) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8))
+        queue = vector_store.IngestQueue(max_batch=100, max_delay=0.01)
+
+        await asyncio.gather(
+            queue.submit("first", {"n": 1}, namespace="a"),
+            queue.submit("second", namespace="b"),
+            queue.submit("third", {"n": 3}, namespace="a"),
+        )
+
+        assert sorted(await vector_store.asearch_documents("x", k=5, namespace="a")) == ["first", "third"]
+        assert await vector_store.asearch_documents("x", k=5, filter={"n": 3}, namespace="a") == ["third"]
+        assert await vector_store.asearch_documents("x", k=5, namespace="b") == ["second"]
+
+    async def test_tools_use_the_thread_namespace(self) -> None:
+        from common.tools import add_document_tool, search_documents_tool
+
+        vector_store.configure_vector_store(
+            Context(embedding_dimension=8, ingest_max_delay_ms=1, vector_store_namespace="{thread_id}")
+        )
+        await add_document_tool.ainvoke(
+            {"document": "thread one note", "metadata": {"topic": "faiss"}},
+            config={"configurable": {"thread_id": "one"}},
+        )
+
+        one = {"configurable": {"thread_id": "one"}}
+        two = {"configurable": {"thread_id": "two"}}
+        assert await search_documents_tool.ainvoke({"query": "note", "filter": {"topic": "faiss"}}, config=one) == [
+            "thread one note"
+        ]
+        assert await search_documents_tool.ainvoke({"query": "note"}, config=two) == []
+        with pytest.raises(ValueError, match="thread_id"):
+            await search_documents_tool.ainvoke({"query": "note"})
+
+    async def test_each_run_uses_its_own_namespace_template(self) -> None:
+        from langgraph.graph import StateGraph
+        from typing_extensions import TypedDict
+
+        from common.tools import add_document_tool
+
+        class _State(TypedDict):
+            document: str
+
+        async def _add(state: _State, config) -> dict:
+            await add_document_tool.ainvoke({"document": state["document"]}, config=config)
+            return {}
+
+        builder = StateGraph(_State, context_schema=Context)
+        builder.add_node("add", _add)
+        builder.add_edge("__start__", "add")
+        graph = builder.compile()
+        config = {"configurable": {"thread_id": "t1", "user_id": "alice"}}
+
+        # The first run's context builds the store; the second run's template must still apply.
+        vector_store.configure_vector_store(Context(embedding_dimension=8, ingest_max_delay_ms=1))
+        await graph.ainvoke({"document": "shared note"}, config, context=Context(embedding_dimension=8))
+        await graph.ainvoke(
+            {"document": "alice note"},
+            config,
+            context=Context(embedding_dimension=8, vector_store_namespace="{user_id}"),
+        )
+
+        assert await vector_store.asearch_documents("note", k=5, namespace="alice") == ["alice note"]
+        assert await vector_store.asearch_documents("note", k=5) == ["shared note"]
+
+
+class TestSearchModes:
+    """Tests lexical, vector, and hybrid searches."""
+
+    def _add_corpus(self, **settings) -> None:
+        vector_store.configure_vector_store(Context(embedding_dimension=8, **settings))
+        vector_store.add_documents(
+            ["Ticket INV-2024-001 is closed.", "The index uses product quantization.", "Ticket 2024 is open."],
+            metadatas=[{"kind": "ticket"}, {"kind": "note"}, {"kind": "ticket"}],
+        )
+
+    def test_lexical_search_makes_no_embedding_call(self) -> None:
+        self._add_corpus()
+        embeddings = vector_store.get_vector_store().embeddings
+
+        with patch.object(embeddings, "embed_query", side_effect=AssertionError("embedded")):
+            assert vector_store.search_documents("inv-2024-001", k=1, mode="lexical") == [
+                "Ticket INV-2024-001 is closed."
+            ]
+            assert vector_store.search_documents("ticket", k=5, mode="lexical", filter={"kind": "note"}) == []
+
+    async def test_hybrid_search_fuses_both_rankings(self) -> None:
+        self._add_corpus(vector_search_mode="hybrid")
+
+        results = await vector_store.asearch_documents("quantization", k=3)
+
+        assert results[0] == "The index uses product quantization."
+        assert len(results) == 3
+        assert vector_store.search_documents("quantization", k=1) == ["The index uses product quantization."]
+
+    async def test_lexical_index_is_restored_from_snapshots(self, tmp_path: Path) -> None:
+        self._add_corpus(vector_store_path=str(tmp_path))
+        vector_store.reset_vector_store()
+        vector_store.configure_vector_store(Context(embedding_dimension=8, vector_store_path=str(tmp_path)))
+
+        assert await vector_store.asearch_documents("open ticket", k=1, mode="lexical") == ["Ticket 2024 is open."]
+
+    def test_unknown_mode_is_rejected(self) -> None:
+        with pytest.raises(ValueError, match="search mode"):
+            vector_store.search_documents("x", mode="fuzzy")
+        vector_store.configure_vector_store(Context(vector_search_mode="fuzzy"))
+        with pytest.raises(ValueError, match="search mode"):
+            vector_store.get_vector_store()